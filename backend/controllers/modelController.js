@@ -3,6 +3,8 @@ const Room = require('../models/Room');
 const Component = require('../models/Component');
 const mongoose = require('mongoose');
 const { uploadModel, deleteModel: deleteUploadcareFile } = require('../config/uploadcare');
+const { requestCollisionProxy } = require('../services/collisionProxyService');
+const { requestColorProfile } = require('../services/colorProfileService');
 const multer = require('multer');
 
 // Configure multer for memory storage
@@ -309,7 +311,7 @@ const deleteModel = async (req, res) => {
     // Try to find and update in Model3D first
     let model = await Model3D.findByIdAndUpdate(
       id,
-      { isActive: false },
+      { isActive: false, updatedAt: new Date() },
       { new: true }
     );
 
@@ -317,7 +319,7 @@ const deleteModel = async (req, res) => {
     if (!model) {
       model = await Component.findByIdAndUpdate(
         id,
-        { isActive: false },
+        { isActive: false, updatedAt: new Date() },
         { new: true }
       );
     }
@@ -461,6 +463,8 @@ const uploadModelFile = async (req, res) => {
       const savedModel = await newModel.save();
       
       console.log('Room template saved successfully with ID:', savedModel._id);
+      requestCollisionProxy(savedModel._id, 'Model3D', savedModel.fileUrl, savedModel.fileFormat);
+      requestColorProfile(savedModel._id, savedModel.fileUrl, savedModel.name, savedModel.fileFormat);
 
       res.status(201).json({
         status: 'success',
@@ -499,6 +503,7 @@ const uploadModelFile = async (req, res) => {
       const savedComponent = await newComponent.save();
       
       console.log('Component saved successfully with ID:', savedComponent._id);
+      requestCollisionProxy(savedComponent._id, 'Component', savedComponent.fileUrl, savedComponent.fileFormat);
 
       res.status(201).json({
         status: 'success',
@@ -554,7 +559,7 @@ const updateModelFile = async (req, res) => {
       });
     }
 
-    let updateData = { ...req.body };
+    let updateData = { ...req.body, updatedAt: new Date() };
 
     // If new file is uploaded
     if (req.file) {
@@ -581,6 +586,8 @@ const updateModelFile = async (req, res) => {
       updateData.fileName = req.file.originalname;
       updateData.fileSize = req.file.size;
       updateData.fileFormat = req.file.originalname.split('.').pop().toLowerCase();
+      // The old proxy describes the old file
+      updateData.$unset = { collisionProxy: 1 };
     }
 
     // Parse JSON fields if they exist
@@ -602,6 +609,13 @@ const updateModelFile = async (req, res) => {
       ? await Component.findByIdAndUpdate(id, updateData, { new: true, runValidators: true })
       : await Model3D.findByIdAndUpdate(id, updateData, { new: true, runValidators: true });
 
+    if (req.file) {
+      requestCollisionProxy(id, isComponent ? 'Component' : 'Model3D', updateData.fileUrl, updateData.fileFormat);
+      if (!isComponent) {
+        requestColorProfile(id, updateData.fileUrl, updatedModel.name, updateData.fileFormat);
+      }
+    }
+
     res.json({
       status: 'success',
       message: 'Model updated successfully',
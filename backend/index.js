@@ -35,6 +35,13 @@ app.use('/api/admin/projects', require('./routes/admin/projects'));
 // AI Color Suggestions route
 app.use('/api/python', require('./routes/aiColorSuggestions'));
 
+// Python backend response headers passed through to the client
+const PYTHON_PASSTHROUGH_HEADERS = ['content-type', 'cache-control', 'etag', 'retry-after',
+  'x-profile-id', 'server-timing'];
+// Client request headers forwarded to the Python backend (conditional
+// requests and on-demand profiling)
+const PYTHON_FORWARDED_HEADERS = ['If-None-Match', 'X-Profile', 'X-Admin-Token'];
+
 // Python backend proxy route
 app.use('/api/python', async (req, res, next) => {
   try {
@@ -43,15 +50,30 @@ app.use('/api/python', async (req, res, next) => {
     
     console.log(`Proxying to Python backend: ${pythonUrl}`);
     
+    const headers = { 'Content-Type': 'application/json' };
+    PYTHON_FORWARDED_HEADERS.forEach((header) => {
+      if (req.headers[header.toLowerCase()]) {
+        headers[header] = req.headers[header.toLowerCase()];
+      }
+    });
+    
     const response = await axios({
       method: req.method,
       url: pythonUrl,
       data: req.body,
-      headers: {
-        'Content-Type': 'application/json'
+      headers,
+      // Pass bodies through as raw bytes so stored thumbnail images survive,
+      // and pass every HTTP status through (e.g. 304, 404, 429 with Retry-After)
+      responseType: 'arraybuffer',
+      validateStatus: () => true
+    });
+    
+    PYTHON_PASSTHROUGH_HEADERS.forEach((header) => {
+      if (response.headers[header]) {
+        res.set(header, response.headers[header]);
       }
     });
-    res.status(response.status).json(response.data);
+    res.status(response.status).send(Buffer.from(response.data));
   } catch (error) {
     console.error('Python backend proxy error:', error.message);
     res.status(500).json({
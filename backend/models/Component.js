@@ -71,6 +71,12 @@ const componentSchema = new mongoose.Schema({
   
   // Metadata
   thumbnail: String, // URL to thumbnail image
+  // Collision proxy computed by the Python backend on upload: oriented box,
+  // bounds and floor footprint inline, the full binary proxy at `url`
+  collisionProxy: {
+    type: mongoose.Schema.Types.Mixed,
+    default: undefined
+  },
   downloadCount: { type: Number, default: 0 },
   rating: { type: Number, min: 0, max: 5, default: 0 },
   isActive: { type: Boolean, default: true },
@@ -62,6 +62,13 @@ const model3DSchema = new mongoose.Schema({
     }
   }],
   thumbnail: String, // URL to single manually uploaded thumbnail image
+  thumbnailPlaceholder: String, // BlurHash of the generated thumbnail, written by the Python backend
+  // Collision proxy computed by the Python backend on upload: oriented box,
+  // bounds and floor footprint inline, the full binary proxy at `url`
+  collisionProxy: {
+    type: mongoose.Schema.Types.Mixed,
+    default: undefined
+  },
   // Physical properties
   dimensions: {
     width: { type: Number, required: true }, // in meters
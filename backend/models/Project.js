@@ -137,6 +137,11 @@ const projectSchema = new mongoose.Schema({
     type: Number,
     default: 1
   },
+  // AI suggestions regenerated offline by python_backend/bulk_resuggest.py
+  aiSuggestions: {
+    type: mongoose.Schema.Types.Mixed,
+    default: null
+  },
   // Metadata
   tags: [String],
   lastModified: {
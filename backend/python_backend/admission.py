@@ -0,0 +1,131 @@
+"""Admission control for expensive endpoints.
+
+Each endpoint class gets an ``AdmissionPool``: at most ``max_concurrent``
+requests run at once and at most ``max_queue`` wait for a slot, for no
+longer than ``queue_timeout`` seconds. A request that finds the queue full,
+or waits too long, is rejected with ``Overloaded`` and the app answers
+429 with a Retry-After header. Cheap endpoints (test, health) are not
+admission controlled, so they stay fast while heavy work is shed.
+"""
+import asyncio
+import functools
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+
+
+class Overloaded(Exception):
+    """Raised when a pool cannot admit a request"""
+
+    def __init__(self, pool: str, retry_after: int, reason: str = 'queue full'):
+        super().__init__(f"{pool} pool overloaded ({reason})")
+        self.pool = pool
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionPool:
+    """Concurrency limit with a bounded, time-limited wait queue"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float = 10.0,
+                 retry_after: int = 2):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.peak_waiting = 0
+        self.total_wait = 0.0
+
+    async def acquire(self):
+        """Take a slot, waiting in the queue if needed; raises Overloaded"""
+        if self._semaphore.locked() or self.waiting:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(self.name, self.retry_after)
+            await self._wait_for_slot()
+        else:
+            # A slot is free and nobody is queued; this does not suspend
+            await self._semaphore.acquire()
+        self.active += 1
+        self.admitted += 1
+
+    async def _wait_for_slot(self):
+        started = time.monotonic()
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise Overloaded(self.name, self.retry_after, 'queue timeout')
+        finally:
+            self.waiting -= 1
+        self.total_wait += time.monotonic() - started
+
+    def release(self):
+        """Give a slot back"""
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'active': self.active,
+            'queue_depth': self.waiting,
+            'peak_queue_depth': self.peak_waiting,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'avg_wait_ms': round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0
+        }
+
+
+def _pool_from_env(name: str, max_concurrent: int, max_queue: int, queue_timeout: float) -> AdmissionPool:
+    prefix = f'ADMISSION_{name.upper()}'
+    return AdmissionPool(
+        name,
+        max_concurrent=int(os.getenv(f'{prefix}_CONCURRENCY', max_concurrent)),
+        max_queue=int(os.getenv(f'{prefix}_QUEUE', max_queue)),
+        queue_timeout=float(os.getenv(f'{prefix}_QUEUE_TIMEOUT', queue_timeout)),
+        retry_after=int(os.getenv(f'{prefix}_RETRY_AFTER', 2))
+    )
+
+
+# Interactive requests (suggestions, single thumbnails) and batch requests
+# have separate limits so a burst of batches cannot starve the editor
+pools = {
+    'interactive': _pool_from_env('interactive', max_concurrent=32, max_queue=64, queue_timeout=5.0),
+    'batch': _pool_from_env('batch', max_concurrent=2, max_queue=4, queue_timeout=30.0)
+}
+
+
+def admission_controlled(pool_name: str):
+    """Run an async view inside a slot of the named pool"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            async with pools[pool_name].slot():
+                return await view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: pool.stats() for name, pool in pools.items()}
@@ -1,8 +1,30 @@
 import random
+from collections import Counter
 from typing import List, Dict, Any
+from suggestion_cache import TTLCache, canonical_room
+from spatial_layout import SpatialLayoutIndex, footprint_from_model, position_height, WALKWAY_WIDTH
+from color_profiles import ColorProfileStore, PROFILE_PALETTE, model_id_of, profile_colors
+from request_profiling import stage
 
 class AISuggester:
-    def __init__(self):
+    # Model fields that affect the suggestions, used to build the room cache key
+    room_key_fields = ('name', 'modelId', '_id', 'position', 'rotation', 'dimensions', 'scale',
+                       'collisionProxy')
+    
+    # Layout role of each furniture category for the spatial analysis
+    layout_roles = {
+        'seating': 'seating',
+        'tables': 'table',
+        'storage': 'storage',
+        'lighting': 'lighting'
+    }
+    
+    def __init__(self, cache_size: int = 1024, cache_ttl: float = 300.0,
+                 profile_store: ColorProfileStore = None):
+        self.suggestion_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        # Precomputed color profiles of catalog models, joined by model id
+        self.profile_store = profile_store
+        
         self.furniture_categories = {
             'seating': ['sofa', 'chair', 'armchair', 'bench', 'ottoman'],
             'tables': ['coffee_table', 'dining_table', 'side_table', 'desk'],
@@ -31,27 +53,82 @@ class AISuggester:
     
     def analyze_current_furniture(self, placed_models: List[Dict]) -> Dict[str, Any]:
         """Analyze the current furniture setup and return insights."""
-        analysis = {
-            'total_items': len(placed_models),
-            'categories': {},
-            'style_hints': [],
-            'missing_essentials': [],
-            'color_analysis': []
+        # Look up the color profiles of all models in one batch
+        with stage('color_profiles'):
+            profiles = (
+                self.profile_store.get_many(model_id_of(model) for model in placed_models)
+                if self.profile_store else {}
+            )
+        
+        aggregates = {}
+        layout = SpatialLayoutIndex()
+        for index, model in enumerate(placed_models):
+            features = self.room_features(model, profiles.get(model_id_of(model)))
+            for feature, keys in features.items():
+                aggregates.setdefault(feature, Counter()).update(keys)
+            
+            footprint = self.room_footprint(model, features['categories'][0])
+            if footprint:
+                layout.insert(index, footprint)
+        
+        return self.analysis_from_aggregates(len(placed_models), aggregates, layout)
+    
+    def room_features(self, model: Dict, profile: Dict = None) -> Dict[str, List[str]]:
+        """Return the per-model contributions to the room aggregates."""
+        name = model.get('name', '').lower()
+        if profile is None and self.profile_store:
+            profile = self.profile_store.get(model_id_of(model))
+        
+        # Simple style heuristics based on the model name
+        styles = []
+        if 'modern' in name:
+            styles.append('modern')
+        if 'traditional' in name or 'classic' in name:
+            styles.append('traditional')
+        if 'minimal' in name:
+            styles.append('minimalist')
+        
+        return {
+            'categories': [self._categorize_furniture(name)],
+            'styles': styles,
+            # The two heaviest colors of the model's precomputed profile
+            'colors': [entry['color'] for entry in profile_colors(profile)[:2]] if profile else []
         }
+    
+    def room_footprint(self, model: Dict, category: str = None):
+        """Return the floor footprint of a placed model, or None without a position."""
+        name = model.get('name', '').lower()
+        category = category or self._categorize_furniture(name)
         
-        # Count items by category
-        for model in placed_models:
-            name = model.get('name', '').lower()
-            category = self._categorize_furniture(name)
-            analysis['categories'][category] = analysis['categories'].get(category, 0) + 1
+        # Rugs lie under other furniture and ceiling lights hang above it
+        height = position_height(model)
+        solid = 'rug' not in name and 'carpet' not in name and height <= 1.5
         
-        # Identify missing essentials for common rooms
-        analysis['missing_essentials'] = self._identify_missing_essentials(analysis['categories'])
+        return footprint_from_model(model, self.layout_roles.get(category, 'other'), solid)
+    
+    def analysis_from_aggregates(self, total_items: int, aggregates: Dict[str, Counter],
+                                 layout: SpatialLayoutIndex = None) -> Dict[str, Any]:
+        """Build the room analysis from category and style counts and the spatial layout."""
+        categories = dict(aggregates.get('categories', {}))
+        style_counts = aggregates.get('styles', {})
         
-        # Generate style hints
-        analysis['style_hints'] = self._generate_style_hints(placed_models)
+        hints = [style for style in ('modern', 'traditional', 'minimalist') if style_counts.get(style)]
+        color_counts = aggregates.get('colors', {})
+        color_analysis = [
+            {'color': color, 'hex': dict(PROFILE_PALETTE)[color], 'count': count}
+            for color, count in sorted(color_counts.items(), key=lambda item: (-item[1], item[0]))[:5]
+        ]
         
-        return analysis
+        return {
+            'total_items': total_items,
+            'categories': categories,
+            # Default to modern
+            'style_hints': hints if hints else ['modern'],
+            # Identify missing essentials for common rooms
+            'missing_essentials': self._identify_missing_essentials(categories),
+            'color_analysis': color_analysis,
+            'layout': (layout or SpatialLayoutIndex()).report()
+        }
     
     def _categorize_furniture(self, item_name: str) -> str:
         """Categorize furniture item based on its name."""
@@ -74,26 +151,36 @@ class AISuggester:
         
         return missing
     
-    def _generate_style_hints(self, placed_models: List[Dict]) -> List[str]:
-        """Generate style hints based on placed models."""
-        hints = []
-        
-        # Simple heuristics based on model names
-        model_names = [model.get('name', '').lower() for model in placed_models]
-        
-        if any('modern' in name for name in model_names):
-            hints.append('modern')
-        if any('traditional' in name or 'classic' in name for name in model_names):
-            hints.append('traditional')
-        if any('minimal' in name for name in model_names):
-            hints.append('minimalist')
-        
-        return hints if hints else ['modern']  # Default to modern
-    
     def generate_full_suggestions(self, placed_models: List[Dict]) -> Dict[str, Any]:
-        """Generate comprehensive AI suggestions for the room."""
-        analysis = self.analyze_current_furniture(placed_models)
+        """Generate comprehensive AI suggestions for the room.
         
+        Results are cached by room key and must be treated as read-only.
+        """
+        with stage('canonicalize'):
+            room_key, placed_models = canonical_room(placed_models, self.room_key_fields)
+        return self._cached_suggestions(room_key, lambda: self.analyze_current_furniture(placed_models))
+    
+    def generate_session_suggestions(self, session) -> Dict[str, Any]:
+        """Generate suggestions from a room session's incrementally kept aggregates."""
+        return self._cached_suggestions(
+            session.room_key(),
+            lambda: self.analysis_from_aggregates(session.total_items, session.aggregates, session.layout)
+        )
+    
+    def _cached_suggestions(self, room_key: str, analyze) -> Dict[str, Any]:
+        """Return cached suggestions for a room key, building them on a miss."""
+        suggestions = self.suggestion_cache.get(room_key)
+        if suggestions is None:
+            with stage('analysis'):
+                analysis = analyze()
+            # Seed from the room key so the same room always gets the same suggestions
+            with stage('build'):
+                suggestions = self._build_full_suggestions(analysis, random.Random(room_key))
+            self.suggestion_cache.set(room_key, suggestions)
+        return suggestions
+    
+    def _build_full_suggestions(self, analysis: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+        """Build the suggestions for an analysed room using the given random generator."""
         suggestions = {
             'furniture_suggestions': [],
             'color_suggestions': [],
@@ -106,7 +193,7 @@ class AISuggester:
         for missing_category in analysis['missing_essentials']:
             category_items = self.furniture_categories.get(missing_category, [])
             if category_items:
-                suggested_item = random.choice(category_items)
+                suggested_item = rng.choice(category_items)
                 suggestions['furniture_suggestions'].append({
                     'category': missing_category,
                     'item': suggested_item,
@@ -119,17 +206,17 @@ class AISuggester:
         
         color_suggestions = [
             {
-                'color': random.choice(palette['primary']),
+                'color': rng.choice(palette['primary']),
                 'type': 'primary',
                 'description': f'Primary {style} color for main furniture pieces'
             },
             {
-                'color': random.choice(palette['accent']),
+                'color': rng.choice(palette['accent']),
                 'type': 'accent',
                 'description': f'Accent color for decorative elements'
             },
             {
-                'color': random.choice(palette['neutral']),
+                'color': rng.choice(palette['neutral']),
                 'type': 'neutral',
                 'description': f'Neutral {style} color for walls and backgrounds'
             }
@@ -138,14 +225,14 @@ class AISuggester:
         # Add more color suggestions based on the number of furniture items
         if analysis['total_items'] > 2:
             color_suggestions.append({
-                'color': random.choice(palette['primary']),
+                'color': rng.choice(palette['primary']),
                 'type': 'secondary',
                 'description': f'Secondary color to complement your {style} theme'
             })
             
         if analysis['total_items'] > 4:
             color_suggestions.append({
-                'color': random.choice(palette['accent']),
+                'color': rng.choice(palette['accent']),
                 'type': 'highlight',
                 'description': f'Highlight color for special decorative pieces'
             })
@@ -177,10 +264,32 @@ class AISuggester:
         if analysis['total_items'] < 3:
             suggestions.append('Consider adding more furniture to create a complete room')
         
+        # Position-aware suggestions from the spatial analysis
+        layout = analysis.get('layout', {})
+        for entry in layout.get('overlaps', [])[:3]:
+            suggestions.append(f'{entry["items"][0]} and {entry["items"][1]} overlap - move them apart')
+        
+        for entry in layout.get('tight_clearances', [])[:2]:
+            suggestions.append(
+                f'{entry["items"][0]} and {entry["items"][1]} are only {entry["gap"]}m apart - '
+                'leave more room to reach them'
+            )
+        
+        for entry in layout.get('narrow_walkways', [])[:2]:
+            suggestions.append(
+                f'The {entry["gap"]}m gap between {entry["items"][0]} and {entry["items"][1]} is too narrow '
+                f'to walk through - keep walkways at least {WALKWAY_WIDTH}m wide'
+            )
+        
+        unserved = layout.get('seating_without_table', [])
+        if unserved and analysis['categories'].get('tables', 0) > 0:
+            suggestions.append(f'Place a table within reach of {", ".join(unserved[:3])}')
+        
         return suggestions
     
-    def suggest_colors(self, analysis: Dict, furniture_type: str) -> Dict[str, Any]:
+    def suggest_colors(self, analysis: Dict, furniture_type: str, rng: random.Random = None) -> Dict[str, Any]:
         """Suggest colors for a specific furniture type."""
+        rng = rng or random
         style = analysis['style_hints'][0] if analysis['style_hints'] else 'modern'
         palette = self.color_palettes.get(style, self.color_palettes['modern'])
         
@@ -195,14 +304,14 @@ class AISuggester:
             # Other items can use accent colors
             color_options = palette['accent'] + palette['neutral']
         
-        primary_color = random.choice(color_options)
+        primary_color = rng.choice(color_options)
         
         return {
             'primary_color': primary_color,
-            'complementary_colors': random.sample(palette['accent'], 2),
+            'complementary_colors': rng.sample(palette['accent'], 2),
             'style': style,
             'reasoning': f'This {primary_color} works well for {furniture_type} in {style} style',
-            'confidence': random.uniform(0.8, 0.95)
+            'confidence': rng.uniform(0.8, 0.95)
         }
 
 # Create global instance
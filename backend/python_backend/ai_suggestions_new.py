@@ -1,12 +1,38 @@
 import json
 import random
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Tuple
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from furniture_classifier import default_classifier
+from suggestion_cache import TTLCache, canonical_room
+from spatial_layout import SpatialLayoutIndex, footprint_from_model
+from color_profiles import ColorProfileStore, model_id_of, profile_colors
 
 class FurnitureAISuggester:
-    def __init__(self):
+    # Model fields that affect the suggestions, used to build the room cache key
+    room_key_fields = ('name', 'category', 'modelId', '_id', 'position', 'rotation', 'dimensions', 'scale')
+    
+    # Layout role of each furniture type for the spatial analysis
+    layout_roles = {
+        "sofa": "seating",
+        "chair": "seating",
+        "coffee_table": "table",
+        "dining_table": "table",
+        "bed": "bed",
+        "bookshelf": "storage",
+        "wardrobe": "storage",
+        "lamp": "lighting"
+    }
+    
+    def __init__(self, cache_size: int = 1024, cache_ttl: float = 300.0,
+                 profile_store: ColorProfileStore = None):
+        self.suggestion_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        # Precomputed color profiles of catalog models, joined by model id
+        self.profile_store = profile_store
+        
+        # Name classifier, fitted once on the category prototypes
+        self.classifier = default_classifier()
+        
         # Color to hex code mapping
         self.color_hex_map = {
             "white": "#FFFFFF",
@@ -100,11 +126,78 @@ class FurnitureAISuggester:
                 "navy": ["blue", "teal", "purple"]
             }
         }
+        
+        # Compile the harmony rules into color x color lookup matrices
+        self._compile_color_harmony()
+    
+    def _compile_color_harmony(self):
+        """Build dense harmony score and type matrices indexed [candidate, current]"""
+        neutral_candidates = ["white", "gray", "beige", "cream"]
+        neutral_currents = ["white", "gray"]
+        
+        vocabulary = set(self.color_hex_map) | set(neutral_candidates)
+        for rules in self.color_harmony.values():
+            for current_color, candidates in rules.items():
+                vocabulary.add(current_color)
+                vocabulary.update(candidates)
+        for furniture_info in self.furniture_database.values():
+            vocabulary.update(furniture_info["colors"])
+        
+        # The last index stands for any color outside the vocabulary
+        self.harmony_colors = sorted(vocabulary)
+        self._color_index = {color: i for i, color in enumerate(self.harmony_colors)}
+        self._other_color_index = len(self.harmony_colors)
+        size = len(self.harmony_colors) + 1
+        
+        # Type codes index into harmony_type_names
+        self.harmony_type_names = np.array(["neutral", "complementary", "analogous"])
+        scores = np.full((size, size), 0.3)
+        types = np.zeros((size, size), dtype=np.int8)
+        
+        for color in neutral_candidates:
+            scores[self._color_index[color], :] = 0.7
+        for color in neutral_currents:
+            scores[:, self._color_index[color]] = 0.7
+        
+        # Analogous first so complementary wins where both rules match
+        for type_code, (harmony, score) in ((2, ("analogous", 0.8)), (1, ("complementary", 0.9))):
+            for current_color, candidates in self.color_harmony[harmony].items():
+                for color in candidates:
+                    scores[self._color_index[color], self._color_index[current_color]] = score
+                    types[self._color_index[color], self._color_index[current_color]] = type_code
+        
+        self.harmony_score_matrix = scores
+        self.harmony_type_matrix = types
+    
+    def _color_indices(self, colors: List[str]) -> np.ndarray:
+        """Map color names to harmony matrix indices"""
+        return np.array([self._color_index.get(color, self._other_color_index) for color in colors],
+                        dtype=np.intp)
+    
+    def score_colors(self, candidates: List[str], current_colors: List[str]) -> Tuple[np.ndarray, List[str]]:
+        """Score many candidate colors against a palette with one gather and reduction"""
+        if not candidates:
+            return np.zeros(0), []
+        if not current_colors:
+            return np.full(len(candidates), 0.7), ["neutral"] * len(candidates)
+        
+        block = np.ix_(self._color_indices(candidates), self._color_indices(current_colors))
+        scores = np.minimum(self.harmony_score_matrix[block].sum(axis=1) / len(current_colors), 1.0)
+        
+        # The harmony type comes from the first current color with a rule match
+        type_block = self.harmony_type_matrix[block]
+        first_match = (type_block > 0).argmax(axis=1)
+        types = type_block[np.arange(len(candidates)), first_match]
+        return scores, self.harmony_type_names[types].tolist()
     
     def analyze_current_furniture(self, placed_models: List[Dict]) -> Dict[str, Any]:
         """Analyze the current furniture setup on the canvas"""
-        # Store models for color analysis
+        # Store models and their color profiles for color analysis
         self._current_models = placed_models
+        self._current_profiles = (
+            self.profile_store.get_many(model_id_of(model) for model in placed_models)
+            if self.profile_store else {}
+        )
         
         analysis = {
             "furniture_types": [],
@@ -112,17 +205,23 @@ class FurnitureAISuggester:
             "style_preferences": [],
             "room_type": "living_room",  # Default
             "missing_essentials": [],
-            "model_names": []  # Add model names for better analysis
+            "model_names": [],  # Add model names for better analysis
+            "classification_confidence": []
         }
         
-        # Extract furniture types and colors from placed models
-        for model in placed_models:
-            model_name = model.get('name', '')
-            analysis["model_names"].append(model_name)
-            
-            furniture_type = self.categorize_furniture(model_name.lower())
-            if furniture_type:
-                analysis["furniture_types"].append(furniture_type)
+        # Classify all placed models in a single batch
+        analysis["model_names"] = [model.get('name', '') for model in placed_models]
+        for furniture_type, confidence in self.classifier.classify_batch(analysis["model_names"]):
+            analysis["furniture_types"].append(furniture_type)
+            analysis["classification_confidence"].append(confidence)
+        
+        # Index the model footprints for position-aware suggestions
+        layout = SpatialLayoutIndex()
+        for index, (model, furniture_type) in enumerate(zip(placed_models, analysis["furniture_types"])):
+            footprint = footprint_from_model(model, self.layout_roles.get(furniture_type, "other"))
+            if footprint:
+                layout.insert(index, footprint)
+        analysis["layout"] = layout.report()
         
         # Extract dominant colors based on actual models
         analysis["dominant_colors"] = self.extract_dominant_colors(analysis)
@@ -140,22 +239,16 @@ class FurnitureAISuggester:
     
     def categorize_furniture(self, furniture_name: str) -> str:
         """Categorize furniture based on its name"""
-        furniture_keywords = {
-            "sofa": ["sofa", "couch", "sectional"],
-            "coffee_table": ["coffee table", "center table", "coffee_table"],
-            "dining_table": ["dining table", "table", "dining_table"],
-            "bed": ["bed", "mattress"],
-            "chair": ["chair", "seat", "stool"],
-            "bookshelf": ["bookshelf", "shelf", "bookcase"],
-            "wardrobe": ["wardrobe", "closet", "armoire"],
-            "lamp": ["lamp", "light", "lighting"]
-        }
-        
-        for category, keywords in furniture_keywords.items():
-            for keyword in keywords:
-                if keyword in furniture_name:
-                    return category
-        return "misc"
+        return self.classifier.classify(furniture_name)[0]
+    
+    def categorize_furniture_batch(self, furniture_names: List[str]) -> List[Dict[str, Any]]:
+        """Categorize many furniture names at once, with confidence scores"""
+        return [
+            {"name": name, "type": furniture_type, "confidence": confidence}
+            for name, (furniture_type, confidence) in zip(
+                furniture_names, self.classifier.classify_batch(furniture_names)
+            )
+        ]
     
     def determine_room_type(self, furniture_types: List[str]) -> str:
         """Determine room type based on furniture present"""
@@ -202,6 +295,21 @@ class FurnitureAISuggester:
                 }
                 suggestions.append(suggestion)
         
+        # Seating placed away from every table needs one within reach
+        unserved = analysis.get("layout", {}).get("seating_without_table", [])
+        if (unserved and len(suggestions) < limit and
+                "coffee_table" not in [s["type"] for s in suggestions]):
+            furniture_info = self.furniture_database["coffee_table"]
+            suggestions.append({
+                "furniture_type": "Coffee Table",
+                "type": "coffee_table",
+                "reason": f"No table within reach of your {', '.join(unserved[:2])}",
+                "priority": "medium",
+                "confidence": 0.8,
+                "colors": furniture_info["colors"][:3],
+                "styles": furniture_info["styles"][:2]
+            })
+        
         # Add complementary furniture
         if len(suggestions) < limit:
             for furniture_type in current_types:
@@ -226,26 +334,26 @@ class FurnitureAISuggester:
         
         return suggestions[:limit]
     
-    def suggest_colors(self, analysis: Dict[str, Any], furniture_type: str) -> List[Dict[str, Any]]:
+    def suggest_colors(self, analysis: Dict[str, Any], furniture_type: str,
+                       rng: random.Random = None) -> List[Dict[str, Any]]:
         """Suggest colors for a specific furniture type"""
-        # Get current dominant colors
-        current_colors = self.extract_dominant_colors(analysis)
+        # Get current dominant colors, reusing the ones computed by the analysis
+        current_colors = analysis.get("dominant_colors") or self.extract_dominant_colors(analysis)
         
         color_suggestions = []
         
         # Get base colors for this furniture type
         if furniture_type in self.furniture_database:
-            base_colors = self.furniture_database[furniture_type]["colors"]
+            base_colors = self.furniture_database[furniture_type]["colors"][:5]
+            harmony_scores, harmony_types = self.score_colors(base_colors, current_colors)
             
-            for color in base_colors[:5]:
-                harmony_score = self.calculate_color_harmony(color, current_colors)
-                
+            for color, harmony_score, harmony_type in zip(base_colors, harmony_scores.tolist(), harmony_types):
                 suggestion = {
                     "color": color.title(),
                     "hex_code": self.color_hex_map.get(color, "#808080"),
                     "harmony_score": harmony_score,
-                    "harmony_type": self.get_harmony_type(color, current_colors),
-                    "reason": self.get_color_reason(color, current_colors, harmony_score)
+                    "harmony_type": harmony_type,
+                    "reason": self.get_color_reason(color, current_colors, harmony_score, rng)
                 }
                 color_suggestions.append(suggestion)
         
@@ -264,7 +372,15 @@ class FurnitureAISuggester:
             # Fallback to default if no models provided
             return ["neutral", "white"]
         
+        profiles = getattr(self, '_current_profiles', {})
+        
         for model in placed_models:
+            # Prefer the real colors precomputed from the model file
+            profile = profiles.get(model_id_of(model))
+            if profile:
+                colors.extend(entry['color'] for entry in profile_colors(profile)[:2])
+                continue
+            
             model_name = model.get('name', '').lower()
             model_category = model.get('category', '').lower()
             
@@ -309,8 +425,9 @@ class FurnitureAISuggester:
             # Add detected colors to the list
             colors.extend(detected_colors)
         
-        # Remove duplicates and return most common colors
-        unique_colors = list(set(colors))
+        # Remove duplicates and return most common colors first
+        color_counts = Counter(colors)
+        unique_colors = sorted(color_counts, key=lambda color: (-color_counts[color], color))
         
         # If no colors detected, return neutral palette
         if not unique_colors:
@@ -320,40 +437,16 @@ class FurnitureAISuggester:
     
     def calculate_color_harmony(self, color: str, current_colors: List[str]) -> float:
         """Calculate how well a color harmonizes with current colors"""
-        if not current_colors:
-            return 0.7  # Neutral score for empty rooms
-        
-        harmony_score = 0.0
-        for current_color in current_colors:
-            # Check complementary harmony
-            if (current_color in self.color_harmony["complementary"] and
-                color in self.color_harmony["complementary"][current_color]):
-                harmony_score += 0.9
-            # Check analogous harmony
-            elif (current_color in self.color_harmony["analogous"] and
-                  color in self.color_harmony["analogous"][current_color]):
-                harmony_score += 0.8
-            # Neutral colors always work well
-            elif color in ["white", "gray", "beige", "cream"] or current_color in ["white", "gray"]:
-                harmony_score += 0.7
-            else:
-                harmony_score += 0.3
-        
-        return min(harmony_score / len(current_colors), 1.0)
+        return float(self.score_colors([color], current_colors)[0][0])
     
     def get_harmony_type(self, color: str, current_colors: List[str]) -> str:
         """Determine the type of color harmony"""
-        for current_color in current_colors:
-            if (current_color in self.color_harmony["complementary"] and
-                color in self.color_harmony["complementary"][current_color]):
-                return "complementary"
-            elif (current_color in self.color_harmony["analogous"] and
-                  color in self.color_harmony["analogous"][current_color]):
-                return "analogous"
-        return "neutral"
+        return self.score_colors([color], current_colors)[1][0]
     
-    def get_color_reason(self, color: str, current_colors: List[str], score: float) -> str:
+    def get_color_reason(self, color: str, current_colors: List[str], score: float,
+                         rng: random.Random = None) -> str:
         """Generate a reason for the color suggestion"""
+        rng = rng or random
         current_colors_str = ', '.join(current_colors) if current_colors else "neutral"
         
         # More specific and varied reasons based on colors and score
@@ -388,12 +481,25 @@ class FurnitureAISuggester:
         }
         
         if color in color_specific_reasons:
-            return f"{random.choice(reasons)} - {color_specific_reasons[color]}"
+            return f"{rng.choice(reasons)} - {color_specific_reasons[color]}"
         else:
-            return random.choice(reasons)
+            return rng.choice(reasons)
     
     def generate_full_suggestions(self, placed_models: List[Dict]) -> Dict[str, Any]:
-        """Generate comprehensive AI suggestions"""
+        """Generate comprehensive AI suggestions
+        
+        Results are cached by room key and must be treated as read-only.
+        """
+        room_key, placed_models = canonical_room(placed_models, self.room_key_fields)
+        suggestions = self.suggestion_cache.get(room_key)
+        if suggestions is None:
+            # Seed from the room key so the same room always gets the same suggestions
+            suggestions = self._build_full_suggestions(placed_models, random.Random(room_key))
+            self.suggestion_cache.set(room_key, suggestions)
+        return suggestions
+    
+    def _build_full_suggestions(self, placed_models: List[Dict], rng: random.Random) -> Dict[str, Any]:
+        """Build the suggestions for a room using the given random generator"""
         analysis = self.analyze_current_furniture(placed_models)
         
         furniture_suggestions = self.suggest_furniture(analysis)
@@ -402,7 +508,8 @@ class FurnitureAISuggester:
         for suggestion in furniture_suggestions:
             suggestion["color_recommendations"] = self.suggest_colors(
                 analysis, 
-                suggestion["type"]
+                suggestion["type"],
+                rng
             )
         
         return {
@@ -1,87 +1,437 @@
-from flask import Flask, jsonify, request
-from pymongo import MongoClient
+from quart import Quart, jsonify, request, send_file
 from dotenv import load_dotenv
+import asyncio
 import os
+import re
 from ai_suggestions import ai_suggester
 from thumbnail_generator import thumbnail_generator
+from catalog_index import CatalogIndex
+from room_sessions import RoomSessionStore
+from color_profiles import ColorProfileStore
+from async_io import run_cpu, run_batch, close_http_client
+from mongo_health import MongoConnection
+from admission import Overloaded, admission_controlled, admission_stats, pools
+from thumbnail_store import ThumbnailStore, KEY_PATTERN
+from shared_cache import shared_cache_stats
+from deadlines import Deadline
+from blob_cache import blob_cache
+from room_baker import BakeError, room_baker, room_key, bake
+from collision_proxies import CollisionProxyStore, collision_proxy
+from color_index import color_index, color_descriptor
+from color_profiles import profile_from_analysis
+from json_responses import FastJSONProvider, compress_response, stream_json_list
+from request_profiling import (start_trace, current_trace, finish_trace, should_profile, is_admin,
+                               stage, profile_store, PROFILE_SORT_KEYS)
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-
-# MongoDB connection
-try:
-    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
-    db = client['renderhaus']
-    # Test connection
-    client.admin.command('ping')
-    print("✅ Connected to MongoDB")
-except Exception as e:
-    print(f"⚠️  MongoDB connection failed: {e}")
-    print("📝 Server will continue without MongoDB (some features may be limited)")
-    client = None
-    db = None
+app = Quart(__name__)
+# orjson-backed jsonify (stdlib fallback) and negotiated gzip/brotli for large bodies
+app.json = FastJSONProvider(app)
+app.after_request(compress_response)
+
+@app.before_request
+async def begin_request_trace():
+    # Stage timing for every request; cProfile only when asked for or sampled
+    start_trace(request.method, request.path, should_profile(request.headers))
+
+@app.after_request
+async def end_request_trace(response):
+    trace = current_trace()
+    if trace is not None:
+        finish_trace(trace, response)
+    return response
+
+# MongoDB connection; the client is created lazily and a background monitor
+# keeps its health state fresh, so startup never waits on Mongo
+mongo = MongoConnection(
+    os.getenv('MONGODB_URI', 'mongodb://localhost:27017'),
+    db_name=os.getenv('MONGO_DB_NAME', 'renderhaus'),
+    interval=float(os.getenv('MONGO_HEALTH_INTERVAL', 10)),
+    timeout_ms=int(os.getenv('MONGO_TIMEOUT_MS', 2000))
+)
+# When set, the service is not ready while MongoDB is unreachable
+MONGO_REQUIRED = os.getenv('MONGO_REQUIRED', 'false').lower() == 'true'
+
+# In-memory index over the model catalog, refreshed in the background
+catalog_index = None
+# Generated thumbnails and baked rooms in GridFS; None until MongoDB is reachable
+thumbnail_store = None
+bake_store = None
+proxy_store = None
+
+def on_mongo_ready(db):
+    """Attach the Mongo-backed features once the database is first reachable"""
+    global catalog_index, thumbnail_store, bake_store, proxy_store
+    catalog_index = CatalogIndex(db['model3ds'])
+    catalog_index.start_auto_refresh(float(os.getenv('CATALOG_REFRESH_INTERVAL', 30)))
+    
+    # Precomputed model color profiles (see color_profiles.py)
+    ai_suggester.profile_store = ColorProfileStore(db['model_color_profiles'])
+    color_index.collection = db['model_color_profiles']
+    color_index.start_auto_refresh(float(os.getenv('COLOR_INDEX_REFRESH_INTERVAL', 30)))
+    
+    thumbnail_store = ThumbnailStore(db)
+    bake_store = ThumbnailStore(db, bucket='room_bakes', content_type='model/gltf-binary', extension='glb',
+                                cache_size=16)
+    room_baker.db = db
+    proxy_store = CollisionProxyStore(db)
+
+mongo.on_ready(on_mongo_ready)
+
+# Optionally load heavy dependencies before the first request; readiness waits for it
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'false').lower() == 'true'
+startup_state = {'warmed_up': not WARMUP_ON_START}
+
+# Editing sessions for the incremental (delta) suggestions API
+room_sessions = RoomSessionStore(
+    ai_suggester,
+    max_sessions=int(os.getenv('ROOM_SESSION_LIMIT', 1000)),
+    ttl=float(os.getenv('ROOM_SESSION_TTL', 1800)),
+    max_models=int(os.getenv('ROOM_SESSION_MAX_MODELS', 5000))
+)
+
+def suggestions_response(suggestions, **extra):
+    """Build the suggestions payload, with catalog recommendations when available"""
+    response = {
+        'status': 'success',
+        'suggestions': suggestions,
+        **extra
+    }
+    
+    # Attach real catalog models for the suggested furniture types
+    if catalog_index is not None and len(catalog_index):
+        response['catalog_recommendations'] = catalog_index.recommend(
+            [item['item'] for item in suggestions['furniture_suggestions']],
+            styles=suggestions['analysis']['style_hints']
+        )
+        # Placeholders let the client paint tiles before loading thumbnails lazily; they are
+        # stored with the catalog models, the host cache covers models not refreshed yet
+        for items in response['catalog_recommendations'].values():
+            for item in items:
+                item['placeholder'] = item['placeholder'] or thumbnail_generator.placeholder_for(item['model_url'])
+    
+    return response
+
+HEX_COLOR = re.compile(r'^#?[0-9a-fA-F]{6}$')
+
+def color_search_results(query, k, exclude_ids=(), furniture_type=None):
+    """Most similar catalog models to a color descriptor, with their catalog records"""
+    candidates = None
+    if furniture_type and catalog_index is not None:
+        index_type = catalog_index.classifier.classify_batch([furniture_type])[0][0]
+        candidates = list(catalog_index.by_type.get(index_type, ()))
+    
+    # Once the catalog is loaded, models it has dropped (deleted or deactivated) are skipped
+    keep = catalog_index.records.__contains__ if catalog_index is not None and len(catalog_index) else None
+    
+    results = []
+    for model_id, score in color_index.search(query, k, exclude_ids, candidates, keep):
+        record = catalog_index.records.get(model_id) if catalog_index is not None else None
+        item = record.to_dict() if record is not None else {'id': model_id}
+        item['score'] = round(score, 4)
+        item['placeholder'] = item.get('placeholder') or thumbnail_generator.placeholder_for(item.get('model_url'))
+        results.append(item)
+    return results
+
+def session_suggestions(session, changes=None):
+    """Apply changes to a session and generate its suggestions under the session lock"""
+    with session.lock:
+        if changes:
+            session.apply(changes)
+        return ai_suggester.generate_session_suggestions(session)
+
+# Largest thumbnail side in pixels a client may ask for
+MAX_THUMBNAIL_SIDE = int(os.getenv('MAX_THUMBNAIL_SIDE', 2048))
+
+def thumbnail_size(value):
+    """Validate a requested [width, height]; returns a tuple or None"""
+    if (not isinstance(value, (list, tuple)) or len(value) != 2
+            or not all(isinstance(side, int) and 0 < side <= MAX_THUMBNAIL_SIDE for side in value)):
+        return None
+    return tuple(value)
+
+async def render_thumbnail(model_url, size, inline=False, run=run_cpu):
+    """Render a thumbnail and return its response fields, or None on failure.
+    
+    Thumbnails are stored in GridFS and returned as a content-addressed key
+    and URL; they are returned inline as a data URI when asked for, or while
+    MongoDB is unavailable. A BlurHash placeholder is always included; with
+    MongoDB it is also stored on the catalog models rendered from the URL.
+    """
+    if inline or thumbnail_store is None:
+        result = await run(
+            thumbnail_generator.generate_thumbnail_with_placeholder,
+            model_url, 
+            output_format='base64', 
+            size=size
+        )
+        if not result:
+            return None
+        thumbnail_base64, placeholder = result
+        return {'thumbnail': f"data:image/png;base64,{thumbnail_base64}", 'placeholder': placeholder}
+    
+    result = await run(
+        thumbnail_generator.generate_thumbnail_with_placeholder,
+        model_url, 
+        output_format='bytes', 
+        size=size
+    )
+    if not result:
+        return None
+    thumbnail_png, placeholder = result
+    key = await thumbnail_store.save(thumbnail_png, placeholder)
+    if catalog_index is not None and placeholder:
+        try:
+            await run(catalog_index.save_placeholder, model_url, placeholder)
+        except Exception as e:
+            print(f"⚠️  Could not store the placeholder of {model_url}: {e}")
+    return {'thumbnailKey': key, 'thumbnailUrl': f'/api/python/thumbnails/{key}', 'placeholder': placeholder}
+
+async def batch_thumbnail(model, size, inline=False):
+    """Generate the thumbnail of one batch entry"""
+    model_id = model.get('id')
+    model_url = model.get('modelUrl')
+    
+    if not model_id or not model_url:
+        return {
+            'id': model_id,
+            'status': 'error',
+            'message': 'Both id and modelUrl are required'
+        }
+    
+    try:
+        thumbnail = await render_thumbnail(model_url, size, inline, run=run_batch)
+        
+        if thumbnail:
+            return {
+                'id': model_id,
+                'status': 'success',
+                **thumbnail
+            }
+        return {
+            'id': model_id,
+            'status': 'error',
+            'message': 'Failed to generate thumbnail'
+        }
+    except Exception as e:
+        return {
+            'id': model_id,
+            'status': 'error',
+            'message': str(e)
+        }
+
+async def bake_and_store(key, placements, instancing, deadline):
+    """Bake a room and store the GLB; complete bakes are remembered by room key"""
+    placements = await run_cpu(room_baker.resolve_urls, placements)
+    if not placements:
+        raise BakeError('None of the models could be found')
+    models, errors = await room_baker.load_models(list(dict.fromkeys(placed['url'] for placed in placements)),
+                                                  deadline)
+    if not models:
+        raise BakeError('None of the models could be downloaded')
+    glb, stats = await run_batch(bake, [placed for placed in placements if placed['url'] in models], models,
+                                 instancing)
+    
+    result = {'glb': glb, 'stats': stats, 'errors': errors}
+    if bake_store is not None:
+        result['bakeKey'] = await bake_store.save(glb)
+        if not errors:
+            room_baker.bakes.set(key, {'bakeKey': result['bakeKey'], 'stats': stats})
+    return result
+
+async def run_warm_up():
+    from startup import warm_up
+    try:
+        await run_cpu(warm_up)
+    except Exception as e:
+        print(f"⚠️  Warm-up failed: {e}")
+    startup_state['warmed_up'] = True
+
+@app.before_serving
+async def startup():
+    mongo.start_monitor()
+    if WARMUP_ON_START:
+        app.add_background_task(run_warm_up)
+
+@app.after_serving
+async def shutdown():
+    mongo.stop_monitor()
+    await close_http_client()
+
+@app.errorhandler(Overloaded)
+async def overloaded(error):
+    # Fail fast instead of letting queued work raise latency for everyone
+    return jsonify({
+        'status': 'error',
+        'message': 'Server is busy, please retry shortly',
+        'retry_after': error.retry_after
+    }), 429, {'Retry-After': str(error.retry_after)}
 
 @app.route('/api/python/test', methods=['GET'])
-def test_route():
+async def test_route():
     return jsonify({
         'status': 'success',
         'message': 'Python backend is working!'
     })
 
 @app.route('/api/python/health', methods=['GET'])
-def health_check():
-    mongodb_status = 'disconnected'
-    try:
-        if client:
-            # Test MongoDB connection
-            client.admin.command('ping')
-            mongodb_status = 'connected'
-        
+async def health_check():
+    # Reports the monitor's cached state; probes never ping MongoDB
+    state = mongo.state
+    if state['mongodb_status'] == 'connected':
         return jsonify({
             'status': 'success',
             'message': 'Python backend is healthy',
-            'mongodb_status': mongodb_status
+            'mongodb_status': 'connected',
+            'checked_at': state['checked_at']
         })
-    except Exception as e:
+    
+    return jsonify({
+        'status': 'partial',
+        'message': 'Python backend is running but MongoDB is unavailable',
+        'mongodb_status': state['mongodb_status'],
+        'checked_at': state['checked_at'],
+        'error': state['error']
+    })
+
+@app.route('/api/python/health/live', methods=['GET'])
+async def liveness_check():
+    return jsonify({
+        'status': 'success',
+        'message': 'Python backend is alive'
+    })
+
+@app.route('/api/python/health/ready', methods=['GET'])
+async def readiness_check():
+    if not startup_state['warmed_up']:
         return jsonify({
-            'status': 'partial',
-            'message': 'Python backend is running but MongoDB is unavailable',
-            'mongodb_status': 'disconnected',
-            'error': str(e)
-        })
+            'status': 'error',
+            'message': 'Warming up'
+        }), 503
+    
+    if not mongo.checked:
+        return jsonify({
+            'status': 'error',
+            'message': 'Waiting for the first MongoDB health check'
+        }), 503
+    
+    if MONGO_REQUIRED and not mongo.connected:
+        return jsonify({
+            'status': 'error',
+            'message': 'MongoDB is unavailable',
+            'mongodb_status': mongo.state['mongodb_status']
+        }), 503
+    
+    return jsonify({
+        'status': 'success',
+        'message': 'Python backend is ready',
+        'mongodb_status': mongo.state['mongodb_status']
+    })
+
+@app.route('/api/python/metrics', methods=['GET'])
+async def metrics():
+    return jsonify({
+        'status': 'success',
+        'admission': admission_stats(),
+        'shared_cache': shared_cache_stats(),
+        'blob_cache': blob_cache.stats(),
+        'color_index': color_index.stats()
+    })
 
 @app.route('/api/python/ai/suggestions', methods=['POST'])
-def get_ai_suggestions():
+@admission_controlled('interactive')
+async def get_ai_suggestions():
     try:
-        data = request.get_json()
+        with stage('parse'):
+            data = await request.get_json()
         # Handle both parameter names for compatibility
         placed_models = data.get('placedModels', data.get('current_models', []))
         
-        # Generate AI suggestions
-        suggestions = ai_suggester.generate_full_suggestions(placed_models)
+        # Generate AI suggestions on the CPU executor
+        suggestions = await run_cpu(ai_suggester.generate_full_suggestions, placed_models)
+        
+        with stage('catalog'):
+            response = await run_cpu(suggestions_response, suggestions)
+        with stage('serialize'):
+            return jsonify(response)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/python/ai/sessions', methods=['POST'])
+@admission_controlled('interactive')
+async def create_room_session():
+    try:
+        data = await request.get_json() or {}
+        placed_models = data.get('placedModels', data.get('current_models', []))
+        
+        session = await run_cpu(room_sessions.create, placed_models)
+        suggestions = await run_cpu(session_suggestions, session)
         
+        return jsonify(await run_cpu(suggestions_response, suggestions, session_id=session.session_id))
+    except ValueError as e:
         return jsonify({
-            'status': 'success',
-            'suggestions': suggestions
-        })
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+@app.route('/api/python/ai/sessions/<session_id>/changes', methods=['POST'])
+@admission_controlled('interactive')
+async def apply_room_changes(session_id):
+    try:
+        session = room_sessions.get(session_id)
+        if session is None:
+            # Expired or unknown; the client starts a new session with the full room
+            return jsonify({
+                'status': 'error',
+                'message': 'Room session not found or expired'
+            }), 404
+        
+        data = await request.get_json() or {}
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be an object')
+        suggestions = await run_cpu(session_suggestions, session, data.get('changes', []))
+        
+        return jsonify(await run_cpu(suggestions_response, suggestions, session_id=session.session_id))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/python/ai/sessions/<session_id>', methods=['DELETE'])
+async def delete_room_session(session_id):
+    room_sessions.delete(session_id)
+    return jsonify({
+        'status': 'success',
+        'message': 'Room session closed'
+    })
+
 @app.route('/api/python/ai/color-suggestions', methods=['POST'])
-def get_color_suggestions():
+@admission_controlled('interactive')
+async def get_color_suggestions():
     try:
-        data = request.get_json()
+        data = await request.get_json()
         # Handle both parameter names for compatibility
         placed_models = data.get('placedModels', data.get('current_models', []))
         furniture_type = data.get('furnitureType', 'sofa')
         
         # Analyze current setup
-        analysis = ai_suggester.analyze_current_furniture(placed_models)
+        analysis = await run_cpu(ai_suggester.analyze_current_furniture, placed_models)
         
         # Get color suggestions for specific furniture type
         color_suggestions = ai_suggester.suggest_colors(analysis, furniture_type)
@@ -98,29 +448,32 @@ def get_color_suggestions():
         }), 500
 
 @app.route('/api/python/thumbnail/generate', methods=['POST'])
-def generate_thumbnail():
+@admission_controlled('interactive')
+async def generate_thumbnail():
     try:
-        data = request.get_json()
+        data = await request.get_json()
         model_url = data.get('modelUrl')
-        size = data.get('size', [400, 400])  # Default size
+        size = thumbnail_size(data.get('size', [400, 400]))  # Default size
         
         if not model_url:
             return jsonify({
                 'status': 'error',
                 'message': 'modelUrl is required'
             }), 400
+        if size is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'size must be [width, height] in pixels, at most {MAX_THUMBNAIL_SIDE}'
+            }), 400
         
-        # Generate thumbnail from the 3D model URL
-        thumbnail_base64 = thumbnail_generator.generate_thumbnail_from_url(
-            model_url, 
-            output_format='base64', 
-            size=tuple(size)
-        )
+        # Generate thumbnail from the 3D model URL; drawing and PNG encoding run on the CPU executor
+        with stage('thumbnail'):
+            thumbnail = await render_thumbnail(model_url, size, data.get('inline', False))
         
-        if thumbnail_base64:
+        if thumbnail:
             return jsonify({
                 'status': 'success',
-                'thumbnail': f"data:image/png;base64,{thumbnail_base64}",
+                **thumbnail,
                 'message': 'Thumbnail generated successfully'
             })
         else:
@@ -136,73 +489,406 @@ def generate_thumbnail():
             'message': f'Thumbnail generation failed: {str(e)}'
         }), 500
 
+@app.route('/api/python/thumbnails/<key>', methods=['GET'])
+async def get_stored_thumbnail(key):
+    if not KEY_PATTERN.match(key):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid thumbnail key'
+        }), 400
+    
+    # Keys are content hashes, so a cached copy is valid forever
+    headers = {'ETag': f'"{key}"', 'Cache-Control': 'public, max-age=31536000, immutable'}
+    if request.headers.get('If-None-Match') == f'"{key}"':
+        return '', 304, headers
+    
+    if thumbnail_store is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Thumbnail storage is unavailable'
+        }), 503
+    
+    thumbnail_png = await run_cpu(thumbnail_store.read, key)
+    if thumbnail_png is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Thumbnail not found'
+        }), 404
+    
+    return thumbnail_png, 200, {**headers, 'Content-Type': 'image/png'}
+
 @app.route('/api/python/thumbnail/batch', methods=['POST'])
-def generate_thumbnails_batch():
+async def generate_thumbnails_batch():
     try:
-        data = request.get_json()
+        data = await request.get_json()
         models = data.get('models', [])  # Array of {id, modelUrl}
-        size = data.get('size', [400, 400])
+        size = thumbnail_size(data.get('size', [400, 400]))
         
-        if not models:
+        if not models or not isinstance(models, list) or not all(isinstance(model, dict) for model in models):
             return jsonify({
                 'status': 'error',
                 'message': 'models array is required'
             }), 400
+        if size is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'size must be [width, height] in pixels, at most {MAX_THUMBNAIL_SIDE}'
+            }), 400
         
-        results = []
+        # The batch slot is held until every thumbnail is done, not just until
+        # the response starts streaming
+        pool = pools['batch']
+        await pool.acquire()
         
-        for model in models:
-            model_id = model.get('id')
-            model_url = model.get('modelUrl')
-            
-            if not model_id or not model_url:
-                results.append({
-                    'id': model_id,
-                    'status': 'error',
-                    'message': 'Both id and modelUrl are required'
-                })
-                continue
-            
+        # Thumbnails are generated concurrently on the batch executor and
+        # streamed back in request order as they finish
+        tasks = []
+        try:
+            tasks = [asyncio.ensure_future(batch_thumbnail(model, size, data.get('inline', False)))
+                     for model in models]
+            asyncio.gather(*tasks, return_exceptions=True).add_done_callback(lambda _: pool.release())
+        except BaseException:
+            # The slot is only handed to the tasks once they are all scheduled
+            for task in tasks:
+                task.cancel()
+            pool.release()
+            raise
+        
+        async def results():
             try:
-                thumbnail_base64 = thumbnail_generator.generate_thumbnail_from_url(
-                    model_url, 
-                    output_format='base64', 
-                    size=tuple(size)
+                for task in tasks:
+                    yield await task
+            finally:
+                # Stop outstanding work if the client goes away mid-stream
+                for task in tasks:
+                    task.cancel()
+        
+        return stream_json_list(
+            'results',
+            results(),
+            {'status': 'success'},
+            trailer=lambda: {'message': f'Processed {len(tasks)} models'}
+        )
+        
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"Error in batch thumbnail generation: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Batch thumbnail generation failed: {str(e)}'
+        }), 500
+
+@app.route('/api/python/model/analyze', methods=['POST'])
+@admission_controlled('interactive')
+async def analyze_model():
+    try:
+        data = await request.get_json()
+        model_url = data.get('modelUrl')
+        
+        if not model_url:
+            return jsonify({
+                'status': 'error',
+                'message': 'modelUrl is required'
+            }), 400
+        
+        from model_analyzer import model_analyzer
+        # Optional client timeout in seconds, clamped to MAX_ANALYSIS_TIMEOUT
+        deadline = Deadline.from_request(data.get('timeout'))
+        analysis = await model_analyzer.analyze_model_from_url_async(model_url, data.get('name', ''), deadline)
+        
+        return jsonify({
+            'status': 'success',
+            'analysis': analysis
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/python/room/bake', methods=['POST'])
+@admission_controlled('batch')
+async def bake_room():
+    try:
+        data = await request.get_json()
+        objects = data.get('objects') or []
+        
+        if not objects:
+            return jsonify({
+                'status': 'error',
+                'message': 'objects array is required'
+            }), 400
+        
+        # Identical rooms share one bake, whatever order their objects were placed in
+        key, placements = await run_cpu(room_key, objects, data.get('instancing', 'gpu'))
+        inline = data.get('inline', False) or bake_store is None
+        
+        cached = None if inline else room_baker.bakes.get(key)
+        if cached is not None:
+            result = {**cached, 'errors': {}}
+        else:
+            deadline = Deadline.from_request(data.get('timeout'))
+            with stage('bake'):
+                result = await room_baker.single_flight(
+                    key, lambda: bake_and_store(key, placements, data.get('instancing', 'gpu'), deadline)
                 )
-                
-                if thumbnail_base64:
-                    results.append({
-                        'id': model_id,
-                        'status': 'success',
-                        'thumbnail': f"data:image/png;base64,{thumbnail_base64}"
-                    })
-                else:
-                    results.append({
-                        'id': model_id,
-                        'status': 'error',
-                        'message': 'Failed to generate thumbnail'
-                    })
-                    
-            except Exception as e:
-                results.append({
-                    'id': model_id,
+        
+        if inline:
+            return result['glb'], 200, {'Content-Type': 'model/gltf-binary', 'X-Room-Key': key}
+        return jsonify({
+            'status': 'success',
+            'roomKey': key,
+            'bakeKey': result['bakeKey'],
+            'url': f"/api/python/room/bakes/{result['bakeKey']}",
+            'stats': result['stats'],
+            'cached': cached is not None,
+            # Models that failed to load are left out, and the bake is not reused
+            'missing': result['errors']
+        })
+    except BakeError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except asyncio.TimeoutError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Room bake timed out'
+        }), 504
+    except Exception as e:
+        print(f"Error baking room: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Room bake failed: {str(e)}'
+        }), 500
+
+@app.route('/api/python/room/bakes/<key>', methods=['GET'])
+async def get_baked_room(key):
+    if not KEY_PATTERN.match(key):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid bake key'
+        }), 400
+    
+    # Keys are content hashes, so a cached copy is valid forever
+    headers = {'ETag': f'"{key}"', 'Cache-Control': 'public, max-age=31536000, immutable'}
+    if request.headers.get('If-None-Match') == f'"{key}"':
+        return '', 304, headers
+    
+    if bake_store is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Bake storage is unavailable'
+        }), 503
+    
+    glb = await run_cpu(bake_store.read, key)
+    if glb is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Baked room not found'
+        }), 404
+    
+    return glb, 200, {**headers, 'Content-Type': 'model/gltf-binary'}
+
+@app.route('/api/python/model/collision-proxy', methods=['POST'])
+@admission_controlled('batch')
+async def generate_collision_proxy():
+    try:
+        data = await request.get_json()
+        model_url = data.get('modelUrl')
+        
+        if not model_url:
+            return jsonify({
+                'status': 'error',
+                'message': 'modelUrl is required'
+            }), 400
+        
+        deadline = Deadline.from_request(data.get('timeout'))
+        with stage('collision_proxy'):
+            record = await collision_proxy(model_url, deadline, proxy_store, refresh=data.get('refresh', False))
+        
+        # Uploads pass the new model's id so the proxy is linked from its document
+        linked = False
+        if data.get('modelId') and proxy_store is not None:
+            linked = await run_cpu(proxy_store.link, data.get('modelType', 'Model3D'), data['modelId'], record)
+        
+        return jsonify({
+            'status': 'success',
+            'collisionProxy': record,
+            'linked': linked
+        })
+    except Exception as e:
+        print(f"Error generating collision proxy: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Collision proxy generation failed: {str(e)}'
+        }), 500
+
+@app.route('/api/python/collision-proxies/<key>', methods=['GET'])
+async def get_collision_proxy(key):
+    if not KEY_PATTERN.match(key):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid collision proxy key'
+        }), 400
+    
+    # Keys are content hashes, so a cached copy is valid forever
+    headers = {'ETag': f'"{key}"', 'Cache-Control': 'public, max-age=31536000, immutable'}
+    if request.headers.get('If-None-Match') == f'"{key}"':
+        return '', 304, headers
+    
+    if proxy_store is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Collision proxy storage is unavailable'
+        }), 503
+    
+    proxy = await run_cpu(proxy_store.files.read, key)
+    if proxy is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Collision proxy not found'
+        }), 404
+    
+    return proxy, 200, {**headers, 'Content-Type': 'application/octet-stream'}
+
+@app.route('/api/python/search/color', methods=['POST'])
+@admission_controlled('interactive')
+async def search_by_color():
+    try:
+        data = await request.get_json()
+        model_id = data.get('modelId')
+        colors = data.get('colors') or []
+        k = data.get('k', 20)
+        
+        if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+            return jsonify({
+                'status': 'error',
+                'message': 'k must be a positive integer'
+            }), 400
+        
+        # Query by an indexed model ("more in these colors") or by explicit colors
+        if model_id:
+            query = color_index.descriptor(str(model_id))
+            if query is None:
+                return jsonify({
                     'status': 'error',
-                    'message': str(e)
-                })
+                    'message': 'Model has no color profile'
+                }), 404
+        elif colors and all(isinstance(color, str) and HEX_COLOR.match(color) for color in colors):
+            query = await run_cpu(color_descriptor, colors, data.get('weights'))
+        else:
+            return jsonify({
+                'status': 'error',
+                'message': 'modelId or colors (hex, e.g. #8B4513) is required'
+            }), 400
+        
+        with stage('color_search'):
+            results = await run_cpu(color_search_results, query, k,
+                                    [str(model_id)] if model_id else [], data.get('furnitureType'))
         
         return jsonify({
             'status': 'success',
             'results': results,
-            'message': f'Processed {len(results)} models'
+            'indexed': len(color_index)
         })
+    except Exception as e:
+        print(f"Error in color search: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Color search failed: {str(e)}'
+        }), 500
+
+@app.route('/api/python/model/color-profile', methods=['POST'])
+@admission_controlled('batch')
+async def update_color_profile():
+    try:
+        data = await request.get_json()
+        model_id = data.get('modelId')
+        model_url = data.get('modelUrl')
+        
+        if not model_id or not model_url:
+            return jsonify({
+                'status': 'error',
+                'message': 'modelId and modelUrl are required'
+            }), 400
         
+        from model_analyzer import model_analyzer
+        deadline = Deadline.from_request(data.get('timeout'))
+        analysis = await model_analyzer.analyze_model_from_url_async(model_url, data.get('name', ''), deadline)
+        if analysis.get('partial') or analysis.get('error'):
+            return jsonify({
+                'status': 'error',
+                'message': analysis.get('error') or 'Model analysis did not finish in time'
+            }), 504 if analysis.get('deadline_exceeded') else 500
+        
+        # Stored for suggestions and indexed right away for color search
+        profile = profile_from_analysis(analysis)
+        if profile is not None:
+            store = ai_suggester.profile_store
+            if store is not None and store.collection is not None:
+                await run_cpu(store.save_many, {str(model_id): profile})
+            await run_cpu(color_index.apply_profiles, [dict(profile, _id=str(model_id))])
+        
+        return jsonify({
+            'status': 'success',
+            'profile': profile
+        })
     except Exception as e:
-        print(f"Error in batch thumbnail generation: {e}")
         return jsonify({
             'status': 'error',
-            'message': f'Batch thumbnail generation failed: {str(e)}'
+            'message': str(e)
         }), 500
 
+@app.route('/api/python/admin/profiles', methods=['GET'])
+async def list_profiles():
+    if not is_admin(request.headers):
+        return jsonify({
+            'status': 'error',
+            'message': 'Admin token required'
+        }), 403
+    
+    return jsonify({
+        'status': 'success',
+        'profiles': profile_store.list()
+    })
+
+@app.route('/api/python/admin/profiles/<profile_id>', methods=['GET'])
+async def download_profile(profile_id):
+    if not is_admin(request.headers):
+        return jsonify({
+            'status': 'error',
+            'message': 'Admin token required'
+        }), 403
+    
+    if profile_store.get(profile_id) is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Profile not found'
+        }), 404
+    
+    # ?format=text gives a pstats listing; the default is the raw file for snakeviz/pstats
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        limit = request.args.get('limit', '50')
+        if sort not in PROFILE_SORT_KEYS or not limit.isdigit():
+            return jsonify({
+                'status': 'error',
+                'message': f"limit must be a positive integer and sort one of {', '.join(PROFILE_SORT_KEYS)}"
+            }), 400
+        report = await run_cpu(profile_store.text_report, profile_id, int(limit), sort)
+        return report, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    
+    return await send_file(profile_store.path(profile_id), mimetype='application/octet-stream',
+                           as_attachment=True, attachment_filename=f'{profile_id}.prof')
+
 if __name__ == '__main__':
+    # Serve on Hypercorn (ASGI); equivalent to `hypercorn app:app --bind 0.0.0.0:5001`
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    
     port = int(os.getenv('PYTHON_PORT', 5001))
-    app.run(host='0.0.0.0', port=port) 
\ No newline at end of file
+    config = Config()
+    config.bind = [f"0.0.0.0:{port}"]
+    asyncio.run(serve(app, config)) 
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""Shared async I/O and CPU offloading for the ASGI app.
+
+Downloads go through one pooled ``httpx.AsyncClient`` per event loop, so a
+slow download only holds a socket, not a thread. CPU-heavy work (KMeans,
+image drawing, PNG encoding, suggestion generation) runs on a bounded
+thread pool via ``run_cpu`` so it never blocks the event loop and never
+grows past CPU_WORKERS threads. Batch work uses its own, smaller pool via
+``run_batch`` so it cannot take every thread from interactive requests.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+from request_profiling import call_profiled
+
+CPU_WORKERS = int(os.getenv('CPU_WORKERS', os.cpu_count() or 4))
+BATCH_CPU_WORKERS = int(os.getenv('BATCH_CPU_WORKERS', max(1, CPU_WORKERS // 2)))
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', 200))
+HTTP_MAX_KEEPALIVE = int(os.getenv('HTTP_MAX_KEEPALIVE', 50))
+# Largest model download accepted, in bytes
+MAX_DOWNLOAD_BYTES = int(os.getenv('MAX_DOWNLOAD_BYTES', 200 * 1024 * 1024))
+# Largest external image or buffer of a multi-file .gltf model, in bytes
+MAX_RESOURCE_BYTES = int(os.getenv('MAX_RESOURCE_BYTES', 50 * 1024 * 1024))
+
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix='cpu')
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_CPU_WORKERS, thread_name_prefix='batch')
+
+_http_client = None
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Run a blocking, CPU-bound callable on the bounded executor.
+
+    The caller's context is copied so request traces (stage timing and
+    opt-in profiling) follow the work onto the worker thread.
+    """
+    return await _run_in(cpu_executor, fn, *args, **kwargs)
+
+
+async def run_batch(fn, *args, **kwargs):
+    """Run a blocking callable on the batch executor"""
+    return await _run_in(batch_executor, fn, *args, **kwargs)
+
+
+async def _run_in(executor: ThreadPoolExecutor, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor, context.run, functools.partial(call_profiled, fn, *args, **kwargs))
+
+
+def http_client():
+    """Return the shared httpx.AsyncClient, creating it (and importing httpx) on first use"""
+    import httpx
+
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            follow_redirects=True
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client and its pooled connections"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def resolve_resource_url(model_url: str, uri: str) -> str:
+    """Resolve a glTF resource URI against the model URL; only http(s) is allowed"""
+    url = urljoin(model_url, uri)
+    if urlparse(url).scheme not in ('http', 'https'):
+        raise ValueError(f"Unsupported resource URI: {uri}")
+    return url
+
+
+async def fetch_bytes(url: str, timeout: float = 30.0, max_bytes: int = MAX_DOWNLOAD_BYTES, cache=None) -> bytes:
+    """
+    Download a URL into memory; raises on HTTP errors or oversized bodies.
+    With a BlobCache, a cached copy is revalidated and served on 304.
+    """
+    # Reading a cached model from disk can take a while; keep it off the event loop
+    entry = await run_cpu(cache.lookup, url) if cache is not None else None
+    headers = cache.conditional_headers(entry) if cache is not None else {}
+    async with http_client().stream('GET', url, timeout=timeout, headers=headers) as response:
+        if response.status_code == 304 and entry is not None:
+            return cache.not_modified(url, entry)
+        if response.status_code != 200:
+            raise Exception(f"Failed to download {url}: {response.status_code}")
+
+        chunks = []
+        received = 0
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if received > max_bytes:
+                raise Exception(f"Download of {url} exceeds {max_bytes} bytes")
+            chunks.append(chunk)
+        data = b''.join(chunks)
+        if cache is not None:
+            await run_cpu(cache.store, url, data, response.headers)
+        return data
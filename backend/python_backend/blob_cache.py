@@ -0,0 +1,147 @@
+"""On-disk cache of downloaded model files with conditional revalidation.
+
+Each URL is stored in one file, ``<sha256(url)>.blob``: a JSON header line
+holding the response's ETag / Last-Modified, followed by the raw bytes.
+Before downloading, callers ask for ``conditional_headers`` and send
+If-None-Match / If-Modified-Since; a 304 answer is served from disk, so an
+unchanged model costs one round trip instead of a full download.
+
+Files are written to a temporary name and renamed into place, so workers
+sharing the directory never see a partial file. The directory is bounded
+to BLOB_CACHE_MAX_MB; hits refresh a file's mtime and eviction removes the
+least recently used files first.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+BLOB_CACHE_DIR = os.getenv('BLOB_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'renderhaus-blobs'))
+BLOB_CACHE_MAX_BYTES = int(float(os.getenv('BLOB_CACHE_MAX_MB', 1024)) * 1024 * 1024)
+
+
+class BlobCache:
+    """Model files keyed by URL, revalidated with ETag / Last-Modified"""
+
+    def __init__(self, directory: str = BLOB_CACHE_DIR, max_bytes: int = BLOB_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.revalidated = 0
+        self.downloaded = 0
+        self.evicted = 0
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.blob')
+
+    def lookup(self, url: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """Cached validators and bytes of a URL, or None"""
+        try:
+            with open(self._path(url), 'rb') as blob:
+                meta = json.loads(blob.readline())
+                data = blob.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url or len(data) != meta.get('size'):
+            return None
+        return meta, data
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Tuple[Dict[str, Any], bytes]]) -> Dict[str, str]:
+        """Request headers that let the server answer 304 for the cached copy"""
+        if entry is None:
+            return {}
+        meta = entry[0]
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def not_modified(self, url: str, entry: Tuple[Dict[str, Any], bytes]) -> bytes:
+        """Record a 304 for a cached URL and return its bytes"""
+        self.revalidated += 1
+        try:
+            os.utime(self._path(url))
+        except OSError:
+            pass
+        return entry[1]
+
+    def store(self, url: str, data: bytes, headers) -> None:
+        """Cache a 200 response body; responses without validators are not cached"""
+        self.downloaded += 1
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        if len(data) > self.max_bytes:
+            return
+
+        meta = {'url': url, 'etag': etag, 'last_modified': last_modified, 'size': len(data),
+                'stored_at': time.time()}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as blob:
+                    blob.write(json.dumps(meta).encode('utf-8') + b'\n')
+                    blob.write(data)
+                os.replace(temp_path, self._path(url))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            print(f"Could not cache {url}: {e}")
+            return
+        self._evict()
+
+    def _evict(self):
+        """Remove least recently used files until the directory fits the size bound"""
+        with self._lock:
+            files = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith('.tmp') and stat.st_mtime < time.time() - 3600:
+                    # Left behind by a worker that died mid-write
+                    self._unlink(entry.path)
+                if not entry.name.endswith('.blob'):
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(files):
+                if not self._unlink(path):
+                    continue
+                self.evicted += 1
+                total -= size
+                if total <= self.max_bytes * 0.9:
+                    break
+
+    @staticmethod
+    def _unlink(path: str) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'revalidated': self.revalidated,
+            'downloaded': self.downloaded,
+            'evicted': self.evicted,
+            'max_bytes': self.max_bytes
+        }
+
+
+# Create global instance
+blob_cache = BlobCache()
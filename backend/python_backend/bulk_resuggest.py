@@ -0,0 +1,200 @@
+"""Regenerate the stored AI suggestions of every project.
+
+Projects are streamed from MongoDB in _id order and processed in batches:
+the models they reference are looked up with one query per collection, the
+suggestions are generated on a process pool and the results are written back
+with an unordered bulk_write. After every batch the last processed _id is
+saved to a checkpoint file, so an interrupted run resumes where it stopped.
+
+Usage:
+    python bulk_resuggest.py [--batch-size 500] [--workers 4] [--checkpoint resuggest.checkpoint.json]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+# Collections referenced by Project.objects[].modelType
+MODEL_COLLECTIONS = {
+    'Model3D': 'model3ds',
+    'Component': 'components'
+}
+MODEL_PROJECTION = {'name': 1, 'category': 1, 'dimensions': 1, 'collisionProxy.footprint': 1}
+
+
+def _init_worker(mongodb_uri: Optional[str], db_name: str):
+    """Give the worker's suggester its own connection to the color profiles, as in app.py"""
+    if not mongodb_uri:
+        return
+    from ai_suggestions import ai_suggester
+    from color_profiles import ColorProfileStore
+    ai_suggester.profile_store = ColorProfileStore(MongoClient(mongodb_uri)[db_name]['model_color_profiles'])
+
+
+def _suggest(placed_models: List[Dict]) -> Dict[str, Any]:
+    """Worker entry point; each worker process keeps its own suggester"""
+    from ai_suggestions import ai_suggester
+    return ai_suggester.generate_full_suggestions(placed_models)
+
+
+def load_checkpoint(path: str, rules_version: str = None) -> Optional[ObjectId]:
+    """Return the last processed project id of an interrupted run with the same rules"""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as checkpoint_file:
+        state = json.load(checkpoint_file)
+    if state.get('rules_version') != rules_version:
+        print(f"⚠️  Ignoring checkpoint for rules {state.get('rules_version')!r}")
+        return None
+    return ObjectId(state['last_id'])
+
+
+def save_checkpoint(path: str, last_id: ObjectId, processed: int, rules_version: str = None):
+    """Atomically record progress"""
+    if not path:
+        return
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as checkpoint_file:
+        json.dump({'last_id': str(last_id), 'processed': processed, 'rules_version': rules_version,
+                   'saved_at': datetime.now(timezone.utc).isoformat()}, checkpoint_file)
+    os.replace(temp_path, path)
+
+
+def clear_checkpoint(path: str):
+    """Forget progress once a sweep has covered every project"""
+    if path and os.path.exists(path):
+        os.unlink(path)
+
+
+def fetch_models(db, projects: List[Dict]) -> Dict[str, Dict]:
+    """Look up every model referenced by a batch of projects, one query per collection"""
+    ids_by_type = {}
+    for project in projects:
+        for placed in project.get('objects') or []:
+            ids_by_type.setdefault(placed.get('modelType', 'Model3D'), set()).add(placed.get('modelId'))
+
+    models = {}
+    for model_type, model_ids in ids_by_type.items():
+        collection = MODEL_COLLECTIONS.get(model_type)
+        if not collection:
+            continue
+        for model in db[collection].find({'_id': {'$in': list(model_ids)}}, MODEL_PROJECTION):
+            models[str(model['_id'])] = model
+    return models
+
+
+def placed_models_for(project: Dict, models: Dict[str, Dict]) -> List[Dict]:
+    """Build the suggester input for a project from its placed objects"""
+    placed_models = []
+    for placed in project.get('objects') or []:
+        model = models.get(str(placed.get('modelId')))
+        if model is None:
+            continue
+        placed_models.append({
+            'modelId': str(model['_id']),
+            'name': model.get('name', ''),
+            'category': model.get('category', ''),
+            'dimensions': model.get('dimensions'),
+            'collisionProxy': model.get('collisionProxy'),
+            'position': placed.get('position'),
+            'rotation': placed.get('rotation'),
+            'scale': placed.get('scale')
+        })
+    return placed_models
+
+
+def run(db, batch_size: int = 500, workers: int = None, checkpoint: str = None,
+        rules_version: str = None, limit: int = None, mongodb_uri: str = None) -> int:
+    """Regenerate suggestions for all projects; returns the number processed.
+
+    With ``mongodb_uri``, workers join the color profiles of ``db`` like the
+    live suggestions endpoint does. The checkpoint only survives an
+    interrupted or ``limit``-ed sweep, so the next full run starts over.
+    """
+    last_id = load_checkpoint(checkpoint, rules_version)
+    query = {'deletedAt': None}
+    if last_id is not None:
+        query['_id'] = {'$gt': last_id}
+        print(f"↩️  Resuming after project {last_id}")
+
+    cursor = db['projects'].find(query, {'objects': 1}).sort('_id', 1).batch_size(batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    workers = workers or os.cpu_count() or 1
+    processed = 0
+    seen = 0
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(mongodb_uri, db.name)) as executor:
+        batch = []
+        for project in cursor:
+            seen += 1
+            batch.append(project)
+            if len(batch) >= batch_size:
+                processed += _process_batch(db, executor, workers, batch, rules_version)
+                save_checkpoint(checkpoint, batch[-1]['_id'], processed, rules_version)
+                batch = []
+                rate = processed / max(time.monotonic() - started, 1e-9)
+                print(f"🔄 {processed} projects refreshed ({rate:.0f}/s)")
+        if batch:
+            processed += _process_batch(db, executor, workers, batch, rules_version)
+            save_checkpoint(checkpoint, batch[-1]['_id'], processed, rules_version)
+
+    if not limit or seen < limit:
+        clear_checkpoint(checkpoint)
+    print(f"✅ Refreshed suggestions for {processed} projects in {time.monotonic() - started:.1f}s")
+    return processed
+
+
+def _process_batch(db, executor: ProcessPoolExecutor, workers: int, projects: List[Dict],
+                   rules_version: Optional[str]) -> int:
+    """Generate and write suggestions for one batch of projects"""
+    models = fetch_models(db, projects)
+    inputs = [placed_models_for(project, models) for project in projects]
+
+    chunksize = max(1, len(inputs) // (workers * 4))
+    generated_at = datetime.now(timezone.utc)
+    updates = [
+        UpdateOne({'_id': project['_id']}, {'$set': {'aiSuggestions': {
+            'suggestions': suggestions,
+            'rulesVersion': rules_version,
+            'generatedAt': generated_at
+        }}})
+        for project, suggestions in zip(projects, executor.map(_suggest, inputs, chunksize=chunksize))
+    ]
+
+    if updates:
+        db['projects'].bulk_write(updates, ordered=False)
+    return len(updates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regenerate stored AI suggestions for all projects')
+    parser.add_argument('--batch-size', type=int, default=500, help='projects per batch held in memory')
+    parser.add_argument('--workers', type=int, default=None, help='suggestion worker processes')
+    parser.add_argument('--checkpoint', default='resuggest.checkpoint.json', help='progress file for resuming')
+    parser.add_argument('--rules-version', default=None, help='label stored with the regenerated suggestions')
+    parser.add_argument('--limit', type=int, default=None, help='stop after this many projects')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    args = parser.parse_args()
+
+    load_dotenv()
+    mongodb_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
+    client = MongoClient(mongodb_uri)
+    if args.restart and os.path.exists(args.checkpoint):
+        os.unlink(args.checkpoint)
+
+    run(client[os.getenv('MONGO_DB_NAME', 'renderhaus')], batch_size=args.batch_size, workers=args.workers,
+        checkpoint=args.checkpoint, rules_version=args.rules_version, limit=args.limit,
+        mongodb_uri=mongodb_uri)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+import heapq
+import re
+import threading
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable
+from furniture_classifier import FurnitureClassifier, default_classifier
+
+# Fields read from the model3ds collection; everything else stays in Mongo
+CATALOG_PROJECTION = {
+    'name': 1, 'category': 1, 'subcategory': 1, 'style': 1, 'tags': 1,
+    'materials': 1, 'downloadCount': 1, 'rating': 1, 'isActive': 1, 'updatedAt': 1,
+    'fileUrl': 1, 'modelFile.url': 1, 'thumbnailPlaceholder': 1
+}
+ACTIVE_MODELS = {'isActive': {'$ne': False}}
+
+# Color words recognised in model names, tags and materials
+PALETTE_KEYWORDS = {
+    'white': ['white', 'ivory', 'cream', 'pearl'],
+    'black': ['black', 'ebony', 'charcoal'],
+    'brown': ['brown', 'walnut', 'mahogany', 'chocolate'],
+    'wood': ['wood', 'wooden', 'oak', 'teak', 'pine', 'birch'],
+    'gray': ['gray', 'grey', 'slate', 'stone'],
+    'blue': ['blue', 'navy', 'teal', 'azure'],
+    'red': ['red', 'burgundy', 'maroon', 'crimson'],
+    'green': ['green', 'olive', 'sage', 'emerald'],
+    'yellow': ['yellow', 'gold', 'golden', 'amber'],
+    'beige': ['beige', 'tan', 'khaki', 'sand'],
+    'metal': ['metal', 'steel', 'chrome', 'brass', 'copper', 'aluminum']
+}
+
+
+class CatalogRecord:
+    """Compact in-memory view of a catalog model"""
+
+    __slots__ = ('id', 'name', 'furniture_type', 'category', 'styles', 'palette', 'popularity', 'model_url',
+                 'placeholder')
+
+    def __init__(self, id: str, name: str, furniture_type: str, category: str,
+                 styles: frozenset, palette: tuple, popularity: float, model_url: str = None,
+                 placeholder: str = None):
+        self.id = id
+        self.name = name
+        self.furniture_type = furniture_type
+        self.category = category
+        self.styles = styles
+        self.palette = palette
+        self.popularity = popularity
+        self.model_url = model_url
+        self.placeholder = placeholder
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the record as a JSON-serializable dict"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'furniture_type': self.furniture_type,
+            'category': self.category,
+            'styles': sorted(self.styles),
+            'palette': list(self.palette),
+            'model_url': self.model_url,
+            'placeholder': self.placeholder
+        }
+
+
+class CatalogIndex:
+    """In-memory recommendation index over the model catalog.
+
+    Records are kept in a dict keyed by model id, with inverted indexes by
+    furniture type and by style tag. The index loads the collection once and
+    then refreshes incrementally, either from a change stream or by polling
+    with an ``updatedAt`` watermark. Any pymongo-compatible collection works,
+    including a local stand-in such as mongomock.
+    """
+
+    def __init__(self, collection=None, classifier: FurnitureClassifier = None):
+        self.collection = collection
+        self.classifier = classifier or default_classifier()
+        self.records = {}
+        self.by_type = {}
+        self.by_style = {}
+        self.watermark = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    # ------------------------------------------------------------------
+    # Loading and refreshing
+    # ------------------------------------------------------------------
+
+    def load(self) -> int:
+        """Load every active model from the collection, replacing the index"""
+        documents = list(self.collection.find(ACTIVE_MODELS, CATALOG_PROJECTION))
+        with self._lock:
+            self.records.clear()
+            self.by_type.clear()
+            self.by_style.clear()
+            self.watermark = None
+            self._apply(documents)
+        print(f"📚 Catalog index loaded {len(self.records)} models")
+        return len(self.records)
+
+    def refresh(self) -> int:
+        """Apply models changed since the watermark; returns the number applied"""
+        if self.watermark is None:
+            return self.load()
+
+        # Deactivated models are included so _apply drops them
+        changed = list(self.collection.find({'updatedAt': {'$gte': self.watermark}}, CATALOG_PROJECTION))
+        with self._lock:
+            self._apply(changed)
+        # Hard deletes leave nothing to poll for; they show up as a smaller count
+        if self.collection.count_documents(ACTIVE_MODELS) != len(self.records):
+            self._reconcile()
+        return len(changed)
+
+    def _reconcile(self):
+        """Drop records whose models were deleted or deactivated without a newer updatedAt"""
+        active = {str(document['_id']) for document in self.collection.find(ACTIVE_MODELS, {'_id': 1})}
+        with self._lock:
+            for model_id in [model_id for model_id in self.records if model_id not in active]:
+                self._remove(model_id)
+
+    def save_placeholder(self, model_url: str, placeholder: str) -> int:
+        """Persist the BlurHash of a model's thumbnail on its catalog documents.
+
+        ``updatedAt`` is bumped only when the placeholder changes, so every
+        host's index picks it up on its next refresh. Returns the number of
+        documents changed.
+        """
+        result = self.collection.update_many(
+            {'$or': [{'fileUrl': model_url}, {'modelFile.url': model_url}],
+             'thumbnailPlaceholder': {'$ne': placeholder}},
+            {'$set': {'thumbnailPlaceholder': placeholder, 'updatedAt': datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+    def apply_change(self, change: Dict[str, Any]):
+        """Apply a single change stream event"""
+        operation = change.get('operationType')
+        with self._lock:
+            if operation == 'delete':
+                self._remove(str(change['documentKey']['_id']))
+            elif change.get('fullDocument') is not None:
+                self._apply([change['fullDocument']])
+
+    def start_auto_refresh(self, interval: float = 30.0):
+        """Keep the index fresh in a background thread.
+
+        Change streams are used when the server supports them (replica sets);
+        otherwise the thread falls back to polling with the watermark.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, args=(interval,),
+                                        name='catalog-index-refresh', daemon=True)
+        self._thread.start()
+
+    def stop_auto_refresh(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
+
+    def _refresh_loop(self, interval: float):
+        if self.watermark is None and not self.records:
+            try:
+                self.load()
+            except Exception as e:
+                print(f"⚠️  Catalog index load failed: {e}")
+
+        try:
+            pipeline = [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}}]
+            with self.collection.watch(pipeline, full_document='updateLookup') as stream:
+                print("📚 Catalog index following change stream")
+                while not self._stop.is_set():
+                    change = stream.try_next()
+                    if change is not None:
+                        self.apply_change(change)
+                    else:
+                        self._stop.wait(0.5)
+                return
+        except Exception as e:
+            print(f"📚 Change streams unavailable ({e}), polling every {interval}s")
+
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️  Catalog index refresh failed: {e}")
+
+    def _apply(self, documents: Iterable[Dict[str, Any]]):
+        """Insert or replace records; the caller holds the lock"""
+        documents = list(documents)
+        if not documents:
+            return
+
+        # Classify every changed name in one batch
+        types = self.classifier.classify_batch([document.get('name', '') for document in documents])
+        for document, (furniture_type, _) in zip(documents, types):
+            model_id = str(document['_id'])
+            self._remove(model_id)
+
+            updated_at = document.get('updatedAt')
+            if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+            if document.get('isActive') is False:
+                continue
+
+            record = self._make_record(model_id, document, furniture_type)
+            self.records[model_id] = record
+            self.by_type.setdefault(record.furniture_type, set()).add(model_id)
+            for style in record.styles:
+                self.by_style.setdefault(style, set()).add(model_id)
+
+    def _remove(self, model_id: str):
+        """Drop a record and its index entries; the caller holds the lock"""
+        record = self.records.pop(model_id, None)
+        if record is None:
+            return
+        self.by_type.get(record.furniture_type, set()).discard(model_id)
+        for style in record.styles:
+            self.by_style.get(style, set()).discard(model_id)
+
+    @staticmethod
+    def _make_record(model_id: str, document: Dict[str, Any], furniture_type: str) -> CatalogRecord:
+        styles = {tag.lower() for tag in document.get('tags') or [] if isinstance(tag, str)}
+        if document.get('style'):
+            styles.add(document['style'].lower())
+
+        materials = document.get('materials') or []
+        if isinstance(materials, str):
+            materials = [materials]
+        text = ' '.join([document.get('name', '')] + [str(material) for material in materials]
+                        + sorted(styles)).lower()
+        words = set(re.findall(r'[a-z]+', text))
+        palette = tuple(color for color, keywords in PALETTE_KEYWORDS.items()
+                        if any(keyword in words for keyword in keywords))
+
+        rating = document.get('rating') or {}
+        popularity = (rating.get('average') or 0) / 5.0 + min((document.get('downloadCount') or 0) / 1000.0, 1.0)
+
+        model_url = document.get('fileUrl') or (document.get('modelFile') or {}).get('url')
+        return CatalogRecord(model_id, document.get('name', ''), furniture_type,
+                             document.get('category', ''), frozenset(styles), palette, popularity, model_url,
+                             document.get('thumbnailPlaceholder'))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def top_k(self, furniture_type: str, styles: Iterable[str] = (), colors: Iterable[str] = (),
+              k: int = 5, exclude_ids: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Return the best k catalog items of one furniture type for a room"""
+        styles = {style.lower() for style in styles}
+        colors = set(colors)
+        exclude_ids = set(exclude_ids)
+
+        with self._lock:
+            candidates = self.by_type.get(furniture_type, set())
+
+            # Count style matches through the style index
+            style_matches = {}
+            for style in styles:
+                for model_id in candidates.intersection(self.by_style.get(style, ())):
+                    style_matches[model_id] = style_matches.get(model_id, 0) + 1
+
+            scored = []
+            for model_id in candidates:
+                if model_id in exclude_ids:
+                    continue
+                record = self.records[model_id]
+                score = (2.0 * style_matches.get(model_id, 0)
+                         + 1.0 * len(colors.intersection(record.palette))
+                         + 0.5 * record.popularity)
+                scored.append((score, model_id))
+            best = heapq.nlargest(k, scored)
+            return [dict(self.records[model_id].to_dict(), score=round(score, 3)) for score, model_id in best]
+
+    def recommend(self, furniture_types: List[str], styles: Iterable[str] = (), colors: Iterable[str] = (),
+                  k: int = 3, exclude_ids: Iterable[str] = ()) -> Dict[str, List[Dict[str, Any]]]:
+        """Recommend real catalog items for each suggested furniture type.
+
+        Suggested type names such as "floor_lamp" are mapped onto the index
+        types with the same classifier used for the catalog names.
+        """
+        styles, colors, exclude_ids = list(styles), list(colors), list(exclude_ids)
+        recommendations = {}
+        for type_name, (furniture_type, _) in zip(furniture_types, self.classifier.classify_batch(furniture_types)):
+            if type_name in recommendations or furniture_type == self.classifier.fallback:
+                continue
+            items = self.top_k(furniture_type, styles, colors, k, exclude_ids)
+            if items:
+                recommendations[type_name] = items
+        return recommendations
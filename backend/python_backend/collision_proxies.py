@@ -0,0 +1,381 @@
+"""Collision proxies: light stand-ins for a model's geometry.
+
+A proxy holds, in model space:
+
+- an oriented bounding box, the smallest by volume among the axis-aligned
+  box, boxes turned about the vertical axis to each edge of the footprint
+  (rotating calipers) and the box along the principal axes;
+- a convex hull simplified to at most MAX_HULL_VERTICES vertices, with
+  outward-facing triangles;
+- the floor footprint, the convex outline of the hull seen from above.
+
+Everything is computed from the POSITION accessors with vectorized NumPy.
+Draco-compressed positions cannot be read without a decoder; the bounds
+every POSITION accessor must declare are used for them instead.
+
+Proxies are computed once when a model is uploaded (the Node backend calls
+``/api/python/model/collision-proxy``), stored in GridFS and linked from the
+model document as ``collisionProxy``: the box, bounds and footprint inline,
+the full proxy by URL. Existing models are backfilled with this script.
+
+Usage:
+    python collision_proxies.py [--all] [--concurrency 8] [--model-id ID ...]
+
+Binary layout (little-endian), served as ``application/octet-stream``::
+
+    magic 'RHCP', uint8 version, uint8 flags,
+    uint16 hull vertex count V, uint16 hull face count F, uint16 footprint count P
+    float32[10]  box center (3), half extents (3), rotation quaternion x, y, z, w (4)
+    float32[6]   axis-aligned bounds min (3), max (3)
+    float32[V*3] hull vertices
+    uint16[F*3]  hull triangles, counter-clockwise seen from outside
+    float32[P*2] footprint outline (x, z), counter-clockwise seen from above
+"""
+import argparse
+import asyncio
+import math
+import os
+import struct
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+from deadlines import Deadline
+from room_baker import MODEL_COLLECTIONS, SourceModel, load_model, quaternion_from_rotation
+from shared_cache import SharedCache
+from thumbnail_store import ThumbnailStore
+
+PROXY_MAGIC = b'RHCP'
+PROXY_VERSION = 1
+HEADER = struct.Struct('<4sBBHHH')
+MAX_HULL_VERTICES = int(os.getenv('COLLISION_HULL_VERTICES', 64))
+
+TYPE_SIZES = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4}
+COMPONENT_TYPES = {5120: 'i1', 5121: 'u1', 5122: '<i2', 5123: '<u2', 5125: '<u4', 5126: '<f4'}
+
+
+def accessor_array(source: SourceModel, index: int):
+    """Read an accessor into an (count, components) float array, or None if it has no data"""
+    import numpy as np
+
+    accessor = source.document['accessors'][index]
+    if accessor.get('bufferView') is None:
+        return None
+    dtype = np.dtype(COMPONENT_TYPES[accessor['componentType']])
+    components = TYPE_SIZES[accessor['type']]
+    view = source.document['bufferViews'][accessor['bufferView']]
+    data = source.view_bytes(accessor['bufferView'])
+    # Strided view over interleaved vertex data, without copying
+    values = np.ndarray((accessor['count'], components), dtype=dtype, buffer=data,
+                        offset=accessor.get('byteOffset', 0),
+                        strides=(view.get('byteStride') or dtype.itemsize * components, dtype.itemsize))
+    values = values.astype(np.float64)
+    if accessor.get('normalized') and dtype.kind in 'iu':
+        limit = float(np.iinfo(dtype).max)
+        values = np.maximum(values / limit, -1.0)
+
+    sparse = accessor.get('sparse')
+    if sparse:
+        indices_type = np.dtype(COMPONENT_TYPES[sparse['indices']['componentType']])
+        indices = np.frombuffer(source.view_bytes(sparse['indices']['bufferView']), dtype=indices_type,
+                                count=sparse['count'], offset=sparse['indices'].get('byteOffset', 0))
+        replaced = np.frombuffer(source.view_bytes(sparse['values']['bufferView']), dtype=dtype,
+                                 count=sparse['count'] * components, offset=sparse['values'].get('byteOffset', 0))
+        values[indices] = replaced.reshape(-1, components)
+    return values
+
+
+def model_points(source: SourceModel):
+    """Vertex positions of every mesh in model space, as an (n, 3) array"""
+    import numpy as np
+
+    parts = []
+    for node, matrix in source.mesh_nodes():
+        for primitive in source.document['meshes'][node['mesh']]['primitives']:
+            index = primitive['attributes'].get('POSITION')
+            if index is None:
+                continue
+            points = accessor_array(source, index)
+            if points is None:
+                # Compressed positions: fall back to the declared bounds
+                accessor = source.document['accessors'][index]
+                if 'min' not in accessor or 'max' not in accessor:
+                    continue
+                corners = np.array([accessor['min'], accessor['max']], dtype=np.float64)
+                points = corners[np.indices((2, 2, 2)).reshape(3, -1).T, [0, 1, 2]]
+            parts.append(points @ matrix[:3, :3].T + matrix[:3, 3])
+    if not parts:
+        raise ValueError('Model has no readable vertex positions')
+    return np.concatenate(parts)
+
+
+def _hull(points):
+    """Convex hull of points; flat inputs (rugs, wall panels) are joggled into a solid"""
+    from scipy.spatial import ConvexHull, QhullError
+
+    try:
+        return ConvexHull(points)
+    except QhullError:
+        return ConvexHull(points, qhull_options='QJ')
+
+
+def _directions(count: int):
+    """The six axis directions plus evenly spread directions on the unit sphere"""
+    import numpy as np
+
+    axes = np.vstack([np.identity(3), -np.identity(3)])
+    spread = max(count - len(axes), 0)
+    golden = np.pi * (3.0 - math.sqrt(5.0))
+    i = np.arange(spread)
+    y = 1 - 2 * (i + 0.5) / max(spread, 1)
+    radius = np.sqrt(1 - y * y)
+    return np.vstack([axes, np.stack([np.cos(golden * i) * radius, y, np.sin(golden * i) * radius], axis=1)])
+
+
+def simplified_hull(points, max_vertices: int = MAX_HULL_VERTICES):
+    """Hull vertices and outward triangles, keeping at most max_vertices vertices.
+
+    Larger hulls keep their extreme vertex in each of max_vertices spread
+    directions; the axis-aligned extremes are always kept.
+    """
+    import numpy as np
+
+    hull = _hull(points)
+    vertices = points[hull.vertices]
+    if len(vertices) > max_vertices:
+        support = np.unique(np.argmax(vertices @ _directions(max_vertices).T, axis=0))
+        vertices = vertices[support]
+        hull = _hull(vertices)
+        vertices = vertices[hull.vertices]
+
+    # Re-index faces to the kept vertices and turn them to face outwards
+    remap = np.full(hull.points.shape[0], -1)
+    remap[hull.vertices] = np.arange(len(hull.vertices))
+    faces = remap[hull.simplices]
+    corners = vertices[faces]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    inward = np.einsum('ij,ij->i', normals, corners[:, 0] - vertices.mean(axis=0)) < 0
+    faces[inward] = faces[inward][:, ::-1]
+    return vertices, faces
+
+
+def footprint(vertices):
+    """Convex outline (x, z) of the vertices seen from above, counter-clockwise"""
+    plan = vertices[:, [0, 2]]
+    outline = plan[_hull(plan).vertices]
+    # Counter-clockwise seen from +Y means clockwise in the (x, z) plane
+    return outline[::-1]
+
+
+def oriented_box(vertices) -> Dict[str, List[float]]:
+    """Smallest of the candidate boxes around the hull vertices"""
+    import numpy as np
+
+    candidates = [np.identity(3)]
+    # Upright boxes aligned with each footprint edge; furniture is usually upright
+    outline = footprint(vertices)
+    edges = np.roll(outline, -1, axis=0) - outline
+    angles = np.unique(np.round(np.arctan2(edges[:, 1], edges[:, 0]) % (np.pi / 2), 9))
+    cos_a, sin_a = np.cos(angles), np.sin(angles)
+    upright = np.zeros((len(angles), 3, 3))
+    upright[:, 0, 0], upright[:, 2, 0] = cos_a, sin_a
+    upright[:, 1, 1] = 1.0
+    upright[:, 0, 2], upright[:, 2, 2] = -sin_a, cos_a
+    candidates.extend(upright)
+    # Principal axes, for models that are not upright
+    _, axes = np.linalg.eigh(np.cov((vertices - vertices.mean(axis=0)).T))
+    if np.linalg.det(axes) < 0:
+        axes[:, 2] = -axes[:, 2]
+    candidates.append(axes)
+
+    rotations = np.stack(candidates)
+    projected = np.einsum('nk,ckj->cnj', vertices, rotations)
+    low, high = projected.min(axis=1), projected.max(axis=1)
+    # Flat models (rugs, wall panels) have zero volume in every candidate;
+    # padding zero extents makes their boxes compare by area instead
+    sizes = high - low
+    volumes = np.prod(np.maximum(sizes, sizes.max() * 1e-6 + 1e-12), axis=1)
+    # Tilted principal axes have to be clearly smaller to win over an upright box
+    volumes[-1] *= 1.01
+    best = int(np.argmin(volumes))
+    rotation = rotations[best]
+    return {
+        'center': (rotation @ ((low[best] + high[best]) / 2)).tolist(),
+        'half_extents': ((high[best] - low[best]) / 2).tolist(),
+        'rotation': quaternion_from_rotation(rotation)
+    }
+
+
+def build_proxy(source: SourceModel) -> Dict[str, Any]:
+    """Compute the collision proxy of a loaded model"""
+    points = model_points(source)
+    vertices, faces = simplified_hull(points)
+    return {
+        'obb': oriented_box(vertices),
+        'aabb': {'min': points.min(axis=0).tolist(), 'max': points.max(axis=0).tolist()},
+        'hull_vertices': vertices,
+        'hull_faces': faces,
+        'footprint': footprint(vertices)
+    }
+
+
+def encode_proxy(proxy: Dict[str, Any]) -> bytes:
+    """Pack a proxy into the binary layout described above"""
+    import numpy as np
+
+    vertices, faces, outline = proxy['hull_vertices'], proxy['hull_faces'], proxy['footprint']
+    obb, aabb = proxy['obb'], proxy['aabb']
+    return b''.join([
+        HEADER.pack(PROXY_MAGIC, PROXY_VERSION, 0, len(vertices), len(faces), len(outline)),
+        np.asarray(obb['center'] + obb['half_extents'] + obb['rotation'] + aabb['min'] + aabb['max'],
+                   dtype='<f4').tobytes(),
+        np.asarray(vertices, dtype='<f4').tobytes(),
+        np.asarray(faces, dtype='<u2').tobytes(),
+        np.asarray(outline, dtype='<f4').tobytes()
+    ])
+
+
+def decode_proxy(data: bytes) -> Dict[str, Any]:
+    """Unpack a binary proxy"""
+    import numpy as np
+
+    magic, version, _, vertex_count, face_count, outline_count = HEADER.unpack_from(data)
+    if magic != PROXY_MAGIC or version != PROXY_VERSION:
+        raise ValueError('Not a collision proxy of a supported version')
+    offset = HEADER.size
+    box = np.frombuffer(data, dtype='<f4', count=16, offset=offset).astype(np.float64)
+    offset += 64
+    vertices = np.frombuffer(data, dtype='<f4', count=vertex_count * 3, offset=offset).reshape(-1, 3)
+    offset += vertex_count * 12
+    faces = np.frombuffer(data, dtype='<u2', count=face_count * 3, offset=offset).reshape(-1, 3)
+    offset += face_count * 6
+    outline = np.frombuffer(data, dtype='<f4', count=outline_count * 2, offset=offset).reshape(-1, 2)
+    return {
+        'obb': {'center': box[0:3].tolist(), 'half_extents': box[3:6].tolist(), 'rotation': box[6:10].tolist()},
+        'aabb': {'min': box[10:13].tolist(), 'max': box[13:16].tolist()},
+        'hull_vertices': vertices,
+        'hull_faces': faces,
+        'footprint': outline
+    }
+
+
+def proxy_summary(proxy: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-friendly part of a proxy that is stored on the model document"""
+    return {
+        'obb': {key: [round(value, 5) for value in values] for key, values in proxy['obb'].items()},
+        'aabb': {key: [round(value, 5) for value in values] for key, values in proxy['aabb'].items()},
+        'footprint': [[round(float(x), 4), round(float(z), 4)] for x, z in proxy['footprint']],
+        'hull_vertices': len(proxy['hull_vertices']),
+        'hull_faces': len(proxy['hull_faces'])
+    }
+
+
+
+class CollisionProxyStore:
+    """Binary proxies in GridFS, linked from the model documents"""
+
+    def __init__(self, db):
+        self.db = db
+        self.files = ThumbnailStore(db, bucket='collision_proxies', content_type='application/octet-stream',
+                                    extension='bin')
+
+    def link(self, model_type: str, model_id: str, record: Dict[str, Any]) -> bool:
+        """Store a proxy record on its model; returns False for unknown models"""
+        from bson import ObjectId
+        from bson.errors import InvalidId
+
+        collection = MODEL_COLLECTIONS.get(model_type)
+        if not collection:
+            return False
+        try:
+            model_id = ObjectId(model_id)
+        except InvalidId:
+            return False
+        result = self.db[collection].update_one(
+            {'_id': model_id},
+            {'$set': {'collisionProxy': dict(record, updatedAt=datetime.now(timezone.utc))}}
+        )
+        return result.matched_count > 0
+
+
+async def collision_proxy(model_url: str, deadline: Deadline, store: CollisionProxyStore = None,
+                          refresh: bool = False) -> Dict[str, Any]:
+    """Proxy record of a model, computing and storing the proxy on first use"""
+    from async_io import run_batch
+
+    record = None if refresh else proxy_records.get(model_url)
+    if record is not None and (store is None or 'key' in record):
+        return record
+
+    source = await load_model(model_url, deadline)
+    proxy = await run_batch(build_proxy, source)
+    record = proxy_summary(proxy)
+    if store is not None:
+        key = await store.files.save(encode_proxy(proxy))
+        record.update(key=key, url=f'/api/python/collision-proxies/{key}')
+    proxy_records.set(model_url, record)
+    return record
+
+
+async def build_proxies(db, store: CollisionProxyStore, only_missing: bool = True, concurrency: int = 8,
+                        model_ids: List[str] = None) -> int:
+    """Compute proxies for catalog models and link them; returns the number stored"""
+    from bson import ObjectId
+
+    query = {}
+    if model_ids:
+        query['_id'] = {'$in': [ObjectId(model_id) for model_id in model_ids]}
+    elif only_missing:
+        query['collisionProxy'] = None
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def build(model_type: str, model: Dict) -> Optional[str]:
+        url = model.get('fileUrl') or (model.get('modelFile') or {}).get('url')
+        if not url:
+            return None
+        async with semaphore:
+            try:
+                record = await collision_proxy(url, Deadline(120), store, refresh=not only_missing)
+            except Exception as e:
+                print(f"⚠️  No collision proxy for {model['_id']}: {e}")
+                return None
+        store.link(model_type, str(model['_id']), record)
+        return str(model['_id'])
+
+    tasks = [build(model_type, model)
+             for model_type, collection in MODEL_COLLECTIONS.items()
+             for model in db[collection].find(query, {'fileUrl': 1, 'modelFile.url': 1})]
+    stored = sum(1 for model_id in await asyncio.gather(*tasks) if model_id)
+    print(f"🧱 Stored {stored} collision proxies")
+    return stored
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from async_io import close_http_client
+
+    parser = argparse.ArgumentParser(description='Precompute collision proxies for catalog models')
+    parser.add_argument('--all', action='store_true', help='recompute models that already have a proxy')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent model downloads')
+    parser.add_argument('--model-id', action='append', help='only build proxies for these models')
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))[os.getenv('MONGO_DB_NAME', 'renderhaus')]
+
+    async def run():
+        try:
+            await build_proxies(db, CollisionProxyStore(db), only_missing=not args.all,
+                                concurrency=args.concurrency, model_ids=args.model_id)
+        finally:
+            await close_http_client()
+
+    asyncio.run(run())
+
+
+# Proxy records by model URL, shared by all workers; model files are immutable uploads
+proxy_records = SharedCache('collision_proxies', front_size=1024)
+
+
+if __name__ == '__main__':
+    main()
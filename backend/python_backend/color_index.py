@@ -0,0 +1,266 @@
+"""Color-similarity search over the model catalog.
+
+Every model with a color profile (see color_profiles.py) gets a fixed-length
+descriptor: a weighted CIELAB histogram over a 4 x 4 x 4 grid of bin
+centers. Each color is spread over nearby bins with a Gaussian kernel, so
+similar shades share bins, and the histogram is square-rooted and
+L2-normalized. The dot product of two descriptors is then their
+Bhattacharyya coefficient, 1.0 for identical color distributions.
+
+Descriptors are rows of one contiguous float32 matrix, so a query is a
+single matrix-vector product plus a partial sort: a few milliseconds for
+100k models (25 MB of descriptors). Rows are added, replaced and removed
+in place as profiles change; the index follows the profile collection
+with an ``updatedAt`` watermark.
+"""
+import threading
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Callable
+from color_profiles import PROFILE_PALETTE
+
+# Bin centers along L*, a* and b*
+L_CENTERS = (12.5, 37.5, 62.5, 87.5)
+AB_CENTERS = (-48.0, -16.0, 16.0, 48.0)
+DESCRIPTOR_SIZE = len(L_CENTERS) * len(AB_CENTERS) ** 2
+# Spread of a color over neighbouring bins, in CIELAB units
+BIN_SIGMA = 16.0
+MAX_RESULTS = 200
+
+
+@lru_cache(maxsize=None)
+def bin_centers():
+    """Lab coordinates of the histogram bins as a (DESCRIPTOR_SIZE, 3) array"""
+    import numpy as np
+    grid = np.meshgrid(L_CENTERS, AB_CENTERS, AB_CENTERS, indexing='ij')
+    return np.stack([axis.ravel() for axis in grid], axis=1)
+
+
+def hex_to_lab(hex_colors: List[str]):
+    """Convert '#RRGGBB' colors to CIELAB (D65) as an (n, 3) array"""
+    import numpy as np
+
+    rgb = np.array([[int(color.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4)] for color in hex_colors],
+                   dtype=np.float64) / 255.0
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ np.array([[0.4124564, 0.3575761, 0.1804375],
+                             [0.2126729, 0.7151522, 0.0721750],
+                             [0.0193339, 0.1191920, 0.9503041]]).T
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def color_descriptors(color_sets: List[Tuple[List[str], Optional[List[float]]]]):
+    """Descriptors of many weighted color sets at once, as an (n, DESCRIPTOR_SIZE) array.
+
+    Sets without colors get an all-zero row.
+    """
+    import numpy as np
+
+    owners, colors, weights = [], [], []
+    for owner, (hex_colors, color_weights) in enumerate(color_sets):
+        if not color_weights or len(color_weights) != len(hex_colors):
+            color_weights = [1.0] * len(hex_colors)
+        owners.extend([owner] * len(hex_colors))
+        colors.extend(hex_colors)
+        weights.extend(color_weights)
+
+    histograms = np.zeros((len(color_sets), DESCRIPTOR_SIZE))
+    if colors:
+        distances = ((hex_to_lab(colors)[:, None, :] - bin_centers()[None, :, :]) ** 2).sum(axis=2)
+        spread = np.exp(-distances / (2 * BIN_SIGMA ** 2))
+        spread *= (np.asarray(weights, dtype=np.float64) / np.maximum(spread.sum(axis=1), 1e-12))[:, None]
+        # Colors of one set are contiguous, so each set is one segment sum
+        owners = np.asarray(owners)
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        histograms[owners[starts]] = np.add.reduceat(spread, starts, axis=0)
+
+    histograms = np.sqrt(np.maximum(histograms, 0.0))
+    norms = np.linalg.norm(histograms, axis=1, keepdims=True)
+    return (histograms / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def color_descriptor(hex_colors: List[str], weights: List[float] = None):
+    """Descriptor of a weighted set of colors, or None without colors"""
+    descriptor = color_descriptors([(hex_colors, weights)])[0]
+    return descriptor if descriptor.any() else None
+
+
+def profile_color_set(profile: Dict[str, Any]) -> Tuple[List[str], Optional[List[float]]]:
+    """Colors and weights of a stored color profile, its raw colors when it has them"""
+    if profile.get('colors'):
+        return profile['colors'], profile.get('color_weights')
+    return [PROFILE_PALETTE[index][1] for index in profile.get('palette', [])], profile.get('weights')
+
+
+class ColorIndex:
+    """Color descriptors of catalog models in one matrix, searched by brute force"""
+
+    def __init__(self, collection=None, capacity: int = 1024):
+        self.collection = collection
+        self.capacity = capacity
+        self.matrix = None
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.watermark = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, model_id: str, descriptor):
+        """Insert or replace the descriptor of a model"""
+        import numpy as np
+
+        with self._lock:
+            row = self.rows.get(model_id)
+            if row is None:
+                if self.matrix is None or len(self.ids) == len(self.matrix):
+                    # Grow geometrically so adding n models copies O(n) rows in total
+                    grown = np.zeros((max(self.capacity, 2 * len(self.ids)), DESCRIPTOR_SIZE), dtype=np.float32)
+                    if self.matrix is not None:
+                        grown[:len(self.ids)] = self.matrix[:len(self.ids)]
+                    self.matrix = grown
+                row = len(self.ids)
+                self.ids.append(model_id)
+                self.rows[model_id] = row
+            self.matrix[row] = descriptor
+
+    def remove(self, model_id: str):
+        """Drop a model; the last row moves into its place"""
+        with self._lock:
+            row = self.rows.pop(model_id, None)
+            if row is None:
+                return
+            last = len(self.ids) - 1
+            if row != last:
+                self.matrix[row] = self.matrix[last]
+                self.ids[row] = self.ids[last]
+                self.rows[self.ids[row]] = row
+            self.ids.pop()
+
+    def descriptor(self, model_id: str):
+        with self._lock:
+            row = self.rows.get(model_id)
+            return None if row is None else self.matrix[row].copy()
+
+    def apply_profiles(self, profiles: Iterable[Dict[str, Any]], batch_size: int = 4096) -> int:
+        """Index profile documents (with ``_id``); returns the number indexed"""
+        applied = 0
+        batch = []
+        for profile in profiles:
+            batch.append(profile)
+            if len(batch) >= batch_size:
+                applied += self._apply_batch(batch)
+                batch = []
+        return applied + self._apply_batch(batch)
+
+    def _apply_batch(self, profiles: List[Dict[str, Any]]) -> int:
+        if not profiles:
+            return 0
+        descriptors = color_descriptors([profile_color_set(profile) for profile in profiles])
+        applied = 0
+        with self._lock:
+            for profile, descriptor in zip(profiles, descriptors):
+                updated_at = profile.get('updatedAt')
+                if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+                    self.watermark = updated_at
+                if not descriptor.any():
+                    self.remove(str(profile['_id']))
+                    continue
+                self.add(str(profile['_id']), descriptor)
+                applied += 1
+        return applied
+
+    # ------------------------------------------------------------------
+    # Loading and refreshing
+    # ------------------------------------------------------------------
+
+    def load(self) -> int:
+        """Index every stored profile"""
+        projection = {'palette': 1, 'weights': 1, 'colors': 1, 'color_weights': 1, 'updatedAt': 1}
+        count = self.apply_profiles(self.collection.find({}, projection))
+        print(f"🎨 Color index loaded {count} models")
+        return count
+
+    def refresh(self) -> int:
+        """Index profiles changed since the watermark"""
+        if self.watermark is None:
+            return self.load()
+        projection = {'palette': 1, 'weights': 1, 'colors': 1, 'color_weights': 1, 'updatedAt': 1}
+        return self.apply_profiles(self.collection.find({'updatedAt': {'$gte': self.watermark}}, projection))
+
+    def start_auto_refresh(self, interval: float = 30.0):
+        """Load the index and poll for new profiles in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, args=(interval,),
+                                        name='color-index-refresh', daemon=True)
+        self._thread.start()
+
+    def stop_auto_refresh(self):
+        self._stop.set()
+
+    def _refresh_loop(self, interval: float):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️  Color index refresh failed: {e}")
+            if self._stop.wait(interval):
+                return
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query, k: int = 20, exclude_ids: Iterable[str] = (),
+               candidates: Optional[Iterable[str]] = None,
+               keep: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Top-k (model id, similarity) pairs for a query descriptor, most similar first.
+
+        ``candidates`` restricts the search to the given model ids; ``keep``
+        drops ids it returns False for, e.g. models deleted from the catalog.
+        """
+        import numpy as np
+
+        k = max(1, min(int(k), MAX_RESULTS))
+        exclude_ids = set(exclude_ids)
+        with self._lock:
+            if not self.ids:
+                return []
+            if candidates is None:
+                rows = None
+                scores = self.matrix[:len(self.ids)] @ query
+            else:
+                rows = np.fromiter((self.rows[model_id] for model_id in candidates if model_id in self.rows),
+                                   dtype=np.int64)
+                scores = self.matrix[rows] @ query
+            # Room for excluded models among the best rows; widened while
+            # dropped models leave fewer than k results
+            wanted = min(k + len(exclude_ids), len(scores))
+            results = []
+            while wanted > 0:
+                best = np.argpartition(-scores, wanted - 1)[:wanted]
+                best = best[np.argsort(-scores[best], kind='stable')]
+                ids = [self.ids[row if rows is None else rows[row]] for row in best]
+                results = [(model_id, float(score)) for model_id, score in zip(ids, scores[best])
+                           if model_id not in exclude_ids and (keep is None or keep(model_id))]
+                if len(results) >= k or wanted == len(scores):
+                    break
+                wanted = min(2 * wanted, len(scores))
+        return results[:k]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'models': len(self.ids),
+            'descriptor_size': DESCRIPTOR_SIZE,
+            'bytes': 0 if self.matrix is None else int(self.matrix.nbytes)
+        }
+
+
+# Create global instance; the profile collection is attached once MongoDB is reachable
+color_index = ColorIndex()
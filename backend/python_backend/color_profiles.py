@@ -0,0 +1,204 @@
+"""Precomputed per-model color profiles.
+
+A profile is the palette ``Model3DAnalyzer`` extracts from a model's GLB,
+quantized to indices into PROFILE_PALETTE plus normalized weights, e.g.
+``{'palette': [5, 0, 2], 'weights': [0.6, 0.3, 0.1], 'source': 'glb'}``.
+Profiles are computed offline once per catalog model and looked up by model
+id in batches on the request path, so suggestions can use real colors
+without downloading or decoding anything.
+
+Usage:
+    python color_profiles.py [--all] [--workers 8] [--model-id ID ...]
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Iterable
+from suggestion_cache import TTLCache
+
+# Reference colors that profiles are quantized to. The names match the color
+# vocabulary used by the suggesters.
+PROFILE_PALETTE = [
+    ('white', '#FFFFFF'), ('cream', '#FFFDD0'), ('beige', '#F5F5DC'), ('tan', '#D2B48C'),
+    ('wood', '#DEB887'), ('brown', '#8B4513'), ('gray', '#808080'), ('silver', '#C0C0C0'),
+    ('charcoal', '#36454F'), ('black', '#000000'), ('navy', '#000080'), ('blue', '#0066CC'),
+    ('red', '#CC0000'), ('green', '#228B22'), ('yellow', '#FFD700'), ('orange', '#FF8C00')
+]
+MAX_PROFILE_COLORS = 5
+
+
+@lru_cache(maxsize=None)
+def palette_rgb():
+    """PROFILE_PALETTE as a float32 RGB array; numpy is only imported when profiles are computed"""
+    import numpy as np
+    return np.array([[int(hex_color[i:i + 2], 16) for i in (1, 3, 5)] for _, hex_color in PROFILE_PALETTE],
+                    dtype=np.float32)
+
+
+def quantize_palette(hex_colors: List[str], weights: List[float] = None) -> Dict[str, List]:
+    """Map colors to their nearest palette entries and merge their weights"""
+    import numpy as np
+
+    if not hex_colors:
+        return {'palette': [], 'weights': []}
+    if weights is None:
+        # Dominant colors come sorted by cluster size; weight them by rank
+        weights = [1.0 / (rank + 1) for rank in range(len(hex_colors))]
+
+    rgb = np.array([[int(color.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4)] for color in hex_colors],
+                   dtype=np.float32)
+    nearest = ((rgb[:, None, :] - palette_rgb()[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    totals = np.bincount(nearest, weights=np.asarray(weights, dtype=np.float64), minlength=len(PROFILE_PALETTE))
+
+    order = [int(index) for index in np.argsort(-totals, kind='stable') if totals[index] > 0][:MAX_PROFILE_COLORS]
+    total = totals[order].sum()
+    return {
+        'palette': order,
+        'weights': [round(float(totals[index] / total), 3) for index in order]
+    }
+
+
+def profile_colors(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Expand a profile into named colors, heaviest first"""
+    return [
+        {'color': PROFILE_PALETTE[index][0], 'hex': PROFILE_PALETTE[index][1], 'weight': weight}
+        for index, weight in zip(profile.get('palette', []), profile.get('weights', []))
+    ]
+
+
+def model_id_of(model: Dict[str, Any]) -> Optional[str]:
+    """Catalog id of a placed model, as sent by the editor or stored in projects"""
+    model_id = model.get('modelId') or model.get('_id')
+    if isinstance(model_id, dict):
+        model_id = model_id.get('_id')
+    return str(model_id) if model_id else None
+
+
+class ColorProfileStore:
+    """Batched, locally cached lookup of color profiles stored in MongoDB"""
+
+    # Cached marker for models without a profile, so misses are not re-queried
+    _MISSING = {}
+
+    def __init__(self, collection=None, cache_size: int = 4096, cache_ttl: float = 600.0):
+        self.collection = collection
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def get_many(self, model_ids: Iterable[Optional[str]]) -> Dict[str, Dict[str, Any]]:
+        """Return the profiles of the given models with at most one query"""
+        profiles = {}
+        missing = []
+        for model_id in set(filter(None, model_ids)):
+            profile = self.cache.get(model_id)
+            if profile is None:
+                missing.append(model_id)
+            elif profile is not self._MISSING:
+                profiles[model_id] = profile
+
+        if missing and self.collection is not None:
+            found = {
+                document['_id']: {'palette': document['palette'], 'weights': document['weights']}
+                for document in self.collection.find({'_id': {'$in': missing}},
+                                                     {'palette': 1, 'weights': 1})
+            }
+            for model_id in missing:
+                profile = found.get(model_id, self._MISSING)
+                self.cache.set(model_id, profile)
+                if profile is not self._MISSING:
+                    profiles[model_id] = profile
+        return profiles
+
+    def get(self, model_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the profile of a single model, if it has one"""
+        return self.get_many([model_id]).get(model_id)
+
+    def save_many(self, profiles: Dict[str, Dict[str, Any]]):
+        """Upsert profiles with one unordered bulk write"""
+        from pymongo import UpdateOne
+
+        if not profiles:
+            return
+        now = datetime.now(timezone.utc)
+        self.collection.bulk_write([
+            UpdateOne({'_id': model_id}, {'$set': dict(profile, updatedAt=now)}, upsert=True)
+            for model_id, profile in profiles.items()
+        ], ordered=False)
+        for model_id, profile in profiles.items():
+            self.cache.set(model_id, {'palette': profile['palette'], 'weights': profile['weights']})
+
+
+def profile_from_analysis(analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Build a profile from a Model3DAnalyzer result; name-based guesses are not stored"""
+    if analysis.get('fallback') or not analysis.get('colors'):
+        return None
+    profile = quantize_palette(analysis['colors'], analysis.get('color_weights'))
+    profile['source'] = 'material_names' if analysis.get('material_name_analysis') else 'glb'
+    # The exact shades, for the color-similarity index (see color_index.py)
+    profile['colors'] = list(analysis['colors'][:MAX_PROFILE_COLORS])
+    if analysis.get('color_weights'):
+        profile['color_weights'] = [round(float(weight), 4)
+                                    for weight in analysis['color_weights'][:MAX_PROFILE_COLORS]]
+    return profile
+
+
+def build_profiles(db, store: ColorProfileStore, only_missing: bool = True, workers: int = 8,
+                   model_ids: List[str] = None, batch_size: int = 50) -> int:
+    """Analyze catalog models and store their profiles; returns the number stored"""
+    from bson import ObjectId
+    from model_analyzer import model_analyzer
+
+    query = {'isActive': {'$ne': False}}
+    if model_ids:
+        query['_id'] = {'$in': [ObjectId(model_id) for model_id in model_ids]}
+    models = db['model3ds'].find(query, {'name': 1, 'fileUrl': 1, 'modelFile.url': 1})
+
+    if only_missing and not model_ids:
+        existing = set(store.collection.distinct('_id'))
+        models = (model for model in models if str(model['_id']) not in existing)
+
+    def analyze(model):
+        url = model.get('fileUrl') or (model.get('modelFile') or {}).get('url')
+        if not url:
+            return str(model['_id']), None
+        return str(model['_id']), profile_from_analysis(
+            model_analyzer.analyze_model_from_url(url, model.get('name', '')))
+
+    stored = 0
+    pending = {}
+    # Downloads dominate, so a thread pool keeps the analyzer busy
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for model_id, profile in executor.map(analyze, models):
+            if profile:
+                pending[model_id] = profile
+            if len(pending) >= batch_size:
+                store.save_many(pending)
+                stored += len(pending)
+                pending = {}
+    store.save_many(pending)
+    stored += len(pending)
+
+    print(f"🎨 Stored {stored} color profiles")
+    return stored
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description='Precompute color profiles for catalog models')
+    parser.add_argument('--all', action='store_true', help='recompute models that already have a profile')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent model downloads')
+    parser.add_argument('--model-id', action='append', help='only profile these models')
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
+    db = client[os.getenv('MONGO_DB_NAME', 'renderhaus')]
+    store = ColorProfileStore(db['model_color_profiles'])
+    build_profiles(db, store, only_missing=not args.all, workers=args.workers, model_ids=args.model_id)
+
+
+if __name__ == '__main__':
+    main()
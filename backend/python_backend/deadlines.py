@@ -0,0 +1,61 @@
+"""Per-request deadlines and cooperative cancellation.
+
+A ``Deadline`` is created when a request starts and handed to every stage
+of the work it triggers. Long-running stages check it between units of work
+(a download chunk, a texture) and stop early once it has expired or been
+cancelled, e.g. because the client disconnected. Work already running on an
+executor thread cannot be interrupted, so checks are cooperative.
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+ANALYSIS_TIMEOUT = float(os.getenv('ANALYSIS_TIMEOUT', 30))
+MAX_ANALYSIS_TIMEOUT = float(os.getenv('MAX_ANALYSIS_TIMEOUT', 120))
+
+
+class DeadlineExceeded(Exception):
+    """Raised by ``Deadline.check`` once the deadline has passed or been cancelled"""
+
+
+class Deadline:
+    """Point in time after which a request's remaining work is abandoned"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def from_request(cls, requested: Optional[float] = None, default: float = ANALYSIS_TIMEOUT,
+                     maximum: float = MAX_ANALYSIS_TIMEOUT) -> 'Deadline':
+        """Deadline for a client-requested timeout, clamped to the server maximum"""
+        try:
+            seconds = float(requested) if requested is not None else default
+        except (TypeError, ValueError):
+            seconds = default
+        return cls(min(max(seconds, 0.0), maximum))
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        if self._cancelled.is_set():
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self._cancelled.is_set() or time.monotonic() >= self.expires_at
+
+    def cancel(self):
+        """Stop the remaining work, e.g. when the client has gone away"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self, stage: str = ''):
+        """Raise DeadlineExceeded if the work should stop"""
+        if self.expired():
+            reason = 'cancelled' if self.cancelled else f'deadline of {self.seconds:g}s exceeded'
+            raise DeadlineExceeded(f"{reason} during {stage}" if stage else reason)
@@ -0,0 +1,133 @@
+import re
+import threading
+from typing import List, Dict, Tuple
+
+# Prototype names for each furniture category. Compound names such as
+# "table lamp" are listed explicitly so they score higher against their real
+# category than against the category of their first word.
+FURNITURE_PROTOTYPES = {
+    "sofa": ["sofa", "couch", "sectional", "loveseat", "sofa bed"],
+    "coffee_table": ["coffee table", "center table", "cocktail table"],
+    "dining_table": ["dining table", "table", "kitchen table", "dinner table"],
+    "bed": ["bed", "mattress", "double bed", "bunk bed", "bed frame"],
+    "chair": ["chair", "seat", "stool", "armchair", "dining chair", "office chair", "desk chair",
+              "bar stool"],
+    "bookshelf": ["bookshelf", "shelf", "bookcase", "shelving unit", "wall shelf"],
+    "wardrobe": ["wardrobe", "closet", "armoire"],
+    "lamp": ["lamp", "light", "lighting", "table lamp", "floor lamp", "desk lamp",
+             "bedside lamp", "ceiling light", "pendant light"],
+    # Recognised items without a category of their own. These keep names such
+    # as "desk" or "plant pot" from being pulled towards the closest category.
+    "misc": ["plant", "plant pot", "rug", "carpet", "mirror", "artwork", "wall art", "painting",
+             "nightstand", "desk", "office desk", "writing desk", "computer desk", "tv stand",
+             "cabinet", "dresser", "sideboard", "ottoman", "bench", "curtain", "vase", "sink",
+             "toilet", "bathtub", "kitchen set", "door", "window"]
+}
+
+# Descriptive words that show up in catalog names. They are part of the fitted
+# vocabulary so their n-grams count towards a name's norm, but they belong to
+# no category and therefore dilute matches that rest only on descriptors.
+DESCRIPTOR_VOCABULARY = [
+    "modern", "classic", "vintage", "rustic", "industrial", "minimalist", "contemporary",
+    "white", "black", "gray", "grey", "brown", "beige", "cream", "navy", "blue", "red",
+    "green", "yellow", "gold", "silver", "charcoal", "wood", "wooden", "oak", "walnut",
+    "metal", "glass", "marble", "leather", "fabric", "velvet", "small", "large", "tall",
+    "king size", "queen size", "model", "set", "new", "old", "low poly", "high poly"
+]
+
+
+class FurnitureClassifier:
+    """Character n-gram TF-IDF classifier for furniture model names.
+
+    The prototype vectors are fitted once, on first use, so creating a
+    classifier does not import scikit-learn. Classifying a batch of names is
+    a single sparse matrix multiply followed by a per-category max over that
+    category's prototypes.
+    """
+
+    def __init__(self, prototypes: Dict[str, List[str]] = None, min_confidence: float = 0.35,
+                 fallback: str = "misc"):
+        prototypes = prototypes or FURNITURE_PROTOTYPES
+        self.min_confidence = min_confidence
+        self.fallback = fallback
+        self.categories = list(prototypes.keys())
+
+        # Prototypes are laid out contiguously per category so the per-category
+        # max can be taken with a single reduceat over the similarity columns
+        self._documents = []
+        self._category_offsets = []
+        for category in self.categories:
+            self._category_offsets.append(len(self._documents))
+            self._documents.extend(self._normalize(name) for name in prototypes[category])
+
+        self.vectorizer = None
+        self._prototype_matrix = None
+        self._fit_lock = threading.Lock()
+
+    def fit(self):
+        """Fit the prototype vectors; called automatically on first use"""
+        with self._fit_lock:
+            if self.vectorizer is not None:
+                return
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 4), sublinear_tf=True)
+            vectorizer.fit(self._documents + [self._normalize(word) for word in DESCRIPTOR_VOCABULARY])
+            # Rows are L2-normalised, so the dot product is the cosine similarity
+            self._prototype_matrix = vectorizer.transform(self._documents).T.tocsr()
+            self.vectorizer = vectorizer
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        """Lowercase a name and collapse separators into single spaces"""
+        return re.sub(r'[\s_\-\.]+', ' ', (name or '').lower()).strip()
+
+    def score_batch(self, names: List[str]):
+        """Return a (len(names), len(categories)) matrix of category similarities"""
+        import numpy as np
+
+        if self.vectorizer is None:
+            self.fit()
+        if not names:
+            return np.zeros((0, len(self.categories)))
+
+        vectors = self.vectorizer.transform([self._normalize(name) for name in names])
+        similarities = (vectors @ self._prototype_matrix).toarray()
+        return np.maximum.reduceat(similarities, self._category_offsets, axis=1)
+
+    def classify_batch(self, names: List[str]) -> List[Tuple[str, float]]:
+        """Classify many names at once, returning (category, confidence) pairs"""
+        import numpy as np
+
+        scores = self.score_batch(names)
+        if scores.shape[0] == 0:
+            return []
+
+        best = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(best)), best]
+
+        results = []
+        for index, confidence in zip(best, confidences):
+            if confidence < self.min_confidence:
+                results.append((self.fallback, round(float(confidence), 3)))
+            else:
+                results.append((self.categories[index], round(float(confidence), 3)))
+        return results
+
+    def classify(self, name: str) -> Tuple[str, float]:
+        """Classify a single name"""
+        return self.classify_batch([name])[0]
+
+
+_default_classifier = None
+_default_lock = threading.Lock()
+
+
+def default_classifier() -> FurnitureClassifier:
+    """Process-wide classifier over the built-in prototypes, shared by the catalog and suggesters"""
+    global _default_classifier
+    if _default_classifier is None:
+        with _default_lock:
+            if _default_classifier is None:
+                _default_classifier = FurnitureClassifier()
+    return _default_classifier
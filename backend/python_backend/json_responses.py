@@ -0,0 +1,207 @@
+"""Fast JSON serialization, compression and streaming for API responses.
+
+- ``dumps`` uses orjson when it is installed (JSON_BACKEND=auto|orjson|stdlib)
+  and falls back to the stdlib encoder for anything orjson rejects.
+- ``FastJSONProvider`` plugs it into ``jsonify``.
+- ``compress_response`` is an after-request hook that gzip/brotli-encodes
+  bodies above COMPRESS_MIN_SIZE bytes when the client accepts it.
+- ``stream_json_list`` streams a list-shaped payload item by item instead
+  of building the whole document in memory first.
+"""
+import gzip
+import json
+import os
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional, AsyncIterable, Iterable, Union
+from quart import request
+from quart.json.provider import JSONProvider
+from quart.wrappers.response import DataBody
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto').lower()
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1400))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+# Bodies above this size are compressed on the CPU executor instead of the event loop
+COMPRESS_OFFLOAD_SIZE = 256 * 1024
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+_use_orjson = orjson is not None and JSON_BACKEND != 'stdlib'
+if JSON_BACKEND == 'orjson' and orjson is None:
+    print("⚠️  JSON_BACKEND=orjson but orjson is not installed; using the stdlib encoder")
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """Serialize types neither encoder handles natively (numpy, ObjectId, sets, ...)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, 'tolist'):
+        # numpy arrays and scalars
+        return value.tolist()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a value to compact UTF-8 JSON"""
+    if _use_orjson:
+        try:
+            return orjson.dumps(value, default=_default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # e.g. integers above 64 bits; the stdlib encoder handles those
+            pass
+    return json.dumps(value, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON text or bytes"""
+    if _use_orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """JSON provider for ``jsonify`` and ``request.get_json`` backed by ``dumps``/``loads``"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        # Hand the encoded bytes straight to the response, skipping a str round trip
+        return self._app.response_class(dumps(self._prepare_response_obj(args, kwargs)),
+                                        mimetype=self.mimetype)
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Pick the best content encoding the client accepts: br, then gzip"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality('br') > 0:
+        return 'br'
+    if accepted.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a complete body"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL)
+
+
+def _compressible(response) -> bool:
+    content_type = response.content_type or ''
+    return (any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+            and 'Content-Encoding' not in response.headers)
+
+
+async def compress_response(response):
+    """After-request hook: compress large, buffered, compressible bodies"""
+    from async_io import run_cpu
+
+    if not isinstance(response.response, DataBody) or not _compressible(response):
+        return response
+    data = response.response.data
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if len(data) > COMPRESS_OFFLOAD_SIZE:
+        compressed = await run_cpu(compress, data, encoding)
+    else:
+        compressed = compress(data, encoding)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class _StreamCompressor:
+    """Incremental gzip or brotli compressor for streamed bodies"""
+
+    def __init__(self, encoding: str):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            # wbits 16 + MAX_WBITS writes a gzip header and trailer
+            self._compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush per chunk so each item reaches the client as soon as it is ready
+        return self._compress(data) + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def stream_json_list(key: str, items: Union[Iterable, AsyncIterable], fields: Dict[str, Any] = None,
+                     trailer=None, status: int = 200):
+    """Stream ``{**fields, key: [items...], **trailer()}`` one list item at a time.
+
+    ``items`` may be a sync or async iterable; ``trailer`` is an optional
+    callable returning the fields written after the list, so they can
+    depend on what was streamed. The body is compressed on the fly when
+    the client accepts gzip or brotli.
+    """
+    from quart import current_app
+
+    encoding = negotiate_encoding()
+    head = dumps(dict(fields or {}))
+    head = (head[:-1] + b',' if len(head) > 2 else b'{') + dumps(key) + b':['
+
+    async def generate():
+        compressor = _StreamCompressor(encoding) if encoding else None
+        emit = compressor.chunk if compressor else (lambda data: data)
+
+        yield emit(head)
+        separator = b''
+        if hasattr(items, '__aiter__'):
+            async for item in items:
+                yield emit(separator + dumps(item))
+                separator = b','
+        else:
+            for item in items:
+                yield emit(separator + dumps(item))
+                separator = b','
+
+        tail = dumps(trailer() if trailer else {})
+        yield emit(b']' + (b',' + tail[1:] if len(tail) > 2 else b'}'))
+        if compressor:
+            yield compressor.finish()
+
+    response = current_app.response_class(generate(), status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
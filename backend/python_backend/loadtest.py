@@ -0,0 +1,483 @@
+"""End-to-end load test of the Python API.
+
+Starts ``app.py`` on a local port against local stand-ins, replays a mix of
+realistic requests and writes per-endpoint throughput, latency percentiles
+and error rates to a JSON report:
+
+- a static file server for generated GLB models (textured, one per catalog
+  entry), so thumbnail and analysis calls resolve real URLs;
+- MongoDB: the URI given with --mongodb-uri, or a throwaway ``mongod``
+  started in a temp directory when one is on PATH. The scratch database
+  (LOADTEST_DB_NAME, default renderhaus_loadtest) is seeded with a catalog
+  pointing at the static server and dropped afterwards. Without either,
+  the app runs with MongoDB unavailable, as it does in degraded mode.
+
+Rooms sent to the suggestion endpoints hold between --room-min and
+--room-max models (log-uniform, so small rooms are the most common), with
+positions, rotations and scales.
+
+Usage:
+    python loadtest.py [--duration 30] [--concurrency 32]
+                       [--mix suggestions=50,color=15,thumbnail=25,batch=10,analyze=0]
+                       [--output loadtest-report.json] [--url http://localhost:5001]
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple
+from furniture_classifier import FURNITURE_PROTOTYPES
+
+DEFAULT_MIX = 'suggestions=50,color=15,thumbnail=25,batch=10,analyze=0'
+CATALOG_SIZE = 40
+# Seeded and dropped by the harness; never the application database
+SCRATCH_DB = os.getenv('LOADTEST_DB_NAME', 'renderhaus_loadtest')
+if SCRATCH_DB == 'renderhaus':
+    raise SystemExit('LOADTEST_DB_NAME must not be the application database')
+
+STYLES = ['modern', 'classic', 'industrial', 'rustic', 'minimalist', 'scandinavian']
+COLORS = ['white', 'black', 'gray', 'walnut', 'oak', 'navy', 'beige', 'green']
+CATEGORIES = {'sofa': 'living', 'coffee_table': 'living', 'dining_table': 'dining', 'bed': 'bedroom',
+              'chair': 'living', 'bookshelf': 'storage', 'wardrobe': 'bedroom', 'lamp': 'lighting',
+              'misc': 'decor'}
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+# --- Stand-ins -----------------------------------------------------------------
+
+def build_glb(rng: random.Random) -> bytes:
+    """A small GLB with one textured material, enough for the analyzer to chew on"""
+    from PIL import Image
+
+    image = Image.new('RGB', (64, 64), tuple(rng.randrange(256) for _ in range(3)))
+    accent = tuple(rng.randrange(256) for _ in range(3))
+    for x in range(rng.randrange(8, 32)):
+        for y in range(64):
+            image.putpixel((x, y), accent)
+    png = io.BytesIO()
+    image.save(png, format='PNG')
+    png = png.getvalue()
+
+    document = {
+        'asset': {'version': '2.0'},
+        'buffers': [{'byteLength': len(png)}],
+        'bufferViews': [{'buffer': 0, 'byteLength': len(png)}],
+        'images': [{'bufferView': 0, 'mimeType': 'image/png'}],
+        'textures': [{'source': 0}],
+        'materials': [{'name': 'surface', 'pbrMetallicRoughness': {'baseColorTexture': {'index': 0}}}]
+    }
+    json_chunk = json.dumps(document).encode('utf-8')
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+    bin_chunk = png + b'\0' * (-len(png) % 4)
+    length = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+    return (b'glTF' + struct.pack('<II', 2, length)
+            + struct.pack('<I4s', len(json_chunk), b'JSON') + json_chunk
+            + struct.pack('<I4s', len(bin_chunk), b'BIN\0') + bin_chunk)
+
+
+def build_catalog(rng: random.Random, size: int = CATALOG_SIZE) -> List[Dict[str, Any]]:
+    """Catalog entries spread over every furniture type"""
+    furniture_types = list(FURNITURE_PROTOTYPES)
+    catalog = []
+    for index in range(size):
+        furniture_type = furniture_types[index % len(furniture_types)]
+        base_name = rng.choice(FURNITURE_PROTOTYPES[furniture_type])
+        catalog.append({
+            'file': f'model-{index}.glb',
+            'name': f'{rng.choice(STYLES).title()} {rng.choice(COLORS).title()} {base_name.title()}',
+            'category': CATEGORIES[furniture_type],
+            'style': rng.choice(STYLES),
+            'dimensions': {'width': round(rng.uniform(0.4, 2.5), 2), 'height': round(rng.uniform(0.3, 2.2), 2),
+                           'depth': round(rng.uniform(0.4, 2.2), 2)}
+        })
+    return catalog
+
+
+class StaticModelServer:
+    """Serves generated GLBs from a temp directory on a background thread"""
+
+    def __init__(self, catalog: List[Dict[str, Any]], rng: random.Random):
+        self.directory = tempfile.mkdtemp(prefix='renderhaus-loadtest-models-')
+        for entry in catalog:
+            with open(os.path.join(self.directory, entry['file']), 'wb') as model_file:
+                model_file.write(build_glb(rng))
+
+        class QuietHandler(SimpleHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=self.directory))
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, entry: Dict[str, Any]) -> str:
+        return f"{self.base_url}/{entry['file']}"
+
+    def stop(self):
+        self.server.shutdown()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class LocalMongo:
+    """A throwaway mongod in a temp directory"""
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='renderhaus-loadtest-mongo-')
+        self.port = _free_port()
+        self.process = subprocess.Popen(
+            ['mongod', '--dbpath', self.directory, '--port', str(self.port), '--bind_ip', '127.0.0.1'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not _wait_for_port(self.port, 30):
+            self.stop()
+            raise RuntimeError('mongod did not start')
+        self.uri = f'mongodb://127.0.0.1:{self.port}'
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def seed_catalog(uri: str, catalog: List[Dict[str, Any]], models: StaticModelServer):
+    """Fill the scratch database's model3ds collection"""
+    from pymongo import MongoClient
+
+    collection = MongoClient(uri)[SCRATCH_DB]['model3ds']
+    collection.delete_many({})
+    now = datetime.now(timezone.utc)
+    collection.insert_many([{
+        'name': entry['name'], 'category': entry['category'], 'style': entry['style'],
+        'tags': [entry['style']], 'fileUrl': models.url(entry), 'isActive': True,
+        'downloadCount': index, 'rating': 4.0, 'updatedAt': now
+    } for index, entry in enumerate(catalog)])
+
+
+def drop_scratch_db(uri: str):
+    from pymongo import MongoClient
+    MongoClient(uri).drop_database(SCRATCH_DB)
+
+
+def start_app(port: int, mongodb_uri: str, log_path: str) -> subprocess.Popen:
+    """Run app.py as it runs in production (Hypercorn) on the given port"""
+    env = dict(os.environ, PYTHON_PORT=str(port), MONGODB_URI=mongodb_uri, MONGO_DB_NAME=SCRATCH_DB,
+               WARMUP_ON_START='true', PYTHONUNBUFFERED='1')
+    log_file = open(log_path, 'w')
+    return subprocess.Popen([sys.executable, 'app.py'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+async def wait_until_ready(client, base_url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get(f'{base_url}/api/python/health/ready')
+            if response.status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f'{base_url} did not become ready within {timeout:.0f}s')
+
+
+# --- Traffic -------------------------------------------------------------------
+
+class TrafficGenerator:
+    """Builds request bodies for each endpoint of the mix"""
+
+    def __init__(self, catalog: List[Dict[str, Any]], models: StaticModelServer, rng: random.Random,
+                 room_min: int = 1, room_max: int = 500, batch_size: int = 10):
+        self.catalog = catalog
+        self.models = models
+        self.rng = rng
+        self.room_min = room_min
+        self.room_max = room_max
+        self.batch_size = batch_size
+
+    def room_size(self) -> int:
+        """Log-uniform between room_min and room_max: most rooms are small, some are huge"""
+        low, high = math.log(self.room_min), math.log(self.room_max + 1)
+        return min(self.room_max, int(math.exp(self.rng.uniform(low, high))))
+
+    def placed_model(self) -> Dict[str, Any]:
+        entry = self.rng.choice(self.catalog)
+        return {
+            'name': entry['name'],
+            'category': entry['category'],
+            'dimensions': entry['dimensions'],
+            'position': [round(self.rng.uniform(-6, 6), 2), 0, round(self.rng.uniform(-6, 6), 2)],
+            'rotation': [0, round(self.rng.uniform(0, 2 * math.pi), 3), 0],
+            'scale': [1, 1, 1]
+        }
+
+    def room(self) -> List[Dict[str, Any]]:
+        return [self.placed_model() for _ in range(self.room_size())]
+
+    def request(self, endpoint: str):
+        """Method, path and JSON body of one request"""
+        if endpoint == 'suggestions':
+            return 'POST', '/api/python/ai/suggestions', {'current_models': self.room()}
+        if endpoint == 'color':
+            furniture_type = self.rng.choice(['sofa', 'chair', 'coffee_table', 'dining_table', 'bed'])
+            return 'POST', '/api/python/ai/color-suggestions', {'placedModels': self.room(),
+                                                                 'furnitureType': furniture_type}
+        if endpoint == 'thumbnail':
+            size = self.rng.choice([[200, 200], [400, 400]])
+            return 'POST', '/api/python/thumbnail/generate', {
+                'modelUrl': self.models.url(self.rng.choice(self.catalog)), 'size': size}
+        if endpoint == 'batch':
+            entries = self.rng.sample(self.catalog, min(self.batch_size, len(self.catalog)))
+            return 'POST', '/api/python/thumbnail/batch', {
+                'models': [{'id': index + 1, 'modelUrl': self.models.url(entry)} for index, entry in enumerate(entries)]}
+        if endpoint == 'analyze':
+            entry = self.rng.choice(self.catalog)
+            return 'POST', '/api/python/model/analyze', {'modelUrl': self.models.url(entry), 'name': entry['name']}
+        raise ValueError(f'Unknown endpoint: {endpoint}')
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    weights = {name: weight for name, weight in weights.items() if weight > 0}
+    if not weights:
+        raise ValueError('The mix must give at least one endpoint a positive weight')
+    return weights
+
+
+class EndpointStats:
+    """Latencies and outcomes of one endpoint"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+        self.shed = 0
+
+    def record(self, latency: float, status: str, error: bool):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == '429':
+            self.shed += 1
+        elif error:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(count - 1, math.ceil(fraction * count) - 1)] * 1000, 1)
+
+        return {
+            'requests': count,
+            'rps': round(count / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(latencies[-1] * 1000, 1) if latencies else None,
+            'errors': self.errors,
+            'error_rate': round(self.errors / count, 4) if count else 0.0,
+            'shed_429': self.shed,
+            'statuses': self.statuses
+        }
+
+
+async def _send(client, base_url: str, method: str, path: str, body) -> Tuple[str, bool]:
+    """Issue one request and read the whole body; returns (status, is_error)"""
+    try:
+        response = await client.request(method, base_url + path, json=body)
+        payload = response.content
+    except Exception as e:
+        return type(e).__name__, True
+    if response.status_code >= 400:
+        return str(response.status_code), True
+    try:
+        # Streamed batch results carry their status in the body
+        error = json.loads(payload).get('status') == 'error'
+    except ValueError:
+        error = True
+    return str(response.status_code), error
+
+
+async def run_load(base_url: str, traffic: TrafficGenerator, mix: Dict[str, float], concurrency: int,
+                   duration: float, max_requests: Optional[int], timeout: float) -> Dict[str, Any]:
+    """Drive the mix with `concurrency` closed-loop clients and collect per-endpoint stats"""
+    import httpx
+
+    endpoints, weights = list(mix), list(mix.values())
+    stats = {endpoint: EndpointStats() for endpoint in endpoints}
+    issued = 0
+    stop_at = time.monotonic() + duration
+
+    async def worker(client):
+        nonlocal issued
+        while time.monotonic() < stop_at and (max_requests is None or issued < max_requests):
+            issued += 1
+            endpoint = traffic.rng.choices(endpoints, weights)[0]
+            method, path, body = traffic.request(endpoint)
+            started = time.perf_counter()
+            status, error = await _send(client, base_url, method, path, body)
+            stats[endpoint].record(time.perf_counter() - started, status, error)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    total = EndpointStats()
+    for endpoint_stats in stats.values():
+        total.latencies.extend(endpoint_stats.latencies)
+        for status, count in endpoint_stats.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+        total.errors += endpoint_stats.errors
+        total.shed += endpoint_stats.shed
+
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'total': total.summary(elapsed),
+        'endpoints': {endpoint: endpoint_stats.summary(elapsed) for endpoint, endpoint_stats in stats.items()}
+    }
+
+
+async def fetch_metrics(base_url: str) -> Optional[Dict[str, Any]]:
+    import httpx
+
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            return (await client.get(f'{base_url}/api/python/metrics')).json()
+    except Exception:
+        return None
+
+
+def print_summary(report: Dict[str, Any]):
+    print(f"\n{'endpoint':<14}{'requests':>10}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'errors':>8}{'429':>6}")
+    rows = list(report['results']['endpoints'].items()) + [('total', report['results']['total'])]
+    for name, summary in rows:
+        print(f"{name:<14}{summary['requests']:>10}{summary['rps']:>9.1f}{summary['p50_ms'] or 0:>9.1f}"
+              f"{summary['p95_ms'] or 0:>9.1f}{summary['p99_ms'] or 0:>9.1f}"
+              f"{summary['error_rate']:>8.1%}{summary['shed_429']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Python API against local stand-ins')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--requests', type=int, default=None, help='stop after this many requests')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent closed-loop clients')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='endpoint weights, e.g. suggestions=5,thumbnail=1')
+    parser.add_argument('--room-min', type=int, default=1, help='fewest models per room')
+    parser.add_argument('--room-max', type=int, default=500, help='most models per room')
+    parser.add_argument('--batch-size', type=int, default=10, help='models per batch thumbnail call')
+    parser.add_argument('--timeout', type=float, default=60, help='per-request client timeout in seconds')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for catalog and traffic')
+    parser.add_argument('--output', default='loadtest-report.json', help='JSON report path')
+    parser.add_argument('--url', default=None, help='test an already running app instead of starting one')
+    parser.add_argument('--mongodb-uri', default=None, help='MongoDB to seed and use (scratch database)')
+    parser.add_argument('--app-log', default='loadtest-app.log', help='where the started app logs to')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    catalog = build_catalog(rng)
+    models = StaticModelServer(catalog, rng)
+    local_mongo = None
+    app_process = None
+    mongodb_uri = args.mongodb_uri
+    mongo_mode = 'external' if mongodb_uri else 'none'
+
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+            mongo_mode = 'unmanaged'
+        else:
+            if not mongodb_uri and shutil.which('mongod'):
+                local_mongo = LocalMongo()
+                mongodb_uri = local_mongo.uri
+                mongo_mode = 'local mongod'
+            if mongodb_uri:
+                seed_catalog(mongodb_uri, catalog, models)
+            else:
+                print('⚠️  No MongoDB available; the app runs with MongoDB unavailable')
+
+            port = _free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            # An unroutable address keeps the app in degraded mode without Mongo
+            app_process = start_app(port, mongodb_uri or 'mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=500',
+                                    args.app_log)
+
+        async def scenario():
+            import httpx
+            async with httpx.AsyncClient(timeout=5) as client:
+                await wait_until_ready(client, base_url)
+            print(f"🚀 Load: {args.concurrency} clients for {args.duration:g}s against {base_url} mix {mix}")
+            results = await run_load(base_url, TrafficGenerator(catalog, models, rng, args.room_min, args.room_max,
+                                                                args.batch_size),
+                                     mix, args.concurrency, args.duration, args.requests, args.timeout)
+            return results, await fetch_metrics(base_url)
+
+        results, server_metrics = asyncio.run(scenario())
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            try:
+                app_process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                app_process.kill()
+        if mongodb_uri and not args.url:
+            drop_scratch_db(mongodb_uri)
+        if local_mongo is not None:
+            local_mongo.stop()
+        models.stop()
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'duration_s': args.duration, 'max_requests': args.requests, 'concurrency': args.concurrency,
+            'mix': mix, 'room_size': [args.room_min, args.room_max], 'batch_size': args.batch_size,
+            'seed': args.seed, 'mongo': mongo_mode, 'target': args.url or 'app.py'
+        },
+        'results': results,
+        'server_metrics': server_metrics
+    }
+    with open(args.output, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    print_summary(report)
+    print(f"\n📝 Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
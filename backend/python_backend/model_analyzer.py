@@ -1,61 +1,276 @@
 import json
 import requests
+import struct
 import tempfile
+import threading
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Tuple
 import numpy as np
 from PIL import Image, ImageStat
-from pygltflib import GLTF2
 import base64
 from io import BytesIO
 import colorsys
-from sklearn.cluster import KMeans
-import cv2
+from shared_cache import SharedCache
+from async_io import MAX_DOWNLOAD_BYTES, MAX_RESOURCE_BYTES, resolve_resource_url
+from deadlines import Deadline, DeadlineExceeded, ANALYSIS_TIMEOUT
+from blob_cache import blob_cache
+
+# Limits for the external images and buffers of multi-file .gltf models
+MAX_EXTERNAL_RESOURCES = int(os.getenv('MAX_EXTERNAL_RESOURCES', 32))
+RESOURCE_FETCH_WORKERS = int(os.getenv('RESOURCE_FETCH_WORKERS', 16))
+
+_http_session = None
+_resource_executor = None
+_session_lock = threading.Lock()
+
+
+def _session() -> Tuple[requests.Session, ThreadPoolExecutor]:
+    """Pooled session and fetch threads shared by the synchronous download path"""
+    global _http_session, _resource_executor
+    with _session_lock:
+        if _http_session is None:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=RESOURCE_FETCH_WORKERS)
+            _http_session = requests.Session()
+            _http_session.mount('http://', adapter)
+            _http_session.mount('https://', adapter)
+            _resource_executor = ThreadPoolExecutor(max_workers=RESOURCE_FETCH_WORKERS,
+                                                    thread_name_prefix='gltf-fetch')
+    return _http_session, _resource_executor
+
+
+def _download(url: str, timeout: float = 30, max_bytes: int = MAX_RESOURCE_BYTES,
+              deadline: Deadline = None) -> bytes:
+    """
+    Download a URL with the shared session through the blob cache
+    Raises on HTTP errors, oversized bodies or an expired deadline
+    """
+    session, _ = _session()
+    if deadline is not None:
+        deadline.check('download')
+        timeout = min(timeout, deadline.remaining())
+    entry = blob_cache.lookup(url)
+    try:
+        with session.get(url, timeout=timeout, stream=True, headers=blob_cache.conditional_headers(entry)) as response:
+            if response.status_code == 304 and entry is not None:
+                return blob_cache.not_modified(url, entry)
+            if response.status_code != 200:
+                raise Exception(f"Failed to download {url}: {response.status_code}")
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise Exception(f"Download of {url} exceeds {max_bytes} bytes")
+                if deadline is not None:
+                    deadline.check('download')
+                chunks.append(chunk)
+            data = b''.join(chunks)
+            blob_cache.store(url, data, response.headers)
+            return data
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+        # A read timeout caused by the deadline is reported as such
+        if deadline is not None:
+            deadline.check('download')
+        raise
+
+
+def _gltf_document(data: bytes) -> Dict[str, Any]:
+    """JSON part of a .glb or .gltf file"""
+    if data[:4] == b'glTF':
+        chunk_length, chunk_type = struct.unpack('<I4s', data[12:20])
+        if chunk_type != b'JSON':
+            return {}
+        return json.loads(data[20:20 + chunk_length])
+    return json.loads(data)
+
+
+def external_resource_uris(data: bytes) -> List[str]:
+    """External images and image-holding buffers that color analysis needs.
+
+    Buffers that only hold geometry are not needed and are not fetched.
+    """
+    document = _gltf_document(data)
+    uris = []
+    for image in document.get('images', []):
+        if image.get('uri'):
+            uris.append(image['uri'])
+        elif image.get('bufferView') is not None:
+            buffer_view = document['bufferViews'][image['bufferView']]
+            uri = document['buffers'][buffer_view['buffer']].get('uri')
+            if uri:
+                uris.append(uri)
+
+    uris = [uri for uri in dict.fromkeys(uris) if not uri.startswith('data:')]
+    if len(uris) > MAX_EXTERNAL_RESOURCES:
+        print(f"Model references {len(uris)} external resources, fetching the first {MAX_EXTERNAL_RESOURCES}")
+    return uris[:MAX_EXTERNAL_RESOURCES]
+
 
 class Model3DAnalyzer:
     def __init__(self):
-        self.color_cache = {}
+        # Analyses shared by all workers on the host, keyed by model URL and name
+        self.color_cache = SharedCache('model_analysis', ttl=24 * 3600)
         
-    def analyze_model_from_url(self, model_url: str, model_name: str = "") -> Dict[str, Any]:
+    def analyze_model_from_url(self, model_url: str, model_name: str = "",
+                               deadline: Deadline = None) -> Dict[str, Any]:
         """
         Download and analyze a 3D model from Uploadcare URL
-        Returns color analysis and material information
+        Returns color analysis and material information, partial if the deadline is hit
         """
+        deadline = deadline or Deadline(ANALYSIS_TIMEOUT)
+        cached = self.color_cache.get(f"{model_url}|{model_name}")
+        if cached is not None:
+            return cached
+        
         try:
             print(f"Analyzing 3D model: {model_name} from {model_url}")
             
-            # Download the GLB file
-            response = requests.get(model_url, timeout=30)
-            if response.status_code != 200:
-                raise Exception(f"Failed to download model: {response.status_code}")
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.glb', delete=False) as temp_file:
-                temp_file.write(response.content)
-                temp_path = temp_file.name
-            
-            try:
-                # Analyze the GLB file
-                analysis = self._analyze_glb_file(temp_path, model_name)
-                return analysis
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_path)
-                
+            # Download the model, then its external resources in parallel
+            data = _download(model_url, timeout=30, max_bytes=MAX_DOWNLOAD_BYTES, deadline=deadline)
+            uris = external_resource_uris(data)
+            _, executor = _session()
+            fetches = {uri: executor.submit(_download, resolve_resource_url(model_url, uri), deadline=deadline)
+                       for uri in uris if self._is_fetchable(model_url, uri)}
+            resources = {}
+            skipped = 0
+            for uri, fetch in fetches.items():
+                try:
+                    resources[uri] = fetch.result(timeout=deadline.remaining())
+                except Exception as e:
+                    if deadline.expired():
+                        skipped += 1
+                    print(f"Error fetching external resource {uri}: {e}")
+            
+            analysis = self.analyze_model_bytes(data, model_name, resources, deadline)
+            self._mark_skipped_resources(analysis, skipped)
         except Exception as e:
-            print(f"Error analyzing model {model_name}: {str(e)}")
-            return {
-                'colors': [],
-                'dominant_colors': [],
-                'materials': [],
-                'error': str(e),
-                'fallback': True
+            return self._error_result(model_name, e)
+        
+        self._cache_analysis(model_url, model_name, analysis)
+        return analysis
+    
+    async def analyze_model_from_url_async(self, model_url: str, model_name: str = "",
+                                           deadline: Deadline = None) -> Dict[str, Any]:
+        """
+        Async variant of analyze_model_from_url for the ASGI app: the download
+        uses the shared HTTP pool and the analysis runs on the CPU executor.
+        If the request is cancelled (client gone) the deadline is cancelled too,
+        so the executor thread stops at its next check.
+        """
+        import asyncio
+        from async_io import fetch_bytes, run_cpu
+        
+        deadline = deadline or Deadline(ANALYSIS_TIMEOUT)
+        cached = self.color_cache.get(f"{model_url}|{model_name}")
+        if cached is not None:
+            return cached
+        
+        try:
+            print(f"Analyzing 3D model: {model_name} from {model_url}")
+            try:
+                data = await asyncio.wait_for(fetch_bytes(model_url, timeout=30, cache=blob_cache), deadline.remaining())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"deadline of {deadline.seconds:g}s exceeded during download")
+            
+            # All external resources are fetched concurrently on the shared pool;
+            # whatever has not arrived by the deadline is left out
+            uris = [uri for uri in external_resource_uris(data) if self._is_fetchable(model_url, uri)]
+            fetches = {
+                uri: asyncio.ensure_future(fetch_bytes(resolve_resource_url(model_url, uri), timeout=30,
+                                                       max_bytes=MAX_RESOURCE_BYTES, cache=blob_cache))
+                for uri in uris
             }
+            pending = set()
+            if fetches:
+                _, pending = await asyncio.wait(fetches.values(), timeout=deadline.remaining())
+                for fetch in pending:
+                    fetch.cancel()
+            resources = {}
+            skipped = 0
+            for uri, fetch in fetches.items():
+                if fetch in pending:
+                    skipped += 1
+                    print(f"External resource {uri} not fetched before the deadline")
+                elif fetch.exception() is not None:
+                    print(f"Error fetching external resource {uri}: {fetch.exception()}")
+                else:
+                    resources[uri] = fetch.result()
+            
+            analysis = await run_cpu(self.analyze_model_bytes, data, model_name, resources, deadline)
+            self._mark_skipped_resources(analysis, skipped)
+        except asyncio.CancelledError:
+            deadline.cancel()
+            raise
+        except Exception as e:
+            return self._error_result(model_name, e)
+        
+        self._cache_analysis(model_url, model_name, analysis)
+        return analysis
+    
+    def _mark_skipped_resources(self, analysis: Dict[str, Any], skipped: int):
+        if skipped:
+            analysis['partial'] = True
+            analysis['deadline_exceeded'] = True
+            analysis['resources_skipped'] = skipped
+    
+    def _cache_analysis(self, model_url: str, model_name: str, analysis: Dict[str, Any]):
+        """Share a finished analysis; failed and partial ones are retried on the next request"""
+        if 'error' not in analysis and not analysis.get('partial'):
+            self.color_cache.set(f"{model_url}|{model_name}", analysis)
+    
+    def _is_fetchable(self, model_url: str, uri: str) -> bool:
+        try:
+            resolve_resource_url(model_url, uri)
+            return True
+        except ValueError as e:
+            print(f"Skipping external resource: {e}")
+            return False
+    
+    def analyze_model_bytes(self, data: bytes, model_name: str = "",
+                            resources: Dict[str, bytes] = None, deadline: Deadline = None) -> Dict[str, Any]:
+        """
+        Analyze an already downloaded .glb or .gltf file
+        resources maps external URIs (as written in the file) to their downloaded bytes
+        """
+        # Save to temporary file
+        suffix = '.glb' if data[:4] == b'glTF' else '.gltf'
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+            temp_file.write(data)
+            temp_path = temp_file.name
+        
+        try:
+            # Analyze the GLB file
+            return self._analyze_glb_file(temp_path, model_name, resources or {}, deadline)
+        finally:
+            # Clean up temporary file
+            os.unlink(temp_path)
     
-    def _analyze_glb_file(self, file_path: str, model_name: str) -> Dict[str, Any]:
-        """Analyze GLB file for colors and materials"""
+    def _error_result(self, model_name: str, error: Exception) -> Dict[str, Any]:
+        """Result returned when a model could not be downloaded or analyzed"""
+        print(f"Error analyzing model {model_name}: {str(error)}")
+        result = {
+            'colors': [],
+            'dominant_colors': [],
+            'materials': [],
+            'error': str(error),
+            'fallback': True
+        }
+        if isinstance(error, DeadlineExceeded):
+            result['deadline_exceeded'] = True
+        return result
+    
+    def _analyze_glb_file(self, file_path: str, model_name: str,
+                          resources: Dict[str, bytes] = None, deadline: Deadline = None) -> Dict[str, Any]:
+        """
+        Analyze GLB or glTF file for colors and materials
+        Textures not reached before the deadline are skipped and the result is marked partial
+        """
         try:
-            # Load GLTF file
+            from pygltflib import GLTF2
+            
+            # Load GLTF file; parsing and material factors are cheap and always done,
+            # so a result is available even when no texture fits in the deadline
             gltf_obj = GLTF2().load(file_path)
             
             analysis = {
@@ -67,32 +282,54 @@ class Model3DAnalyzer:
                 'texture_colors': []
             }
             
+            # Each source is weighted by the surface share of the materials using it
+            material_shares = self._material_shares(gltf_obj)
+            image_shares = self._image_shares(gltf_obj, material_shares)
+            weighted_colors = []
+            
+            # Analyze embedded and external textures
+            textured_images = set()
+            skipped_images = set()
+            if gltf_obj.images:
+                for i, image in enumerate(gltf_obj.images):
+                    try:
+                        texture_palette = self._analyze_texture(image, gltf_obj, i, resources or {}, deadline)
+                        analysis['texture_colors'].extend(color for color, _ in texture_palette)
+                        analysis['textures_analyzed'] += 1
+                        weighted_colors.extend((color, fraction * image_shares[i])
+                                               for color, fraction in texture_palette)
+                        if texture_palette:
+                            textured_images.add(i)
+                    except DeadlineExceeded as e:
+                        print(f"Stopping texture analysis: {e}")
+                        analysis['partial'] = True
+                        analysis['deadline_exceeded'] = True
+                        analysis['textures_skipped'] = len(gltf_obj.images) - i
+                        skipped_images.update(range(i, len(gltf_obj.images)))
+                        break
+                    except Exception as e:
+                        print(f"Error analyzing texture {i}: {e}")
+            
             # Analyze materials
             if gltf_obj.materials:
-                for material in gltf_obj.materials:
+                for index, material in enumerate(gltf_obj.materials):
                     material_analysis = self._analyze_material(material, gltf_obj)
                     analysis['materials'].append(material_analysis)
                     
                     # Extract colors from material properties
                     if material_analysis.get('base_color'):
                         analysis['material_colors'].extend(material_analysis['base_color'])
-            
-            # Analyze embedded textures
-            if gltf_obj.images:
-                for i, image in enumerate(gltf_obj.images):
-                    try:
-                        texture_colors = self._analyze_texture(image, gltf_obj, i)
-                        analysis['texture_colors'].extend(texture_colors)
-                        analysis['textures_analyzed'] += 1
-                    except Exception as e:
-                        print(f"Error analyzing texture {i}: {e}")
+                        # The base color factor only tints a base color texture; a texture
+                        # skipped by the deadline has an unknown color, so it is left out
+                        image_index = self._base_color_image(material, gltf_obj)
+                        if image_index not in textured_images and image_index not in skipped_images:
+                            weighted_colors.extend((color, material_shares[index])
+                                                   for color in material_analysis['base_color'])
             
             # Combine and process all colors
-            all_colors = analysis['material_colors'] + analysis['texture_colors']
-            
-            if all_colors:
-                # Get dominant colors using clustering
-                analysis['dominant_colors'] = self._get_dominant_colors(all_colors)
+            if weighted_colors:
+                # Merge the per-source palettes by weight
+                analysis['dominant_colors'], color_weights = self._get_dominant_colors(weighted_colors)
                 hex_colors = [self._rgb_to_hex(color) for color in analysis['dominant_colors']]
                 
                 # Check if we only got white/neutral colors - if so, try material name analysis
@@ -106,8 +343,10 @@ class Model3DAnalyzer:
                         print(f"Material name analysis successful: {material_colors}")
                     else:
                         analysis['colors'] = hex_colors
+                        analysis['color_weights'] = color_weights
                 else:
                     analysis['colors'] = hex_colors
+                    analysis['color_weights'] = color_weights
             else:
                 # Alternative approach: Try to infer colors from material names
                 print("No colors from materials/textures, trying material name analysis")
@@ -126,11 +365,14 @@ class Model3DAnalyzer:
             
         except Exception as e:
             print(f"Error in GLB analysis: {e}")
-            return {
+            result = {
                 'colors': self._fallback_color_analysis(model_name),
                 'error': str(e),
                 'fallback': True
             }
+            if isinstance(e, DeadlineExceeded):
+                result['deadline_exceeded'] = True
+            return result
     
     def _analyze_material(self, material, gltf_obj) -> Dict[str, Any]:
         """Analyze a single material for color information"""
@@ -160,18 +402,24 @@ class Model3DAnalyzer:
         
         return material_info
     
-    def _analyze_texture(self, image, gltf_obj, index: int) -> List[List[int]]:
-        """Extract colors from a texture image"""
+    def _analyze_texture(self, image, gltf_obj, index: int, resources: Dict[str, bytes] = None,
+                         deadline: Deadline = None) -> List[Tuple[List[int], float]]:
+        """Extract a weighted palette from a texture image; raises DeadlineExceeded"""
+        resources = resources or {}
         try:
+            if deadline is not None:
+                deadline.check('texture decode')
             if hasattr(image, 'uri') and image.uri:
                 if image.uri.startswith('data:'):
                     # Embedded base64 image
                     header, data = image.uri.split(',', 1)
                     image_data = base64.b64decode(data)
                     pil_image = Image.open(BytesIO(image_data))
+                elif image.uri in resources:
+                    # External image file fetched alongside a .gltf
+                    pil_image = Image.open(BytesIO(resources[image.uri]))
                 else:
-                    # External image file (less common in GLB)
-                    print(f"External texture reference found: {image.uri}")
+                    print(f"External texture not available: {image.uri}")
                     return []
             elif hasattr(image, 'bufferView') and image.bufferView is not None:
                 # Image stored in buffer
@@ -179,16 +427,19 @@ class Model3DAnalyzer:
                 buffer_obj = gltf_obj.buffers[buffer_view.buffer]
                 
                 # Access buffer data correctly
-                if hasattr(buffer_obj, 'data'):
-                    buffer_data = buffer_obj.data
-                elif hasattr(buffer_obj, 'uri') and buffer_obj.uri:
+                if hasattr(buffer_obj, 'uri') and buffer_obj.uri:
                     # Handle data URI or external buffer
                     if buffer_obj.uri.startswith('data:'):
                         header, data = buffer_obj.uri.split(',', 1)
                         buffer_data = base64.b64decode(data)
+                    elif buffer_obj.uri in resources:
+                        buffer_data = resources[buffer_obj.uri]
                     else:
-                        print(f"External buffer reference found: {buffer_obj.uri}")
+                        print(f"External buffer not available: {buffer_obj.uri}")
                         return []
+                elif gltf_obj.binary_blob() is not None:
+                    # GLB binary chunk
+                    buffer_data = gltf_obj.binary_blob()
                 else:
                     print(f"Cannot access buffer data for texture {index}")
                     return []
@@ -209,17 +460,22 @@ class Model3DAnalyzer:
                 pil_image.thumbnail((100, 100), Image.Resampling.LANCZOS)
             
             # Extract dominant colors from texture
-            colors = self._extract_colors_from_image(pil_image)
-            print(f"Extracted {len(colors)} colors from texture {index}")
+            if deadline is not None:
+                deadline.check('quantization')
+            palette = self._extract_palette_from_image(pil_image)
+            print(f"Extracted {len(palette)} colors from texture {index}")
             
-            return colors
+            return palette
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error processing texture {index}: {e}")
             return []
     
-    def _extract_colors_from_image(self, image: Image.Image, max_colors: int = 5) -> List[List[int]]:
-        """Extract dominant colors from a PIL Image"""
+    def _extract_palette_from_image(self, image: Image.Image,
+                                    max_colors: int = 5) -> List[Tuple[List[int], float]]:
+        """Extract dominant colors from a PIL Image with the fraction of pixels each covers"""
         try:
             # Convert image to numpy array
             img_array = np.array(image)
@@ -232,63 +488,106 @@ class Model3DAnalyzer:
             if len(filtered_pixels) == 0:
                 return []
             
+            from sklearn.cluster import KMeans
+            
             # Use KMeans to find dominant colors
-            n_colors = min(max_colors, len(filtered_pixels))
+            n_colors = min(max_colors, len(np.unique(filtered_pixels, axis=0)))
             if n_colors < 1:
                 return []
             
             kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
             kmeans.fit(filtered_pixels)
             
-            # Get cluster centers (dominant colors)
-            colors = []
-            for center in kmeans.cluster_centers_:
+            # Get cluster centers (dominant colors) and their pixel shares
+            counts = np.bincount(kmeans.labels_, minlength=n_colors)
+            palette = []
+            for center, count in zip(kmeans.cluster_centers_, counts):
                 color = [int(c) for c in center]
-                colors.append(color)
+                palette.append((color, float(count) / len(pixels)))
             
-            return colors
+            return palette
             
         except Exception as e:
             print(f"Error extracting colors from image: {e}")
             return []
     
-    def _get_dominant_colors(self, all_colors: List[List[int]], max_colors: int = 5) -> List[List[int]]:
-        """Get dominant colors from all extracted colors using clustering"""
-        if not all_colors:
-            return []
+    def _material_shares(self, gltf_obj) -> List[float]:
+        """Fraction of the model's triangles drawn with each material, a proxy for surface area"""
+        materials = gltf_obj.materials or []
+        shares = [0.0] * len(materials)
+        for mesh in gltf_obj.meshes or []:
+            for primitive in mesh.primitives:
+                if primitive.material is None or primitive.material >= len(shares):
+                    continue
+                accessor = primitive.indices if primitive.indices is not None else primitive.attributes.POSITION
+                if accessor is not None:
+                    shares[primitive.material] += gltf_obj.accessors[accessor].count
         
-        try:
-            # Convert to numpy array
-            colors_array = np.array(all_colors)
-            
-            # Use KMeans to find the most dominant colors across all sources
-            n_colors = min(max_colors, len(all_colors))
-            if n_colors < 1:
-                return []
-            
-            kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-            kmeans.fit(colors_array)
-            
-            # Sort by cluster size (most common colors first)
-            labels = kmeans.labels_
-            centers = kmeans.cluster_centers_
-            
-            # Count occurrences of each cluster
-            unique_labels, counts = np.unique(labels, return_counts=True)
-            
-            # Sort centers by count (descending)
-            sorted_indices = np.argsort(counts)[::-1]
-            dominant_colors = []
-            
-            for idx in sorted_indices:
-                color = [int(c) for c in centers[idx]]
-                dominant_colors.append(color)
-            
-            return dominant_colors
-            
-        except Exception as e:
-            print(f"Error getting dominant colors: {e}")
-            return all_colors[:max_colors]  # Fallback to first few colors
+        total = sum(shares)
+        if not total:
+            # No geometry to measure; every material counts the same
+            return [1.0 / len(materials)] * len(materials) if materials else []
+        return [share / total for share in shares]
+    
+    def _base_color_image(self, material, gltf_obj):
+        """Index of the image used as a material's base color texture, or None"""
+        pbr = material.pbrMetallicRoughness
+        texture_info = pbr.baseColorTexture if pbr else None
+        if texture_info is None or texture_info.index is None or texture_info.index >= len(gltf_obj.textures or []):
+            return None
+        return gltf_obj.textures[texture_info.index].source
+    
+    def _image_shares(self, gltf_obj, material_shares: List[float]) -> List[float]:
+        """Surface share of each image through the materials that use it as base color"""
+        images = gltf_obj.images or []
+        shares = [0.0] * len(images)
+        for material, material_share in zip(gltf_obj.materials or [], material_shares):
+            image_index = self._base_color_image(material, gltf_obj)
+            if image_index is not None and image_index < len(shares):
+                shares[image_index] += material_share
+        
+        if not any(shares):
+            # Images are not bound as base color textures; every image counts the same
+            return [1.0 / len(images)] * len(images) if images else []
+        return shares
+    
+    def _get_dominant_colors(self, weighted_colors: List[Tuple[List[int], float]], max_colors: int = 5,
+                             merge_distance: float = 24.0) -> Tuple[List[List[int]], List[float]]:
+        """
+        Merge weighted per-source palettes into the dominant colors and their weights.
+        Colors closer than merge_distance (RGB) are merged into their weighted mean,
+        heaviest first, so the cost is linear in the palette sizes instead of a re-clustering.
+        """
+        if not weighted_colors:
+            return [], []
+        
+        total = sum(weight for _, weight in weighted_colors)
+        if total <= 0:
+            weighted_colors = [(color, 1.0) for color, _ in weighted_colors]
+            total = float(len(weighted_colors))
+        
+        centers = []
+        weights = []
+        for color, weight in sorted(weighted_colors, key=lambda entry: -entry[1]):
+            if weight <= 0:
+                continue
+            color = np.asarray(color[:3], dtype=np.float64)
+            if centers:
+                distances = np.linalg.norm(np.asarray(centers) - color, axis=1)
+                nearest = int(distances.argmin())
+                if distances[nearest] <= merge_distance:
+                    merged = weights[nearest] + weight
+                    centers[nearest] = (centers[nearest] * weights[nearest] + color * weight) / merged
+                    weights[nearest] = merged
+                    continue
+            centers.append(color)
+            weights.append(weight)
+        
+        # Most dominant first
+        order = sorted(range(len(centers)), key=lambda index: -weights[index])[:max_colors]
+        kept = sum(weights[index] for index in order)
+        dominant_colors = [[int(round(c)) for c in centers[index]] for index in order]
+        return dominant_colors, [round(weights[index] / kept, 3) for index in order]
     
     def _rgb_to_hex(self, rgb: List[int]) -> str:
         """Convert RGB list to hex color code"""
@@ -419,3 +718,6 @@ class Model3DAnalyzer:
                 closest_name = name
         
         return closest_name
+
+# Create global instance
+model_analyzer = Model3DAnalyzer()
@@ -0,0 +1,109 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, List
+
+
+class MongoConnection:
+    """Lazily created MongoDB client with a background health monitor.
+
+    Creating the client does not touch the network, so startup never waits
+    for server selection. A daemon thread pings the server every ``interval``
+    seconds and caches the result; health endpoints read that cached state
+    and never ping Mongo themselves. Callbacks registered with ``on_ready``
+    run once, on the monitor thread, after the first successful ping.
+    """
+
+    def __init__(self, uri: str, db_name: str = 'renderhaus', interval: float = 10.0,
+                 timeout_ms: int = 2000):
+        self.uri = uri
+        self.db_name = db_name
+        self.interval = interval
+        self.timeout_ms = timeout_ms
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._ready_callbacks: List[Callable] = []
+        self._ready_fired = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.state = {
+            'mongodb_status': 'unknown',
+            'checked_at': None,
+            'latency_ms': None,
+            'error': None
+        }
+
+    @property
+    def client(self):
+        """The MongoClient, created on first use without connecting"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from pymongo import MongoClient
+                    self._client = MongoClient(self.uri, connect=False,
+                                               serverSelectionTimeoutMS=self.timeout_ms)
+        return self._client
+
+    @property
+    def db(self):
+        """The application database handle"""
+        return self.client[self.db_name]
+
+    @property
+    def connected(self) -> bool:
+        """Result of the latest health check"""
+        return self.state['mongodb_status'] == 'connected'
+
+    @property
+    def checked(self) -> bool:
+        """Whether at least one health check has completed"""
+        return self.state['checked_at'] is not None
+
+    def on_ready(self, callback: Callable):
+        """Run callback(db) once Mongo is first reachable"""
+        self._ready_callbacks.append(callback)
+
+    def check(self) -> Dict[str, Any]:
+        """Ping the server once and update the cached state"""
+        started = time.monotonic()
+        try:
+            self.client.admin.command('ping')
+            state = {'mongodb_status': 'connected', 'error': None,
+                     'latency_ms': round((time.monotonic() - started) * 1000, 1)}
+        except Exception as e:
+            state = {'mongodb_status': 'disconnected', 'error': str(e), 'latency_ms': None}
+        state['checked_at'] = datetime.now(timezone.utc).isoformat()
+
+        if state['mongodb_status'] != self.state['mongodb_status']:
+            if state['mongodb_status'] == 'connected':
+                print("✅ Connected to MongoDB")
+            else:
+                print(f"⚠️  MongoDB unavailable: {state['error']}")
+        # Swap the whole dict so readers never see a half-updated state
+        self.state = state
+
+        if self.connected and not self._ready_fired:
+            self._ready_fired = True
+            for callback in self._ready_callbacks:
+                try:
+                    callback(self.db)
+                except Exception as e:
+                    print(f"⚠️  MongoDB ready callback failed: {e}")
+        return state
+
+    def start_monitor(self):
+        """Start the background health monitor"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._monitor_loop, name='mongo-health', daemon=True)
+        self._thread.start()
+
+    def stop_monitor(self):
+        """Stop the background health monitor"""
+        self._stop.set()
+
+    def _monitor_loop(self):
+        self.check()
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,76 @@
+"""BlurHash placeholders for thumbnails.
+
+A BlurHash is a few dozen characters describing a blurred version of an
+image: the average color plus a handful of low-frequency cosine components.
+Clients decode it with any BlurHash library and show it until the real
+thumbnail has loaded. See https://github.com/woltapp/blurhash for the format.
+
+The components are computed with one matrix product per axis over a small
+downsample of the image, so encoding costs well under a millisecond.
+"""
+from typing import Tuple
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+# Largest side of the image the components are computed from
+SAMPLE_SIZE = 32
+
+
+def _encode83(value: int, length: int) -> str:
+    return ''.join(BASE83[(value // 83 ** (length - 1 - position)) % 83] for position in range(length))
+
+
+def _srgb_to_linear(values):
+    import numpy as np
+
+    values = values / 255.0
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(value: float) -> int:
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(image, components: Tuple[int, int] = (4, 3)) -> str:
+    """Encode a PIL image as a BlurHash with components (x, y), each between 1 and 9"""
+    import numpy as np
+    from PIL import Image
+
+    components_x, components_y = components
+    if not (1 <= components_x <= 9 and 1 <= components_y <= 9):
+        raise ValueError('BlurHash components must be between 1 and 9')
+
+    image = image.convert('RGB')
+    if max(image.size) > SAMPLE_SIZE:
+        image = image.copy()
+        image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BILINEAR)
+    pixels = _srgb_to_linear(np.asarray(image, dtype=np.float64))
+    height, width = pixels.shape[:2]
+
+    # factors[j, i] = mean over pixels of cos(pi i x / w) cos(pi j y / h) * rgb
+    basis_x = np.cos(np.pi * np.arange(components_x)[:, None] * np.arange(width)[None, :] / width)
+    basis_y = np.cos(np.pi * np.arange(components_y)[:, None] * np.arange(height)[None, :] / height)
+    factors = np.einsum('jy,ix,yxc->jic', basis_y, basis_x, pixels) / (width * height)
+    factors[1:, :] *= 2
+    factors[0, 1:] *= 2
+    factors = factors.reshape(-1, 3)
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((components_x - 1) + (components_y - 1) * 9, 1)
+    if len(ac):
+        quantised_maximum = int(max(0, min(82, int(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_maximum + 1) / 166
+        result += _encode83(quantised_maximum, 1)
+    else:
+        maximum = 1.0
+        result += _encode83(0, 1)
+
+    result += _encode83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+
+    # Each AC component is quantised to 19 levels per channel on a square-root scale
+    quantised = np.clip(np.floor(np.sign(ac) * np.sqrt(np.abs(ac / maximum)) * 9 + 9.5), 0, 18).astype(int)
+    for red, green, blue in quantised:
+        result += _encode83(red * 19 * 19 + green * 19 + blue, 2)
+    return result
@@ -0,0 +1,209 @@
+"""Per-request stage timing, opt-in cProfile and a slow-request log.
+
+Every request gets a ``RequestTrace``. Code marks its stages with
+``with stage('name'):``; a stage outside a request is a no-op, so library
+code can be marked freely. Traces follow work onto the CPU executor
+because ``run_cpu`` copies the request context.
+
+A request is profiled with cProfile when it carries ``X-Profile`` with the
+PROFILE_ADMIN_TOKEN, or when it is sampled at PROFILE_SAMPLE_RATE. Only the
+work inside ``run_cpu`` is profiled, which is where the request's CPU time
+goes and avoids recording unrelated coroutines sharing the event loop. The
+merged profile is stored under PROFILE_DIR and its id is returned in the
+``X-Profile-Id`` header for download.
+
+Requests slower than SLOW_REQUEST_MS are logged with their stage breakdown.
+"""
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ADMIN_TOKEN = os.getenv('PROFILE_ADMIN_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'renderhaus-profiles'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 50))
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 1000))
+# Orderings accepted by pstats.Stats.sort_stats
+PROFILE_SORT_KEYS = tuple(sorted(pstats.Stats.sort_arg_dict_default))
+
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+
+class RequestTrace:
+    """Timing (and optionally profiling) state of one request"""
+
+    def __init__(self, method: str, path: str, profile: bool = False):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.stages = OrderedDict()
+        self.profiles: List[cProfile.Profile] = [] if profile else None
+        self._lock = threading.Lock()
+
+    @property
+    def profiling(self) -> bool:
+        return self.profiles is not None
+
+    def add_stage(self, name: str, seconds: float):
+        """Accumulate time for a stage; repeated stages add up"""
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def stage_breakdown(self) -> Dict[str, float]:
+        return {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()}
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """The trace of the request being handled, if any"""
+    return _current_trace.get()
+
+
+def start_trace(method: str, path: str, profile: bool = False) -> RequestTrace:
+    """Begin tracing the current request"""
+    trace = RequestTrace(method, path, profile)
+    _current_trace.set(trace)
+    return trace
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a named stage of the current request"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, time.perf_counter() - started)
+
+
+def call_profiled(fn, *args, **kwargs):
+    """Call fn, under cProfile when the current request is being profiled"""
+    trace = _current_trace.get()
+    if trace is None or not trace.profiling:
+        return fn(*args, **kwargs)
+
+    # One profiler per call; calls running on several threads are merged later
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        with trace._lock:
+            trace.profiles.append(profiler)
+
+
+def should_profile(headers) -> bool:
+    """Decide whether to profile a request: admin header or sampling"""
+    token = headers.get('X-Profile')
+    if token and PROFILE_ADMIN_TOKEN and secrets.compare_digest(token, PROFILE_ADMIN_TOKEN):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def is_admin(headers) -> bool:
+    """Whether a request carries the admin token"""
+    token = headers.get('X-Admin-Token') or headers.get('X-Profile')
+    return bool(token and PROFILE_ADMIN_TOKEN and secrets.compare_digest(token, PROFILE_ADMIN_TOKEN))
+
+
+class ProfileStore:
+    """Profiles saved as pstats files, keeping the most recent ones"""
+
+    def __init__(self, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self.index = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, trace: RequestTrace, status: int) -> Optional[str]:
+        """Merge and store a trace's profiles; returns the profile id"""
+        if not trace.profiles:
+            return None
+        stats = pstats.Stats(trace.profiles[0])
+        for profiler in trace.profiles[1:]:
+            stats.add(profiler)
+
+        profile_id = f"{int(time.time())}-{secrets.token_hex(4)}"
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        stats.dump_stats(path)
+
+        with self._lock:
+            self.index[profile_id] = {
+                'id': profile_id,
+                'method': trace.method,
+                'path': trace.path,
+                'status': status,
+                'duration_ms': round(trace.elapsed_ms(), 1),
+                'stages': trace.stage_breakdown(),
+                'created_at': time.time()
+            }
+            while len(self.index) > self.keep:
+                old_id, _ = self.index.popitem(last=False)
+                try:
+                    os.unlink(self.path(old_id))
+                except OSError:
+                    pass
+        return profile_id
+
+    def path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.prof")
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self.index.values()))
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.index.get(profile_id)
+
+    def text_report(self, profile_id: str, limit: int = 50, sort: str = 'cumulative') -> str:
+        """Human-readable pstats listing of a stored profile; sort is one of PROFILE_SORT_KEYS"""
+        output = io.StringIO()
+        pstats.Stats(self.path(profile_id), stream=output).sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+profile_store = ProfileStore()
+
+
+def finish_trace(trace: RequestTrace, response) -> None:
+    """Store the profile, add timing headers and log the request if it was slow"""
+    profile_id = profile_store.save(trace, response.status_code) if trace.profiling else None
+    if profile_id:
+        response.headers['X-Profile-Id'] = profile_id
+
+    duration_ms = trace.elapsed_ms()
+    timings = [f'{name};dur={ms}' for name, ms in trace.stage_breakdown().items()]
+    response.headers['Server-Timing'] = ', '.join(timings + [f'total;dur={duration_ms:.1f}'])
+
+    if duration_ms >= SLOW_REQUEST_MS:
+        logger.warning('🐢 Slow request %s', json.dumps({
+            'method': trace.method,
+            'path': trace.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 1),
+            'stages': trace.stage_breakdown(),
+            'profile_id': profile_id
+        }))
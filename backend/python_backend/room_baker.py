@@ -0,0 +1,661 @@
+"""Bake a room into a single GLB.
+
+A saved room references one model file per placed object. Baking merges
+them server-side into one binary glTF:
+
+- each distinct model file is downloaded once, however often it is placed;
+- buffer views, accessors, images, samplers, textures, materials and meshes
+  are deduplicated by content, so identical textures or meshes shipped in
+  different model files are also stored once;
+- a model placed several times is drawn with ``EXT_mesh_gpu_instancing``
+  (one draw call per mesh for all copies), or, in ``nodes`` mode, with one
+  node per placement that references the shared meshes.
+
+Animations, skins, cameras and lights are not carried over. Rotations are
+Euler angles in radians in three.js' default XYZ order, as tracked by the
+editor, or quaternions ``[x, y, z, w]``.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import struct
+from typing import List, Dict, Any, Optional, Tuple
+from async_io import MAX_RESOURCE_BYTES, fetch_bytes, resolve_resource_url
+from blob_cache import blob_cache
+from deadlines import Deadline
+from shared_cache import SharedCache
+from suggestion_cache import canonical_room
+
+# Bumped whenever the output of a bake changes, so old bakes are not reused
+BAKE_VERSION = 1
+BAKE_FIELDS = ('model', 'position', 'rotation', 'scale')
+MAX_BAKE_OBJECTS = int(os.getenv('ROOM_BAKE_MAX_OBJECTS', 5000))
+MAX_BAKE_MODELS = int(os.getenv('ROOM_BAKE_MAX_MODELS', 200))
+BAKE_TTL = float(os.getenv('ROOM_BAKE_TTL', 7 * 24 * 3600))
+# Placements of one model at which it is drawn with GPU instancing
+GPU_INSTANCING_MIN = 2
+INSTANCING_MODES = ('gpu', 'nodes')
+
+# Collections referenced by Project.objects[].modelType
+MODEL_COLLECTIONS = {
+    'Model3D': 'model3ds',
+    'Component': 'components'
+}
+
+# Extensions whose data is copied into the bake; models requiring anything
+# else cannot be merged
+SUPPORTED_EXTENSIONS = {
+    'KHR_draco_mesh_compression', 'KHR_mesh_quantization', 'KHR_texture_transform',
+    'KHR_texture_basisu', 'EXT_texture_webp', 'KHR_materials_emissive_strength',
+    'KHR_materials_pbrSpecularGlossiness', 'KHR_materials_unlit', 'KHR_materials_clearcoat',
+    'KHR_materials_transmission', 'KHR_materials_volume', 'KHR_materials_ior',
+    'KHR_materials_specular', 'KHR_materials_sheen', 'KHR_materials_iridescence',
+    'KHR_materials_anisotropy', 'KHR_materials_dispersion'
+}
+
+GLB_MAGIC = b'glTF'
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+FLOAT = 5126
+
+
+class BakeError(Exception):
+    """Raised when a room or one of its models cannot be baked"""
+
+
+def _vector(value, keys: str, default: float) -> List[float]:
+    """Read a vector given as a list or as {x, y, z(, w)}"""
+    if value is None:
+        return [default] * len(keys)
+    if isinstance(value, dict):
+        return [float(value.get(key, default)) for key in keys]
+    if isinstance(value, (int, float)):
+        return [float(value)] * len(keys)
+    return [float(component) for component in value]
+
+
+def placement(placed: Dict) -> Dict[str, Any]:
+    """Normalize a placed object from the editor or a saved project.
+
+    The model is given by URL (``modelUrl`` / ``url``) or by ``modelId`` and
+    ``modelType``, which are resolved against the catalog when baking.
+    """
+    model_url = placed.get('modelUrl') or placed.get('url')
+    if model_url:
+        model = f"url:{model_url}"
+    elif placed.get('modelId'):
+        model = f"{placed.get('modelType', 'Model3D')}:{placed['modelId']}"
+    else:
+        raise BakeError('Every object needs a modelUrl or a modelId')
+
+    rotation = placed.get('rotation')
+    rotation = _vector(rotation, 'xyzw' if isinstance(rotation, dict) and 'w' in rotation else 'xyz', 0.0)
+    if len(rotation) not in (3, 4):
+        raise BakeError('rotation must have 3 (Euler) or 4 (quaternion) components')
+    position = _vector(placed.get('position'), 'xyz', 0.0)
+    scale = _vector(placed.get('scale'), 'xyz', 1.0)
+    if len(position) != 3 or len(scale) != 3:
+        raise BakeError('position and scale must have 3 components')
+
+    return {
+        'model': model,
+        'position': position,
+        'rotation': rotation,
+        'scale': scale,
+        'name': placed.get('instanceId') or placed.get('name')
+    }
+
+
+def room_key(objects: List[Dict], instancing: str = 'gpu') -> Tuple[str, List[Dict]]:
+    """Content hash of a room and its placements in canonical order.
+
+    The key only depends on which models are placed where, not on the order
+    in which they were placed, so reopening a room reuses its bake.
+    """
+    if instancing not in INSTANCING_MODES:
+        raise BakeError(f"instancing must be one of {', '.join(INSTANCING_MODES)}")
+    if len(objects) > MAX_BAKE_OBJECTS:
+        raise BakeError(f"Rooms are limited to {MAX_BAKE_OBJECTS} objects")
+    key, ordered = canonical_room([placement(placed) for placed in objects], BAKE_FIELDS)
+    return hashlib.sha256(f"{BAKE_VERSION}|{instancing}|{key}".encode('utf-8')).hexdigest(), ordered
+
+
+def _quaternion_from_euler(x: float, y: float, z: float) -> List[float]:
+    """Quaternion [x, y, z, w] of Euler angles in XYZ order (three.js default)"""
+    c1, c2, c3 = math.cos(x / 2), math.cos(y / 2), math.cos(z / 2)
+    s1, s2, s3 = math.sin(x / 2), math.sin(y / 2), math.sin(z / 2)
+    return [
+        s1 * c2 * c3 + c1 * s2 * s3,
+        c1 * s2 * c3 - s1 * c2 * s3,
+        c1 * c2 * s3 + s1 * s2 * c3,
+        c1 * c2 * c3 - s1 * s2 * s3
+    ]
+
+
+def _rotation(placed: Dict) -> List[float]:
+    rotation = placed['rotation']
+    if len(rotation) == 4:
+        norm = math.sqrt(sum(component * component for component in rotation)) or 1.0
+        return [component / norm for component in rotation]
+    return _quaternion_from_euler(*rotation)
+
+
+def _trs_matrix(translation, rotation, scale):
+    """4x4 matrix of a translation, quaternion [x, y, z, w] and scale"""
+    import numpy as np
+
+    x, y, z, w = rotation
+    matrix = np.identity(4)
+    matrix[:3, :3] = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]
+    ]) * np.asarray(scale, dtype=np.float64)
+    matrix[:3, 3] = translation
+    return matrix
+
+
+def node_matrix(node: Dict):
+    """4x4 local transform of a glTF node"""
+    import numpy as np
+
+    if 'matrix' in node:
+        return np.asarray(node['matrix'], dtype=np.float64).reshape(4, 4).T
+    return _trs_matrix(node.get('translation', [0, 0, 0]), node.get('rotation', [0, 0, 0, 1]),
+                       node.get('scale', [1, 1, 1]))
+
+
+def quaternion_from_rotation(rotation) -> List[float]:
+    """Quaternion [x, y, z, w] of a 3x3 rotation matrix"""
+    # Branch on the largest diagonal term for numerical stability
+    trace = rotation[0, 0] + rotation[1, 1] + rotation[2, 2]
+    if trace > 0:
+        s = math.sqrt(trace + 1.0) * 2
+        quaternion = [(rotation[2, 1] - rotation[1, 2]) / s, (rotation[0, 2] - rotation[2, 0]) / s,
+                      (rotation[1, 0] - rotation[0, 1]) / s, 0.25 * s]
+    elif rotation[0, 0] > rotation[1, 1] and rotation[0, 0] > rotation[2, 2]:
+        s = math.sqrt(1.0 + rotation[0, 0] - rotation[1, 1] - rotation[2, 2]) * 2
+        quaternion = [0.25 * s, (rotation[0, 1] + rotation[1, 0]) / s,
+                      (rotation[0, 2] + rotation[2, 0]) / s, (rotation[2, 1] - rotation[1, 2]) / s]
+    elif rotation[1, 1] > rotation[2, 2]:
+        s = math.sqrt(1.0 + rotation[1, 1] - rotation[0, 0] - rotation[2, 2]) * 2
+        quaternion = [(rotation[0, 1] + rotation[1, 0]) / s, 0.25 * s,
+                      (rotation[1, 2] + rotation[2, 1]) / s, (rotation[0, 2] - rotation[2, 0]) / s]
+    else:
+        s = math.sqrt(1.0 + rotation[2, 2] - rotation[0, 0] - rotation[1, 1]) * 2
+        quaternion = [(rotation[0, 2] + rotation[2, 0]) / s, (rotation[1, 2] + rotation[2, 1]) / s,
+                      0.25 * s, (rotation[1, 0] - rotation[0, 1]) / s]
+    return [float(component) for component in quaternion]
+
+
+def _decompose(matrix) -> Optional[Tuple[List[float], List[float], List[float]]]:
+    """Translation, quaternion and scale of a matrix, or None if it has shear"""
+    import numpy as np
+
+    basis = matrix[:3, :3]
+    scale = np.linalg.norm(basis, axis=0)
+    if np.any(scale < 1e-12):
+        return None
+    if np.linalg.det(basis) < 0:
+        scale[0] = -scale[0]
+    rotation = basis / scale
+    if not np.allclose(rotation.T @ rotation, np.identity(3), atol=1e-5):
+        return None
+    return matrix[:3, 3].tolist(), quaternion_from_rotation(rotation), scale.tolist()
+
+
+def _image_mime_type(data: bytes) -> str:
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:2] == b'\xff\xd8':
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:12] == b'\xabKTX 20\xbb\r\n\x1a\n':
+        return 'image/ktx2'
+    return 'application/octet-stream'
+
+
+def _data_uri(uri: str) -> Optional[bytes]:
+    """Payload of a base64 data: URI, None for other URIs"""
+    if not uri.startswith('data:'):
+        return None
+    header, _, payload = uri.partition(',')
+    if not header.endswith(';base64'):
+        raise BakeError('Only base64 data URIs are supported')
+    return base64.b64decode(payload)
+
+
+def parse_glb(data: bytes) -> Tuple[Dict[str, Any], Optional[bytes]]:
+    """JSON document and binary chunk of a .glb, or the document of a .gltf"""
+    if data[:4] != GLB_MAGIC:
+        try:
+            return json.loads(data), None
+        except ValueError:
+            raise BakeError('Model is neither a GLB nor a glTF file')
+    _, _, length = struct.unpack('<4sII', data[:12])
+    document, binary = None, None
+    offset = 12
+    while offset + 8 <= min(length, len(data)):
+        chunk_length, chunk_type = struct.unpack('<II', data[offset:offset + 8])
+        chunk = data[offset + 8:offset + 8 + chunk_length]
+        if chunk_type == CHUNK_JSON:
+            document = json.loads(chunk)
+        elif chunk_type == CHUNK_BIN and binary is None:
+            binary = chunk
+        offset += 8 + chunk_length
+    if document is None:
+        raise BakeError('GLB has no JSON chunk')
+    return document, binary
+
+
+class SourceModel:
+    """A parsed model file with its buffers and external images loaded"""
+
+    def __init__(self, url: str, document: Dict[str, Any], buffers: List[bytes], images: Dict[int, bytes]):
+        self.url = url
+        self.document = document
+        self.buffers = buffers
+        self.images = images
+
+        unsupported = set(document.get('extensionsRequired', [])) - SUPPORTED_EXTENSIONS
+        if unsupported:
+            raise BakeError(f"{url} requires unsupported extensions: {', '.join(sorted(unsupported))}")
+
+    def view_bytes(self, index: int) -> bytes:
+        view = self.document['bufferViews'][index]
+        buffer = self.buffers[view['buffer']]
+        start = view.get('byteOffset', 0)
+        return buffer[start:start + view['byteLength']]
+
+    def image_bytes(self, index: int) -> bytes:
+        image = self.document['images'][index]
+        if index in self.images:
+            return self.images[index]
+        if image.get('bufferView') is not None:
+            return self.view_bytes(image['bufferView'])
+        raise BakeError(f"Image {index} of {self.url} has no data")
+
+    def root_nodes(self) -> List[int]:
+        scenes = self.document.get('scenes') or []
+        if not scenes:
+            return list(range(len(self.document.get('nodes', []))))
+        return scenes[self.document.get('scene', 0)].get('nodes', [])
+
+    def mesh_nodes(self) -> List[Tuple[Dict, Any]]:
+        """Nodes holding meshes with their transform in model space"""
+        import numpy as np
+
+        found = []
+        stack = [(index, np.identity(4)) for index in self.root_nodes()]
+        while stack:
+            index, parent = stack.pop()
+            node = self.document['nodes'][index]
+            world = parent @ node_matrix(node)
+            if node.get('mesh') is not None:
+                found.append((node, world))
+            stack.extend((child, world) for child in node.get('children', []))
+        return found
+
+
+async def load_model(url: str, deadline: Deadline) -> SourceModel:
+    """Download a model and the external buffers and images it references"""
+    data = await fetch_bytes(url, timeout=deadline.remaining(), cache=blob_cache)
+    document, binary = parse_glb(data)
+
+    async def resource(uri: str) -> bytes:
+        embedded = _data_uri(uri)
+        if embedded is not None:
+            return embedded
+        return await fetch_bytes(resolve_resource_url(url, uri), timeout=deadline.remaining(),
+                                 max_bytes=MAX_RESOURCE_BYTES, cache=blob_cache)
+
+    buffer_uris = [buffer.get('uri') for buffer in document.get('buffers', [])]
+    image_uris = {index: image['uri'] for index, image in enumerate(document.get('images', []))
+                  if image.get('uri')}
+    fetched = await asyncio.gather(
+        *(resource(uri) for uri in buffer_uris if uri),
+        *(resource(uri) for uri in image_uris.values())
+    )
+    fetched = iter(fetched)
+    buffers = [next(fetched) if uri else (binary or b'') for uri in buffer_uris]
+    images = {index: next(fetched) for index in image_uris}
+    return SourceModel(url, document, buffers, images)
+
+
+def _without_names(item: Dict) -> str:
+    return json.dumps({key: value for key, value in item.items() if key not in ('name', 'extras')},
+                      sort_keys=True)
+
+
+class _GLBBuilder:
+    """Accumulates the merged document; every element is stored once by content"""
+
+    KINDS = ('bufferViews', 'accessors', 'images', 'samplers', 'textures', 'materials', 'meshes')
+
+    def __init__(self):
+        self.document: Dict[str, Any] = {kind: [] for kind in self.KINDS}
+        self.document['nodes'] = []
+        self.binary = bytearray()
+        self.extensions = set()
+        self._interned = {kind: {} for kind in self.KINDS}
+        self._view_keys: Dict[str, int] = {}
+        # (id(source), kind, source index) -> merged index
+        self._remapped: Dict[Tuple[int, str, int], int] = {}
+
+    def _intern(self, kind: str, item: Dict) -> int:
+        key = _without_names(item)
+        index = self._interned[kind].get(key)
+        if index is None:
+            index = len(self.document[kind])
+            self.document[kind].append(item)
+            self._interned[kind][key] = index
+        return index
+
+    def add_view(self, data: bytes, byte_stride: int = None, target: int = None) -> int:
+        """Append data as a buffer view, reusing an identical one"""
+        key = f"{hashlib.sha256(data).hexdigest()}|{byte_stride}|{target}"
+        if key in self._view_keys:
+            return self._view_keys[key]
+        # Views start on 4-byte boundaries so accessors stay aligned
+        self.binary.extend(b'\x00' * (-len(self.binary) % 4))
+        view = {'buffer': 0, 'byteOffset': len(self.binary), 'byteLength': len(data)}
+        if byte_stride:
+            view['byteStride'] = byte_stride
+        if target:
+            view['target'] = target
+        self.binary.extend(data)
+        index = len(self.document['bufferViews'])
+        self.document['bufferViews'].append(view)
+        self._view_keys[key] = index
+        return index
+
+    def _remap(self, source: SourceModel, kind: str, index: int, copy) -> int:
+        key = (id(source), kind, index)
+        if key not in self._remapped:
+            self._remapped[key] = copy(source, source.document[kind][index])
+        return self._remapped[key]
+
+    def view(self, source: SourceModel, index: int) -> int:
+        view = source.document['bufferViews'][index]
+        if view.get('extensions'):
+            raise BakeError(f"Buffer view extensions in {source.url} are not supported")
+        def copy(source, view):
+            return self.add_view(source.view_bytes(index), view.get('byteStride'), view.get('target'))
+        return self._remap(source, 'bufferViews', index, copy)
+
+    def accessor(self, source: SourceModel, index: int) -> int:
+        def copy(source, accessor):
+            accessor = dict(accessor)
+            if accessor.get('bufferView') is not None:
+                accessor['bufferView'] = self.view(source, accessor['bufferView'])
+            if 'sparse' in accessor:
+                sparse = json.loads(json.dumps(accessor['sparse']))
+                for part in ('indices', 'values'):
+                    sparse[part]['bufferView'] = self.view(source, sparse[part]['bufferView'])
+                accessor['sparse'] = sparse
+            return self._intern('accessors', accessor)
+        return self._remap(source, 'accessors', index, copy)
+
+    def image(self, source: SourceModel, index: int) -> int:
+        def copy(source, image):
+            data = source.image_bytes(index)
+            merged = {'bufferView': self.add_view(data), 'mimeType': image.get('mimeType') or _image_mime_type(data)}
+            if image.get('name'):
+                merged['name'] = image['name']
+            return self._intern('images', merged)
+        return self._remap(source, 'images', index, copy)
+
+    def texture(self, source: SourceModel, index: int) -> int:
+        def copy(source, texture):
+            texture = json.loads(json.dumps(texture))
+            if texture.get('source') is not None:
+                texture['source'] = self.image(source, texture['source'])
+            if texture.get('sampler') is not None:
+                texture['sampler'] = self._intern('samplers', dict(source.document['samplers'][texture['sampler']]))
+            # KHR_texture_basisu / EXT_texture_webp point at alternative images
+            for extension in (texture.get('extensions') or {}).values():
+                if isinstance(extension, dict) and extension.get('source') is not None:
+                    extension['source'] = self.image(source, extension['source'])
+            return self._intern('textures', texture)
+        return self._remap(source, 'textures', index, copy)
+
+    def _remap_texture_infos(self, source: SourceModel, value):
+        """Rewrite the texture index of every textureInfo (keys ending in 'Texture')"""
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key.endswith('Texture') and isinstance(item, dict) and 'index' in item:
+                    item['index'] = self.texture(source, item['index'])
+                self._remap_texture_infos(source, item)
+        elif isinstance(value, list):
+            for item in value:
+                self._remap_texture_infos(source, item)
+
+    def material(self, source: SourceModel, index: int) -> int:
+        def copy(source, material):
+            material = json.loads(json.dumps(material))
+            self._remap_texture_infos(source, material)
+            return self._intern('materials', material)
+        return self._remap(source, 'materials', index, copy)
+
+    def mesh(self, source: SourceModel, index: int) -> int:
+        def copy(source, mesh):
+            mesh = json.loads(json.dumps(mesh))
+            for primitive in mesh['primitives']:
+                primitive['attributes'] = {name: self.accessor(source, accessor)
+                                           for name, accessor in primitive['attributes'].items()}
+                if primitive.get('indices') is not None:
+                    primitive['indices'] = self.accessor(source, primitive['indices'])
+                if primitive.get('material') is not None:
+                    primitive['material'] = self.material(source, primitive['material'])
+                if primitive.get('targets'):
+                    primitive['targets'] = [{name: self.accessor(source, accessor) for name, accessor in target.items()}
+                                            for target in primitive['targets']]
+                extensions = primitive.get('extensions') or {}
+                # Variants refer to a document-level list that is not merged
+                extensions.pop('KHR_materials_variants', None)
+                draco = extensions.get('KHR_draco_mesh_compression')
+                if draco:
+                    draco['bufferView'] = self.view(source, draco['bufferView'])
+            return self._intern('meshes', mesh)
+        return self._remap(source, 'meshes', index, copy)
+
+    def add_node(self, node: Dict) -> int:
+        self.document['nodes'].append(node)
+        return len(self.document['nodes']) - 1
+
+    def copy_nodes(self, source: SourceModel, index: int) -> int:
+        """Copy a node and its subtree, sharing the meshes of earlier copies"""
+        node = source.document['nodes'][index]
+        merged = {key: node[key] for key in ('name', 'matrix', 'translation', 'rotation', 'scale', 'weights')
+                  if key in node}
+        if node.get('mesh') is not None:
+            merged['mesh'] = self.mesh(source, node['mesh'])
+        if node.get('children'):
+            merged['children'] = [self.copy_nodes(source, child) for child in node['children']]
+        return self.add_node(merged)
+
+    def add_instances(self, source: SourceModel, instances: List[Any]) -> Optional[List[int]]:
+        """Draw every mesh of a model once per instance matrix with EXT_mesh_gpu_instancing.
+
+        Returns the new nodes, or None when an instance transform has shear and
+        cannot be expressed as translation, rotation and scale.
+        """
+        import numpy as np
+
+        nodes = []
+        for node, local in source.mesh_nodes():
+            transforms = [_decompose(instance @ local) for instance in instances]
+            if any(transform is None for transform in transforms):
+                return None
+            attributes = {}
+            for position, (name, accessor_type) in enumerate((('TRANSLATION', 'VEC3'), ('ROTATION', 'VEC4'),
+                                                              ('SCALE', 'VEC3'))):
+                values = np.asarray([transform[position] for transform in transforms], dtype=np.float32)
+                accessor = {'bufferView': self.add_view(values.tobytes()), 'componentType': FLOAT,
+                            'count': len(values), 'type': accessor_type}
+                attributes[name] = self._intern('accessors', accessor)
+            merged = {'mesh': self.mesh(source, node['mesh']),
+                      'extensions': {'EXT_mesh_gpu_instancing': {'attributes': attributes}}}
+            if node.get('name'):
+                merged['name'] = node['name']
+            if 'weights' in node:
+                merged['weights'] = node['weights']
+            nodes.append(merged)
+        self.extensions.add('EXT_mesh_gpu_instancing')
+        return [self.add_node(node) for node in nodes]
+
+    def glb(self, roots: List[int], sources: List[SourceModel]) -> bytes:
+        document = {'asset': {'version': '2.0', 'generator': 'Renderhaus room baker'},
+                    'scene': 0, 'scenes': [{'nodes': roots}]}
+        document.update({kind: items for kind, items in self.document.items() if items})
+        if self.binary:
+            document['buffers'] = [{'byteLength': len(self.binary)}]
+
+        used, required = set(self.extensions), set(self.extensions)
+        for source in sources:
+            used |= set(source.document.get('extensionsUsed', [])) & SUPPORTED_EXTENSIONS
+            required |= set(source.document.get('extensionsRequired', []))
+        if used:
+            document['extensionsUsed'] = sorted(used)
+        if required:
+            document['extensionsRequired'] = sorted(required)
+
+        json_chunk = json.dumps(document, separators=(',', ':')).encode('utf-8')
+        json_chunk += b' ' * (-len(json_chunk) % 4)
+        binary = bytes(self.binary) + b'\x00' * (-len(self.binary) % 4)
+        length = 12 + 8 + len(json_chunk) + (8 + len(binary) if binary else 0)
+        parts = [struct.pack('<4sII', GLB_MAGIC, 2, length), struct.pack('<II', len(json_chunk), CHUNK_JSON),
+                 json_chunk]
+        if binary:
+            parts += [struct.pack('<II', len(binary), CHUNK_BIN), binary]
+        return b''.join(parts)
+
+
+def bake(placements: List[Dict], models: Dict[str, SourceModel], instancing: str = 'gpu') -> Tuple[bytes, Dict]:
+    """Merge placed models into one GLB; returns the GLB and bake statistics.
+
+    ``placements`` are normalized objects (see ``placement``) whose ``url``
+    has been resolved; ``models`` maps each URL to its loaded model.
+    """
+    builder = _GLBBuilder()
+    by_url: Dict[str, List[Dict]] = {}
+    for placed in placements:
+        by_url.setdefault(placed['url'], []).append(placed)
+
+    roots = []
+    instanced = 0
+    for url, placed_models in by_url.items():
+        source = models[url]
+        if instancing == 'gpu' and len(placed_models) >= GPU_INSTANCING_MIN:
+            matrices = [_trs_matrix(placed['position'], _rotation(placed), placed['scale'])
+                        for placed in placed_models]
+            nodes = builder.add_instances(source, matrices)
+            if nodes is not None:
+                instanced += 1
+                roots.append(builder.add_node({'name': url.rstrip('/').rsplit('/', 1)[-1], 'children': nodes}))
+                continue
+
+        for placed in placed_models:
+            node = {'translation': placed['position'], 'rotation': _rotation(placed), 'scale': placed['scale'],
+                    'children': [builder.copy_nodes(source, root) for root in source.root_nodes()]}
+            if placed.get('name'):
+                node['name'] = str(placed['name'])
+            roots.append(builder.add_node(node))
+
+    glb = builder.glb(roots, list(models.values()))
+    document = builder.document
+    stats = {
+        'objects': len(placements),
+        'models': len(by_url),
+        'instanced_models': instanced,
+        'meshes': len(document['meshes']),
+        'materials': len(document['materials']),
+        'textures': len(document['textures']),
+        'images': len(document['images']),
+        'nodes': len(document['nodes']),
+        'bytes': len(glb)
+    }
+    return glb, stats
+
+
+class RoomBaker:
+    """Resolves, downloads and merges the models of a room"""
+
+    def __init__(self):
+        # Set once MongoDB is reachable; needed to resolve modelIds
+        self.db = None
+        # Room key -> {'bakeKey', 'stats'} of finished bakes, shared by all workers
+        self.bakes = SharedCache('room_bakes', ttl=BAKE_TTL)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def resolve_urls(self, placements: List[Dict]) -> List[Dict]:
+        """Attach the model file URL to every placement; unknown models are left out"""
+        ids_by_type = {}
+        for placed in placements:
+            kind, _, value = placed['model'].partition(':')
+            if kind != 'url':
+                ids_by_type.setdefault(kind, set()).add(value)
+
+        urls = {}
+        if ids_by_type:
+            if self.db is None:
+                raise BakeError('Model lookup is unavailable; send modelUrl for every object')
+            from bson import ObjectId
+            from bson.errors import InvalidId
+
+            for model_type, model_ids in ids_by_type.items():
+                collection = MODEL_COLLECTIONS.get(model_type)
+                if not collection:
+                    continue
+                try:
+                    object_ids = [ObjectId(model_id) for model_id in model_ids]
+                except InvalidId:
+                    raise BakeError('Invalid modelId')
+                for model in self.db[collection].find({'_id': {'$in': object_ids}}, {'fileUrl': 1, 'modelFile.url': 1}):
+                    url = model.get('fileUrl') or (model.get('modelFile') or {}).get('url')
+                    if url:
+                        urls[f"{model_type}:{model['_id']}"] = url
+
+        resolved = []
+        for placed in placements:
+            kind, _, value = placed['model'].partition(':')
+            url = value if kind == 'url' else urls.get(placed['model'])
+            if url:
+                resolved.append({**placed, 'url': url})
+        return resolved
+
+    async def load_models(self, urls: List[str], deadline: Deadline) -> Tuple[Dict[str, SourceModel], Dict[str, str]]:
+        """Download the distinct models of a room concurrently; returns models and errors by URL"""
+        if len(urls) > MAX_BAKE_MODELS:
+            raise BakeError(f"Rooms are limited to {MAX_BAKE_MODELS} distinct models")
+        results = await asyncio.wait_for(
+            asyncio.gather(*(load_model(url, deadline) for url in urls), return_exceptions=True),
+            timeout=deadline.remaining()
+        )
+        models, errors = {}, {}
+        for url, result in zip(urls, results):
+            if isinstance(result, BaseException):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result
+                errors[url] = str(result) or type(result).__name__
+            else:
+                models[url] = result
+        return models, errors
+
+    async def single_flight(self, key: str, work):
+        """Run work() once for concurrent requests with the same key"""
+        future = self._in_flight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(work())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+
+# Create global instance
+room_baker = RoomBaker()
@@ -0,0 +1,164 @@
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import List, Dict, Any, Optional
+from suggestion_cache import DIGEST_MODULUS, model_entry, entry_digest, room_key_from_digest
+from spatial_layout import SpatialLayoutIndex
+
+
+class RoomSession:
+    """Server-side state of a room that is being edited.
+
+    The session keeps the placed models by instance id together with running
+    aggregates (one Counter per feature returned by the suggester's
+    ``room_features``), a spatial index of the model footprints and the room
+    digest. Applying a change only touches
+    the aggregates of the models involved, so it costs O(change)
+    instead of O(room). The analysis built from a session is bounded by the
+    feature vocabularies and the layout's current conflicts, not by the
+    number of models.
+    """
+
+    def __init__(self, session_id: str, suggester, max_models: int = 5000):
+        self.session_id = session_id
+        self.suggester = suggester
+        self.max_models = max_models
+        self.models = {}
+        self.aggregates = {}
+        self.layout = SpatialLayoutIndex()
+        self.digest = 0
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def total_items(self) -> int:
+        """Number of models currently in the room"""
+        return len(self.models)
+
+    def room_key(self) -> str:
+        """Return the room key, identical to the one of a full request for the same room"""
+        return room_key_from_digest(self.suggester.room_key_fields, self.digest)
+
+    def apply(self, changes: List[Dict[str, Any]]):
+        """Apply add/remove/update changes.
+
+        Each change is ``{'op': 'add'|'update', 'id': ..., 'model': {...}}`` or
+        ``{'op': 'remove', 'id': ...}``. Raises ValueError on an invalid change
+        or when the room would exceed max_models; nothing is applied then.
+        """
+        if not isinstance(changes, list):
+            raise ValueError('changes must be a list')
+        normalized = []
+        for change in changes:
+            if not isinstance(change, dict):
+                raise ValueError('Every change must be an object')
+            op = change.get('op')
+            instance_id = change.get('id')
+            if instance_id is None:
+                raise ValueError('Every change needs an id')
+            if op not in ('add', 'update', 'remove'):
+                raise ValueError(f'Unknown change op: {op}')
+            if op != 'remove' and not isinstance(change.get('model'), dict):
+                raise ValueError(f'Change {op} for {instance_id} needs a model object')
+            normalized.append((op, str(instance_id), change.get('model')))
+
+        # Check the size the room ends up with before touching it, so a
+        # rejected request leaves the session unchanged
+        instance_ids = set(self.models)
+        for op, instance_id, _ in normalized:
+            if op == 'remove':
+                instance_ids.discard(instance_id)
+            else:
+                instance_ids.add(instance_id)
+        if len(instance_ids) > self.max_models:
+            raise ValueError(f'Room sessions are limited to {self.max_models} models')
+
+        for op, instance_id, model in normalized:
+            self._remove(instance_id)
+            if op != 'remove':
+                self._add(instance_id, model)
+
+    def _add(self, instance_id: str, model: Dict[str, Any]):
+        """Add a model's features and digest to the running aggregates"""
+        features = self.suggester.room_features(model)
+        digest = entry_digest(model_entry(model, self.suggester.room_key_fields))
+        for name, keys in features.items():
+            self.aggregates.setdefault(name, Counter()).update(keys)
+        footprint = self.suggester.room_footprint(model)
+        if footprint:
+            self.layout.insert(instance_id, footprint)
+        self.digest = (self.digest + digest) % DIGEST_MODULUS
+        self.models[instance_id] = (features, digest)
+
+    def _remove(self, instance_id: str):
+        """Subtract a model's features and digest, if it is in the room"""
+        entry = self.models.pop(instance_id, None)
+        if entry is None:
+            return
+        features, digest = entry
+        for name, keys in features.items():
+            counter = self.aggregates[name]
+            for key in keys:
+                counter[key] -= 1
+                if counter[key] <= 0:
+                    del counter[key]
+        self.layout.remove(instance_id)
+        self.digest = (self.digest - digest) % DIGEST_MODULUS
+
+
+class RoomSessionStore:
+    """Bounded, expiring store of room sessions"""
+
+    def __init__(self, suggester, max_sessions: int = 1000, ttl: float = 1800.0, max_models: int = 5000):
+        self.suggester = suggester
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_models = max_models
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, placed_models: List[Dict] = None) -> RoomSession:
+        """Start a session, optionally seeded with a full room"""
+        session = RoomSession(uuid.uuid4().hex, self.suggester, self.max_models)
+        if placed_models:
+            session.apply([{'op': 'add', 'id': model.get('instanceId', index), 'model': model}
+                           for index, model in enumerate(placed_models)])
+
+        with self._lock:
+            self._expire()
+            self._sessions[session.session_id] = session
+            # Evict the least recently used sessions to bound memory
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[RoomSession]:
+        """Return a live session and mark it as recently used"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.last_access > self.ttl:
+                del self._sessions[session_id]
+                return None
+            session.last_access = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        """End a session; returns False if it did not exist"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        """Drop expired sessions from the least recently used end; the caller holds the lock"""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.ttl:
+                break
+            del self._sessions[session_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,207 @@
+"""Host-wide cache shared by all worker processes, backed by SQLite in WAL mode.
+
+Every worker on a host opens the same database file, so a thumbnail or
+model analysis computed by one worker is a hit for all of them. In WAL
+mode readers never block on writers or each other. Each ``SharedCache``
+keeps a small in-process front cache for its hottest keys, so repeated
+hits skip SQLite entirely.
+
+The file is bounded to SHARED_CACHE_MAX_MB: writes periodically evict the
+least recently used entries (access times are refreshed at most once per
+ACCESS_RESOLUTION seconds, so reads stay read-only in the common case).
+Cache errors are logged and treated as misses; the cache never fails a
+request.
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+from suggestion_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH',
+                              os.path.join(tempfile.gettempdir(), 'renderhaus-shared-cache.sqlite3'))
+SHARED_CACHE_MAX_BYTES = int(float(os.getenv('SHARED_CACHE_MAX_MB', 256)) * 1024 * 1024)
+ACCESS_RESOLUTION = 60.0
+# Writes between size checks
+EVICTION_INTERVAL = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+class _Database:
+    """Per-thread, per-process connections to one cache file"""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        # Connections must not be reused across a fork
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def count_write(self) -> bool:
+        """Return True every EVICTION_INTERVAL writes"""
+        with self._lock:
+            self._writes += 1
+            return self._writes % EVICTION_INTERVAL == 0
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under the size bound"""
+        connection = self.connection()
+        connection.execute('DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?', (time.time(),))
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Free down to 90% so eviction does not run on every write at the bound
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        keys = []
+        for key, size in connection.execute('SELECT key, size FROM entries ORDER BY accessed'):
+            keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        connection.executemany('DELETE FROM entries WHERE key = ?', keys)
+
+
+def _json_default(value: Any) -> Any:
+    # NumPy scalars and arrays, as found in model analyses
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+_instances: Dict[str, 'SharedCache'] = {}
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def _database(path: str, max_bytes: int) -> _Database:
+    with _databases_lock:
+        if path not in _databases:
+            _databases[path] = _Database(path, max_bytes)
+        return _databases[path]
+
+
+class SharedCache:
+    """Namespaced view of the host-wide cache with a local front cache.
+
+    Values may be bytes, str or JSON-serializable objects.
+    """
+
+    def __init__(self, namespace: str, ttl: Optional[float] = None, front_size: int = 128,
+                 path: str = SHARED_CACHE_PATH, max_bytes: int = SHARED_CACHE_MAX_BYTES):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.front = TTLCache(maxsize=front_size, ttl=ttl or 300.0)
+        self._db = _database(path, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        _instances[namespace] = self
+
+    def _key(self, key: str) -> str:
+        return f'{self.namespace}:{key}'
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.front.get(key)
+        if value is not None:
+            return value
+        try:
+            connection = self._db.connection()
+            row = connection.execute('SELECT kind, value, expires, accessed FROM entries WHERE key = ?',
+                                     (self._key(key),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            kind, stored, expires, accessed = row
+            now = time.time()
+            if expires is not None and expires < now:
+                self.misses += 1
+                return None
+            if now - accessed > ACCESS_RESOLUTION:
+                connection.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, self._key(key)))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return None
+
+        self.hits += 1
+        value = self._decode(kind, stored)
+        self.front.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.front.set(key, value)
+        now = time.time()
+        try:
+            kind, stored = self._encode(value)
+            self._db.connection().execute(
+                'INSERT OR REPLACE INTO entries (key, kind, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+                (self._key(key), kind, stored, len(stored), now + self.ttl if self.ttl else None, now)
+            )
+            if self._db.count_write():
+                self._db.evict()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def clear(self):
+        """Remove this namespace's entries from the shared and front caches"""
+        self.front.clear()
+        try:
+            self._db.connection().execute('DELETE FROM entries WHERE key LIKE ?', (f'{self.namespace}:%',))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Front cache counters plus hits and misses that reached the shared file"""
+        return {
+            'front': self.front.stats(),
+            'shared_hits': self.hits,
+            'shared_misses': self.misses
+        }
+
+    @staticmethod
+    def _encode(value: Any):
+        if isinstance(value, bytes):
+            return 'b', value
+        if isinstance(value, str):
+            return 's', value.encode('utf-8')
+        return 'j', json.dumps(value, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+    @staticmethod
+    def _decode(kind: str, stored: bytes) -> Any:
+        if kind == 'b':
+            return bytes(stored)
+        if kind == 's':
+            return bytes(stored).decode('utf-8')
+        return json.loads(stored)
+
+
+def shared_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {namespace: cache.stats() for namespace, cache in _instances.items()}
@@ -0,0 +1,238 @@
+import math
+from typing import List, Dict, Any, Optional, Tuple
+
+# Default floor footprints (width, depth) in meters by layout role, used when
+# a placed model does not carry its own dimensions
+DEFAULT_FOOTPRINTS = {
+    'seating': (0.9, 0.9),
+    'table': (1.1, 0.7),
+    'bed': (1.6, 2.0),
+    'storage': (1.0, 0.45),
+    'lighting': (0.4, 0.4),
+    'other': (0.6, 0.6)
+}
+
+# Gaps below TIGHT_CLEARANCE leave no room to reach or use a piece; gaps below
+# WALKWAY_WIDTH are too narrow to walk through
+TIGHT_CLEARANCE = 0.3
+WALKWAY_WIDTH = 0.6
+# How far a table may be from a seat and still be within reach
+TABLE_REACH = 1.2
+
+
+class Footprint:
+    """Axis-aligned floor rectangle of a placed model"""
+
+    __slots__ = ('x0', 'z0', 'x1', 'z1', 'role', 'label', 'solid')
+
+    def __init__(self, x0: float, z0: float, x1: float, z1: float, role: str = 'other',
+                 label: str = '', solid: bool = True):
+        self.x0, self.z0, self.x1, self.z1 = x0, z0, x1, z1
+        self.role = role
+        self.label = label
+        self.solid = solid
+
+    def gap(self, other: 'Footprint') -> float:
+        """Distance between two footprints; negative when they overlap"""
+        dx = max(self.x0, other.x0) - min(self.x1, other.x1)
+        dz = max(self.z0, other.z0) - min(self.z1, other.z1)
+        if dx < 0 and dz < 0:
+            return max(dx, dz)
+        return math.hypot(max(dx, 0.0), max(dz, 0.0))
+
+
+def _vector(value, axis: int):
+    """Read one axis from an {x, y, z} dict or an [x, y, z] list, as sent by the editor"""
+    if isinstance(value, dict):
+        component = value.get('xyz'[axis])
+    elif isinstance(value, (list, tuple)) and len(value) >= 3:
+        component = value[axis]
+    else:
+        return None
+    return component if isinstance(component, (int, float)) else None
+
+
+def position_height(model: Dict[str, Any]) -> float:
+    """Height of a placed model above the floor"""
+    return _vector(model.get('position'), 1) or 0
+
+
+def footprint_from_model(model: Dict[str, Any], role: str, solid: bool = True) -> Optional[Footprint]:
+    """Build a footprint from a placed model's position, rotation and dimensions.
+
+    Returns None when the model has no usable position.
+    """
+    x, z = _vector(model.get('position'), 0), _vector(model.get('position'), 2)
+    if x is None or z is None:
+        return None
+
+    # The model's own outline, from its collision proxy (see collision_proxies.py)
+    proxy = model.get('collisionProxy')
+    outline = proxy.get('footprint') if isinstance(proxy, dict) else None
+    if outline:
+        scale_x, scale_z = _vector(model.get('scale'), 0) or 1, _vector(model.get('scale'), 2) or 1
+        angle = _vector(model.get('rotation'), 1) or 0
+        cos_a, sin_a = math.cos(angle), math.sin(angle)
+        xs = [x + px * scale_x * cos_a + pz * scale_z * sin_a for px, pz in outline]
+        zs = [z - px * scale_x * sin_a + pz * scale_z * cos_a for px, pz in outline]
+        return Footprint(min(xs), min(zs), max(xs), max(zs), role, model.get('name', ''), solid)
+
+    width, depth = DEFAULT_FOOTPRINTS.get(role, DEFAULT_FOOTPRINTS['other'])
+    dimensions = model.get('dimensions')
+    if isinstance(dimensions, dict):
+        width = dimensions.get('width') or width
+        depth = dimensions.get('depth') or depth
+        # Scale applies to the model's own dimensions, not to the role defaults
+        width *= _vector(model.get('scale'), 0) or 1
+        depth *= _vector(model.get('scale'), 2) or 1
+
+    # Bounding rectangle of the footprint after rotating about the vertical axis
+    angle = _vector(model.get('rotation'), 1) or 0
+    cos_a, sin_a = abs(math.cos(angle)), abs(math.sin(angle))
+    half_x = (width * cos_a + depth * sin_a) / 2
+    half_z = (width * sin_a + depth * cos_a) / 2
+
+    return Footprint(x - half_x, z - half_z, x + half_x, z + half_z, role,
+                     model.get('name', ''), solid)
+
+
+class SpatialLayoutIndex:
+    """Uniform-grid index over placed footprints with incrementally kept conflicts.
+
+    Every insert or remove only looks at the grid cells around the changed
+    footprint, so building the index for n models costs O(n * k) for k
+    neighbours per model, and an editing change costs O(k). Overlaps, tight
+    clearances, narrow walkways and seating without a table in reach are
+    kept up to date as models come and go.
+    """
+
+    def __init__(self, cell_size: float = 1.0, reach: float = max(WALKWAY_WIDTH, TABLE_REACH)):
+        self.cell_size = cell_size
+        self.reach = reach
+        self.items = {}
+        self.cells = {}
+        self.conflicts = {}
+        self.unserved_seating = set()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _cells(self, x0: float, z0: float, x1: float, z1: float):
+        """Yield the grid cells covering a rectangle"""
+        for i in range(math.floor(x0 / self.cell_size), math.floor(x1 / self.cell_size) + 1):
+            for j in range(math.floor(z0 / self.cell_size), math.floor(z1 / self.cell_size) + 1):
+                yield i, j
+
+    def neighbours(self, footprint: Footprint, radius: float) -> List[Tuple[Any, Footprint, float]]:
+        """Return (id, footprint, gap) for items within radius of a footprint"""
+        seen = set()
+        result = []
+        for cell in self._cells(footprint.x0 - radius, footprint.z0 - radius,
+                                footprint.x1 + radius, footprint.z1 + radius):
+            for item_id in self.cells.get(cell, ()):
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                other = self.items[item_id]
+                if other is footprint:
+                    continue
+                gap = footprint.gap(other)
+                if gap <= radius:
+                    result.append((item_id, other, gap))
+        return result
+
+    def insert(self, item_id, footprint: Footprint):
+        """Add a footprint and update the conflicts around it"""
+        self.remove(item_id)
+        neighbours = self.neighbours(footprint, self.reach)
+
+        self.items[item_id] = footprint
+        for cell in self._cells(footprint.x0, footprint.z0, footprint.x1, footprint.z1):
+            self.cells.setdefault(cell, set()).add(item_id)
+
+        self.conflicts[item_id] = {}
+        for other_id, other, gap in neighbours:
+            kind = self._conflict_kind(footprint, other, gap)
+            if kind:
+                self.conflicts[item_id][other_id] = (kind, gap)
+                self.conflicts[other_id][item_id] = (kind, gap)
+
+        if footprint.role == 'seating':
+            if not any(other.role == 'table' and gap <= TABLE_REACH for _, other, gap in neighbours):
+                self.unserved_seating.add(item_id)
+        elif footprint.role == 'table':
+            for other_id, other, gap in neighbours:
+                if other.role == 'seating' and gap <= TABLE_REACH:
+                    self.unserved_seating.discard(other_id)
+
+    def remove(self, item_id):
+        """Remove a footprint and update the conflicts around it"""
+        footprint = self.items.pop(item_id, None)
+        if footprint is None:
+            return
+
+        for cell in self._cells(footprint.x0, footprint.z0, footprint.x1, footprint.z1):
+            members = self.cells.get(cell)
+            if members is not None:
+                members.discard(item_id)
+                if not members:
+                    del self.cells[cell]
+
+        for other_id in self.conflicts.pop(item_id, {}):
+            self.conflicts[other_id].pop(item_id, None)
+        self.unserved_seating.discard(item_id)
+
+        # Seats that relied on this table may now have none in reach
+        if footprint.role == 'table':
+            for other_id, other, _ in self.neighbours(footprint, TABLE_REACH):
+                if other.role == 'seating' and not any(
+                        candidate.role == 'table' and gap <= TABLE_REACH
+                        for _, candidate, gap in self.neighbours(other, TABLE_REACH)):
+                    self.unserved_seating.add(other_id)
+
+    @staticmethod
+    def _conflict_kind(a: Footprint, b: Footprint, gap: float) -> Optional[str]:
+        """Classify the relation between two nearby footprints"""
+        if not (a.solid and b.solid):
+            return None
+        # Seats belong at tables, so those pairs may touch or even overlap
+        if {a.role, b.role} == {'seating', 'table'}:
+            return None
+        if gap < 0:
+            return 'overlap'
+        # Small pieces such as lamps are meant to stand close to other furniture
+        if 'lighting' in (a.role, b.role):
+            return None
+        if gap < TIGHT_CLEARANCE:
+            return 'tight'
+        if gap < WALKWAY_WIDTH:
+            return 'narrow_walkway'
+        return None
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        """Summarize the current conflicts, costing O(conflicts) rather than O(n^2).
+
+        Each list is sorted by gap and truncated to ``limit`` entries; the
+        full sizes are reported under ``counts``.
+        """
+        report = {'overlaps': [], 'tight_clearances': [], 'narrow_walkways': [], 'seating_without_table': []}
+        keys = {'overlap': 'overlaps', 'tight': 'tight_clearances', 'narrow_walkway': 'narrow_walkways'}
+
+        for item_id, others in self.conflicts.items():
+            for other_id, (kind, gap) in others.items():
+                # Each pair is stored under both ids; report it once
+                if str(item_id) < str(other_id):
+                    report[keys[kind]].append({
+                        'items': [self.items[item_id].label, self.items[other_id].label],
+                        'gap': round(max(gap, 0.0), 2)
+                    })
+
+        report['seating_without_table'] = sorted(self.items[item_id].label for item_id in self.unserved_seating)
+        for key in keys.values():
+            report[key].sort(key=lambda entry: (entry['gap'], entry['items']))
+
+        report['counts'] = {key: len(entries) for key, entries in report.items()}
+        for key in keys.values():
+            del report[key][limit:]
+        del report['seating_without_table'][limit:]
+        return report
@@ -0,0 +1,173 @@
+"""Cold-start tooling for the Python backend.
+
+Heavy dependencies (scikit-learn, numpy, pygltflib, httpx) are imported on
+first use, so importing ``app`` stays cheap. This module covers the rest:
+
+- ``warm_up()`` loads them ahead of the first request. Call it from a
+  preforking server's preload hook, or set WARMUP_ON_START=true to run it
+  when the app starts serving.
+- ``python startup.py report`` prints the per-module import cost of ``app``.
+- ``python startup.py check`` fails when a cold import of ``app`` exceeds
+  the COLD_START_BUDGET (seconds) or loads any of DEFERRED_MODULES, for
+  use in CI.
+
+Usage:
+    python startup.py report [--top 25] [--module app]
+    python startup.py check [--budget 1.0] [--runs 3] [--module app]
+    python startup.py warmup
+"""
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+from typing import List, Dict, Any
+
+# Optional heavy modules loaded by warm_up; missing ones are skipped
+WARMUP_MODULES = ['numpy', 'sklearn.feature_extraction.text', 'sklearn.cluster', 'pygltflib', 'httpx']
+COLD_START_BUDGET = float(os.getenv('COLD_START_BUDGET', 1.0))
+# Modules that importing app must not load; they belong to the first request that needs them
+DEFERRED_MODULES = ['numpy', 'PIL', 'requests', 'sklearn', 'scipy', 'pygltflib', 'httpx']
+
+WARMUP_ROOM = [
+    {'name': 'Modern Sofa', 'category': 'living', 'position': [0, 0, 0]},
+    {'name': 'Coffee Table', 'category': 'living', 'position': [1.2, 0, 0]},
+    {'name': 'Floor Lamp', 'category': 'lighting', 'position': [-1.0, 0, 0.5]}
+]
+
+
+def warm_up() -> Dict[str, float]:
+    """Import heavy modules and exercise the suggestion path; returns seconds per step"""
+    timings = {}
+    for module in WARMUP_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+        timings[module] = round(time.perf_counter() - started, 3)
+
+    from furniture_classifier import default_classifier
+    from ai_suggestions import ai_suggester
+
+    started = time.perf_counter()
+    default_classifier().fit()
+    timings['classifier'] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    ai_suggester.generate_full_suggestions(WARMUP_ROOM)
+    timings['suggestions'] = round(time.perf_counter() - started, 3)
+
+    print(f"🔥 Warm-up finished in {sum(timings.values()):.2f}s")
+    return timings
+
+
+def _fresh_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    """Run code in a new interpreter from this directory"""
+    return subprocess.run([sys.executable, *flags, '-c', code], capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module: str = 'app') -> List[Dict[str, Any]]:
+    """Import a module in a fresh interpreter and return per-module import costs in seconds"""
+    result = _fresh_python(f'import {module}', '-X', 'importtime')
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+            'self': int(self_us) / 1e6,
+            'cumulative': int(cumulative_us) / 1e6
+        })
+    return entries
+
+
+def report(module: str = 'app', top: int = 25):
+    """Print the most expensive imports and the cost per top-level package"""
+    entries = import_profile(module)
+    total = next((entry['cumulative'] for entry in reversed(entries) if entry['module'] == module), 0.0)
+
+    packages = {}
+    for entry in entries:
+        package = entry['module'].split('.')[0]
+        packages[package] = packages.get(package, 0.0) + entry['self']
+
+    print(f"⏱️  import {module}: {total:.3f}s")
+    print(f"\n{'package':<32}{'self (s)':>10}")
+    for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<32}{seconds:>10.3f}")
+
+    print(f"\n{'module':<48}{'self (s)':>10}{'cumulative (s)':>16}")
+    for entry in sorted(entries, key=lambda entry: -entry['self'])[:top]:
+        print(f"{entry['module']:<48}{entry['self']:>10.3f}{entry['cumulative']:>16.3f}")
+
+
+def cold_start_seconds(module: str = 'app', runs: int = 3) -> float:
+    """Best wall time of importing a module in a fresh interpreter over several runs"""
+    code = f'import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)'
+    timings = []
+    for _ in range(runs):
+        result = _fresh_python(code)
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def eagerly_loaded(module: str = 'app') -> List[str]:
+    """DEFERRED_MODULES that a cold import of the module loads"""
+    code = (f'import sys; import {module}; '
+            f'print(" ".join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))')
+    result = _fresh_python(code)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return result.stdout.strip().splitlines()[-1].split() if result.stdout.strip() else []
+
+
+def check(module: str = 'app', budget: float = COLD_START_BUDGET, runs: int = 3) -> bool:
+    """Return whether a cold import of the module stays within the budget and defers heavy modules"""
+    seconds = cold_start_seconds(module, runs)
+    within = seconds <= budget
+    print(f"{'✅' if within else '❌'} Cold start of {module}: {seconds:.3f}s (budget {budget:.3f}s)")
+
+    loaded = eagerly_loaded(module)
+    if loaded:
+        print(f"❌ Importing {module} loads {', '.join(loaded)}; run `startup.py report` to find the importer")
+    else:
+        print(f"✅ Importing {module} defers {', '.join(DEFERRED_MODULES)}")
+    return within and not loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start profiling and warm-up for the Python backend')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report_parser = commands.add_parser('report', help='print per-module import costs')
+    report_parser.add_argument('--module', default='app')
+    report_parser.add_argument('--top', type=int, default=25)
+
+    check_parser = commands.add_parser('check', help='fail when cold start exceeds the budget')
+    check_parser.add_argument('--module', default='app')
+    check_parser.add_argument('--budget', type=float, default=COLD_START_BUDGET, help='seconds')
+    check_parser.add_argument('--runs', type=int, default=3, help='imports to time; the best one counts')
+
+    commands.add_parser('warmup', help='run the warm-up hook and print its timings')
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        report(args.module, args.top)
+    elif args.command == 'check':
+        sys.exit(0 if check(args.module, args.budget, args.runs) else 1)
+    else:
+        print(warm_up())
+
+
+if __name__ == '__main__':
+    main()
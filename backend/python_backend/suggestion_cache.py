@@ -0,0 +1,102 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+
+# Room digests are sums of per-model hashes modulo 2**256, so a model can be
+# added to or removed from a digest without rehashing the rest of the room
+DIGEST_MODULUS = 1 << 256
+
+
+def model_entry(model: Dict, fields: Iterable[str]) -> str:
+    """Serialize the fields of a model that take part in the room key"""
+    return json.dumps([model.get(field) for field in fields], sort_keys=True, default=str)
+
+
+def entry_digest(entry: str) -> int:
+    """Hash a serialized model entry to an integer"""
+    return int.from_bytes(hashlib.sha256(entry.encode('utf-8')).digest(), 'big')
+
+
+def room_key_from_digest(fields: Iterable[str], digest: int) -> str:
+    """Turn a room digest into a cache key"""
+    key = hashlib.sha256('|'.join(fields).encode('utf-8'))
+    key.update(digest.to_bytes(32, 'big'))
+    return key.hexdigest()
+
+
+def canonical_room(placed_models: List[Dict], fields: Iterable[str]) -> Tuple[str, List[Dict]]:
+    """Hash a room as a multiset of the given model fields.
+
+    Returns the key together with the models in canonical order. The key does
+    not depend on the order in which models were placed, so the same room
+    always maps to the same key and is analysed in the same order.
+    """
+    fields = list(fields)
+    entries = sorted((model_entry(model, fields), index) for index, model in enumerate(placed_models))
+    digest = sum(entry_digest(entry) for entry, _ in entries) % DIGEST_MODULUS
+    return room_key_from_digest(fields, digest), [placed_models[index] for _, index in entries]
+
+
+def canonical_room_key(placed_models: List[Dict], fields: Iterable[str]) -> str:
+    """Hash a room as a multiset of the given model fields"""
+    return canonical_room(placed_models, fields)[0]
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a time-to-live"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entries when full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit-rate counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
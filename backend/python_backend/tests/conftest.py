@@ -0,0 +1,20 @@
+import asyncio
+import os
+import sys
+import pytest
+
+# The backend modules are imported by name, as when app.py is started from
+# this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def api():
+    """Call the Quart app without starting its Mongo monitor: api('GET', path, **kwargs)"""
+    from app import app
+
+    async def request(method, path, **kwargs):
+        response = await app.test_client().open(path, method=method, **kwargs)
+        return response, await response.get_data()
+
+    return lambda method, path, **kwargs: asyncio.run(request(method, path, **kwargs))
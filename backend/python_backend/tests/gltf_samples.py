@@ -0,0 +1,87 @@
+"""Small in-memory glTF models for the tests"""
+import json
+import struct
+import numpy as np
+
+BOX_CORNERS = np.array([[x, y, z] for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)])
+BOX_FACES = np.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+                      [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]])
+
+
+def mesh_glb(positions, indices, node: dict = None, color=(0.8, 0.2, 0.2, 1.0)) -> bytes:
+    """A GLB with one indexed triangle mesh under one node"""
+    positions = np.asarray(positions, dtype='<f4')
+    indices = np.asarray(indices, dtype='<u2').ravel()
+    index_bytes = indices.tobytes() + b'\0' * (-len(indices.tobytes()) % 4)
+    binary = index_bytes + positions.tobytes()
+    document = {
+        'asset': {'version': '2.0'},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [dict(node or {}, mesh=0)],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 1}, 'indices': 0, 'material': 0}]}],
+        'materials': [{'pbrMetallicRoughness': {'baseColorFactor': list(color)}}],
+        'accessors': [
+            {'bufferView': 0, 'componentType': 5123, 'count': len(indices), 'type': 'SCALAR'},
+            {'bufferView': 1, 'componentType': 5126, 'count': len(positions), 'type': 'VEC3',
+             'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()}
+        ],
+        'bufferViews': [
+            {'buffer': 0, 'byteOffset': 0, 'byteLength': len(indices) * 2, 'target': 34963},
+            {'buffer': 0, 'byteOffset': len(index_bytes), 'byteLength': positions.nbytes, 'target': 34962}
+        ],
+        'buffers': [{'byteLength': len(binary)}]
+    }
+    json_bytes = json.dumps(document).encode('utf-8')
+    json_bytes += b' ' * (-len(json_bytes) % 4)
+    length = 12 + 8 + len(json_bytes) + 8 + len(binary)
+    return (struct.pack('<4sII', b'glTF', 2, length)
+            + struct.pack('<II', len(json_bytes), 0x4E4F534A) + json_bytes
+            + struct.pack('<II', len(binary), 0x004E4942) + binary)
+
+
+def box_glb(size=(1.0, 1.0, 1.0), node: dict = None, **kwargs) -> bytes:
+    """A GLB of an axis-aligned box centered on the origin"""
+    return mesh_glb(BOX_CORNERS * np.asarray(size), BOX_FACES, node, **kwargs)
+
+
+def png(color, size: int = 8) -> bytes:
+    """A solid-color PNG"""
+    from io import BytesIO
+    from PIL import Image
+
+    output = BytesIO()
+    Image.new('RGB', (size, size), tuple(color)).save(output, format='PNG')
+    return output.getvalue()
+
+
+def textured_gltf(images, counts=None) -> bytes:
+    """A .gltf with one material per image, each used as its base color texture.
+
+    ``images`` are external image URIs, or ``(buffer_uri, byte_length)`` pairs
+    for images held in an external buffer. Material i is drawn with
+    ``counts[i]`` indices; the geometry buffer itself is never read.
+    """
+    counts = counts or [3] * len(images)
+    document = {
+        'asset': {'version': '2.0'},
+        'buffers': [{'uri': 'geometry.bin', 'byteLength': 36}],
+        'bufferViews': [{'buffer': 0, 'byteOffset': 0, 'byteLength': 36}],
+        'accessors': [{'bufferView': 0, 'componentType': 5126, 'count': 3, 'type': 'VEC3'}],
+        'images': [], 'textures': [], 'materials': [],
+        'meshes': [{'primitives': []}]
+    }
+    for index, (image, count) in enumerate(zip(images, counts)):
+        if isinstance(image, str):
+            document['images'].append({'uri': image, 'mimeType': 'image/png'})
+        else:
+            buffer_uri, byte_length = image
+            document['buffers'].append({'uri': buffer_uri, 'byteLength': byte_length})
+            document['bufferViews'].append({'buffer': len(document['buffers']) - 1, 'byteLength': byte_length})
+            document['images'].append({'bufferView': len(document['bufferViews']) - 1, 'mimeType': 'image/png'})
+        document['textures'].append({'source': index})
+        document['materials'].append({'pbrMetallicRoughness': {'baseColorTexture': {'index': index}}})
+        document['accessors'].append({'bufferView': 0, 'componentType': 5123, 'count': count, 'type': 'SCALAR'})
+        document['meshes'][0]['primitives'].append(
+            {'attributes': {'POSITION': 0}, 'indices': len(document['accessors']) - 1, 'material': index})
+    return json.dumps(document).encode('utf-8')
@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from admission import AdmissionPool, Overloaded, pools
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_slot_is_released_when_the_view_fails():
+    async def scenario():
+        pool = AdmissionPool('test', max_concurrent=1, max_queue=1, queue_timeout=0.1)
+        with pytest.raises(RuntimeError):
+            async with pool.slot():
+                raise RuntimeError('view failed')
+        assert pool.active == 0
+        async with pool.slot():
+            assert pool.active == 1
+        return pool.stats()
+
+    stats = run(scenario())
+    assert stats['admitted'] == 2
+    assert stats['active'] == 0
+
+
+def test_full_queue_and_timeout_are_rejected():
+    async def scenario():
+        pool = AdmissionPool('test', max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as rejected:
+            await pool.acquire()
+        assert rejected.value.reason == 'queue full'
+        with pytest.raises(Overloaded) as timed_out:
+            await waiter
+        assert timed_out.value.reason == 'queue timeout'
+        pool.release()
+        return pool.stats()
+
+    stats = run(scenario())
+    assert (stats['rejected'], stats['timed_out'], stats['active'], stats['queue_depth']) == (1, 1, 0, 0)
+
+
+def test_queued_request_gets_the_released_slot():
+    async def scenario():
+        pool = AdmissionPool('test', max_concurrent=1, max_queue=1, queue_timeout=1.0)
+        await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+        assert pool.waiting == 1
+        pool.release()
+        await waiter
+        assert pool.active == 1
+
+    run(scenario())
+
+
+@pytest.mark.parametrize('body', [
+    {'models': [{'id': 'a', 'modelUrl': 'http://x/a.glb'}], 'size': 400},
+    {'models': [{'id': 'a', 'modelUrl': 'http://x/a.glb'}], 'size': ['400', 400]},
+    {'models': [{'id': 'a', 'modelUrl': 'http://x/a.glb'}], 'size': [400, 400, 3]},
+    {'models': 'a.glb'},
+    {'models': []}
+])
+def test_bad_batch_requests_do_not_leak_batch_slots(api, body):
+    active = pools['batch'].active
+    for _ in range(pools['batch'].max_concurrent + 1):
+        response, _ = api('POST', '/api/python/thumbnail/batch', json=body)
+        assert response.status_code == 400
+    assert pools['batch'].active == active
+
+
+def test_batch_releases_its_slot_after_streaming(api):
+    active = pools['batch'].active
+    response, body = api('POST', '/api/python/thumbnail/batch', json={
+        'models': [{'id': 'a', 'modelUrl': 'http://localhost:1/a.glb'}, {'id': 'b'}],
+        'size': [64, 64], 'inline': True
+    })
+    assert response.status_code == 200
+    assert b'"id":"b"' in body.replace(b' ', b'')
+    assert pools['batch'].active == active
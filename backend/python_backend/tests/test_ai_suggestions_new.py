@@ -0,0 +1,74 @@
+import pytest
+from ai_suggestions_new import FurnitureAISuggester
+
+
+@pytest.fixture(scope='module')
+def suggester():
+    return FurnitureAISuggester()
+
+
+def reference_score(suggester, color, current_colors):
+    """The per-pair harmony loop the compiled matrices replace"""
+    if not current_colors:
+        return 0.7
+
+    harmony_score = 0.0
+    for current_color in current_colors:
+        if (current_color in suggester.color_harmony["complementary"] and
+                color in suggester.color_harmony["complementary"][current_color]):
+            harmony_score += 0.9
+        elif (current_color in suggester.color_harmony["analogous"] and
+              color in suggester.color_harmony["analogous"][current_color]):
+            harmony_score += 0.8
+        elif color in ["white", "gray", "beige", "cream"] or current_color in ["white", "gray"]:
+            harmony_score += 0.7
+        else:
+            harmony_score += 0.3
+    return min(harmony_score / len(current_colors), 1.0)
+
+
+def reference_type(suggester, color, current_colors):
+    for current_color in current_colors:
+        if (current_color in suggester.color_harmony["complementary"] and
+                color in suggester.color_harmony["complementary"][current_color]):
+            return "complementary"
+        elif (current_color in suggester.color_harmony["analogous"] and
+              color in suggester.color_harmony["analogous"][current_color]):
+            return "analogous"
+    return "neutral"
+
+
+@pytest.mark.parametrize('current_colors', [
+    [],
+    ['beige'],
+    ['navy'],
+    ['white'],
+    ['red'],
+    ['magenta'],
+    ['navy', 'beige', 'gray'],
+    ['red', 'navy', 'navy', 'wood'],
+    ['teal', 'brass', 'black', 'brown', 'white']
+])
+def test_compiled_harmony_matches_pairwise_rules(suggester, current_colors):
+    candidates = suggester.harmony_colors + ['magenta', 'any']
+    scores, types = suggester.score_colors(candidates, current_colors)
+    assert scores.tolist() == pytest.approx([reference_score(suggester, color, current_colors)
+                                             for color in candidates])
+    assert types == [reference_type(suggester, color, current_colors) for color in candidates]
+
+
+def test_harmony_types(suggester):
+    scores, types = suggester.score_colors(['navy', 'blue', 'cream', 'red', 'gold'], ['beige'])
+    assert types == ['complementary', 'neutral', 'analogous', 'neutral', 'neutral']
+    assert scores.tolist() == pytest.approx([0.9, 0.3, 0.8, 0.3, 0.3])
+
+    # The first current color with a rule decides the type; the score averages all of them
+    scores, types = suggester.score_colors(['blue'], ['red', 'navy', 'gray'])
+    assert types == ['analogous']
+    assert scores.tolist() == pytest.approx([(0.3 + 0.8 + 0.9) / 3])
+
+    # Empty rooms and empty candidate lists
+    scores, types = suggester.score_colors(['red', 'navy'], [])
+    assert scores.tolist() == [0.7, 0.7] and types == ['neutral', 'neutral']
+    scores, types = suggester.score_colors([], ['navy'])
+    assert len(scores) == 0 and types == []
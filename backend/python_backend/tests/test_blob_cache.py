@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from async_io import close_http_client, fetch_bytes
+from blob_cache import BlobCache
+
+
+class ModelServer(BaseHTTPRequestHandler):
+    """Serves /model.glb with an ETag and honours If-None-Match; /plain.glb has no validators"""
+    body = b'glTF' + b'\0' * 1000
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/model.glb' and self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.path == '/model.glb':
+            self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    ModelServer.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ModelServer)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+
+
+def fetch(url, cache):
+    async def fetch_and_close():
+        try:
+            return await fetch_bytes(url, cache=cache)
+        finally:
+            await close_http_client()
+    return asyncio.run(fetch_and_close())
+
+
+def test_revalidates_with_etag(server, tmp_path):
+    cache = BlobCache(str(tmp_path))
+    url = f'{server}/model.glb'
+    assert fetch(url, cache) == ModelServer.body
+    assert fetch(url, cache) == ModelServer.body
+    assert ModelServer.requests == [('/model.glb', None), ('/model.glb', '"v1"')]
+    assert (cache.downloaded, cache.revalidated) == (1, 1)
+
+
+def test_changed_model_is_downloaded_again(server, tmp_path, monkeypatch):
+    cache = BlobCache(str(tmp_path))
+    url = f'{server}/model.glb'
+    fetch(url, cache)
+    monkeypatch.setattr(ModelServer, 'etag', '"v2"')
+    monkeypatch.setattr(ModelServer, 'body', b'glTF-updated')
+    assert fetch(url, cache) == b'glTF-updated'
+    assert cache.lookup(url)[0]['etag'] == '"v2"'
+
+
+def test_responses_without_validators_are_not_cached(server, tmp_path):
+    cache = BlobCache(str(tmp_path))
+    fetch(f'{server}/plain.glb', cache)
+    assert cache.lookup(f'{server}/plain.glb') is None
+    assert [request[1] for request in ModelServer.requests] == [None]
+
+
+def test_corrupt_entries_are_ignored(tmp_path):
+    cache = BlobCache(str(tmp_path))
+    cache.store('http://cdn/a.glb', b'abcdef', {'ETag': '"a"'})
+    path = cache._path('http://cdn/a.glb')
+    with open(path, 'r+b') as blob:
+        blob.truncate(os.path.getsize(path) - 2)
+    assert cache.lookup('http://cdn/a.glb') is None
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = BlobCache(str(tmp_path))
+    for index, name in enumerate('abc'):
+        cache.store(f'http://cdn/{name}.glb', bytes(1000), {'ETag': f'"{name}"'})
+        os.utime(cache._path(f'http://cdn/{name}.glb'), (index, index))
+    # A hit refreshes the oldest file, so the next oldest goes
+    cache.not_modified('http://cdn/a.glb', cache.lookup('http://cdn/a.glb'))
+    cache.max_bytes = 2500
+    cache._evict()
+    assert cache.lookup('http://cdn/b.glb') is None
+    assert cache.lookup('http://cdn/a.glb') is not None
+    assert cache.evicted >= 1
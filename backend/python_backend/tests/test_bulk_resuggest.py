@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+import mongomock
+import pytest
+from ai_suggestions import AISuggester
+from bulk_resuggest import _process_batch, placed_models_for, run
+from color_profiles import ColorProfileStore
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().renderhaus
+    sofa, lamp = db.model3ds.insert_many([
+        {'name': 'Modern Sofa', 'category': 'furniture', 'dimensions': {'width': 2, 'depth': 0.9}},
+        {'name': 'Floor Lamp', 'category': 'lighting'}
+    ]).inserted_ids
+    db.model_color_profiles.insert_one({'_id': str(sofa), 'palette': [0, 3], 'weights': [0.7, 0.3]})
+    db.projects.insert_many([
+        {'objects': [{'modelId': sofa, 'modelType': 'Model3D', 'position': [0, 0, 0]},
+                     {'modelId': lamp, 'modelType': 'Model3D', 'position': [1.5, 0, 0]}]},
+        {'objects': [{'modelId': lamp, 'position': {'x': 0, 'y': 0, 'z': 0}}], 'deletedAt': None},
+        {'objects': [{'modelId': sofa}], 'deletedAt': '2026-01-01'}
+    ])
+    return db
+
+
+@pytest.fixture
+def suggester(db, monkeypatch):
+    import ai_suggestions
+    suggester = AISuggester(profile_store=ColorProfileStore(db.model_color_profiles))
+    monkeypatch.setattr(ai_suggestions, 'ai_suggester', suggester)
+    return suggester
+
+
+def test_placed_models_carry_model_ids(db):
+    project = db.projects.find_one()
+    models = {str(model['_id']): model for model in db.model3ds.find()}
+    placed = placed_models_for(project, models)
+    assert [model['modelId'] for model in placed] == [str(placed['modelId']) for placed in project['objects']]
+    assert placed_models_for({'objects': [{'modelId': 'unknown'}]}, models) == []
+
+
+def test_bulk_suggestions_match_live_suggestions(db, suggester):
+    project = db.projects.find_one()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert _process_batch(db, executor, 1, [project], 'v2') == 1
+    stored = db.projects.find_one({'_id': project['_id']})['aiSuggestions']
+    assert stored['rulesVersion'] == 'v2'
+
+    models = {str(model['_id']): model for model in db.model3ds.find()}
+    live = AISuggester(profile_store=ColorProfileStore(db.model_color_profiles))
+    assert stored['suggestions'] == live.generate_full_suggestions(placed_models_for(project, models))
+    assert stored['suggestions']['analysis']['color_analysis']
+
+
+def test_run_skips_deleted_projects_and_checkpoints(db, tmp_path, monkeypatch):
+    import bulk_resuggest
+    monkeypatch.setattr(bulk_resuggest, 'ProcessPoolExecutor',
+                        lambda max_workers, **_: ThreadPoolExecutor(max_workers=max_workers))
+    checkpoint = tmp_path / 'checkpoint.json'
+
+    # Interrupt the sweep after its first batch
+    process_batch = bulk_resuggest._process_batch
+    calls = []
+
+    def interrupted(*args):
+        calls.append(args)
+        if len(calls) > 1:
+            raise KeyboardInterrupt
+        return process_batch(*args)
+
+    monkeypatch.setattr(bulk_resuggest, '_process_batch', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run(db, batch_size=1, workers=1, checkpoint=str(checkpoint), rules_version='v1')
+    assert checkpoint.exists()
+    monkeypatch.setattr(bulk_resuggest, '_process_batch', process_batch)
+
+    # Resuming only refreshes what the interrupted run did not reach
+    assert run(db, batch_size=1, workers=1, checkpoint=str(checkpoint), rules_version='v1') == 1
+    assert db.projects.count_documents({'aiSuggestions': {'$exists': True}}) == 2
+    assert not checkpoint.exists()
+
+    # A completed sweep leaves nothing behind, so the next run covers every project
+    assert run(db, batch_size=1, workers=1, checkpoint=str(checkpoint), rules_version='v1') == 2
+
+
+def test_run_ignores_checkpoint_from_other_rules(db, tmp_path, monkeypatch):
+    import bulk_resuggest
+    monkeypatch.setattr(bulk_resuggest, 'ProcessPoolExecutor',
+                        lambda max_workers, **_: ThreadPoolExecutor(max_workers=max_workers))
+    checkpoint = tmp_path / 'checkpoint.json'
+    assert run(db, batch_size=1, workers=1, checkpoint=str(checkpoint), rules_version='v1', limit=1) == 1
+    assert checkpoint.exists()
+    assert run(db, batch_size=1, workers=1, checkpoint=str(checkpoint), rules_version='v2') == 2
+    assert db.projects.count_documents({'aiSuggestions.rulesVersion': 'v2'}) == 2
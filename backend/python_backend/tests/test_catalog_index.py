@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from catalog_index import CatalogIndex
+
+START = datetime(2026, 1, 1)
+
+
+def model(name, minutes=0, **fields):
+    return dict({'name': name, 'tags': [], 'isActive': True, 'updatedAt': START + timedelta(minutes=minutes)},
+                **fields)
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient().db.model3ds
+    collection.insert_many([
+        model('Modern Gray Sofa', tags=['modern'], materials=['fabric', 'gray']),
+        model('Oak Coffee Table', tags=['rustic']),
+        model('Black Floor Lamp', tags=['modern']),
+        model('Old Armchair', isActive=False)
+    ])
+    return collection
+
+
+def test_load_skips_inactive(collection):
+    index = CatalogIndex(collection)
+    assert index.load() == 3
+    assert {record.furniture_type for record in index.records.values()} == {'sofa', 'coffee_table', 'lamp'}
+    assert index.watermark == START
+
+
+def test_refresh_applies_changes_since_watermark(collection):
+    index = CatalogIndex(collection)
+    index.load()
+    collection.insert_one(model('Velvet Loveseat', minutes=5))
+    collection.update_one({'name': 'Oak Coffee Table'},
+                          {'$set': {'name': 'Oak Bookcase', 'updatedAt': START + timedelta(minutes=6)}})
+    index.refresh()
+    types = {record.name: record.furniture_type for record in index.records.values()}
+    assert types['Velvet Loveseat'] == 'sofa'
+    assert types['Oak Bookcase'] == 'bookshelf'
+    assert 'Oak Coffee Table' not in types
+    assert index.watermark == START + timedelta(minutes=6)
+    assert index.by_type['coffee_table'] == set()
+
+
+def test_refresh_drops_soft_and_hard_deletes(collection):
+    index = CatalogIndex(collection)
+    index.load()
+    lamp = collection.find_one({'name': 'Black Floor Lamp'})['_id']
+    collection.update_one({'_id': lamp}, {'$set': {'isActive': False, 'updatedAt': START + timedelta(minutes=1)}})
+    collection.delete_one({'name': 'Oak Coffee Table'})
+    index.refresh()
+    assert [record.name for record in index.records.values()] == ['Modern Gray Sofa']
+    assert str(lamp) not in index.by_style['modern']
+
+
+def test_top_k_ranks_style_and_color(collection):
+    collection.insert_one(model('Rustic Brown Sofa', tags=['rustic']))
+    index = CatalogIndex(collection)
+    index.load()
+    best = index.top_k('sofa', styles=['Modern'], colors=['gray'], k=2)
+    assert [item['name'] for item in best] == ['Modern Gray Sofa', 'Rustic Brown Sofa']
+    excluded = index.top_k('sofa', exclude_ids=[best[0]['id']])
+    assert [item['name'] for item in excluded] == ['Rustic Brown Sofa']
+
+
+def test_change_stream_events(collection):
+    index = CatalogIndex(collection)
+    index.load()
+    sofa = collection.find_one({'name': 'Modern Gray Sofa'})
+    index.apply_change({'operationType': 'delete', 'documentKey': {'_id': sofa['_id']}})
+    assert str(sofa['_id']) not in index.records
+    index.apply_change({'operationType': 'insert', 'fullDocument': dict(sofa)})
+    assert index.records[str(sofa['_id'])].furniture_type == 'sofa'
+
+
+def test_recommend_maps_suggested_types(collection):
+    index = CatalogIndex(collection)
+    index.load()
+    recommendations = index.recommend(['floor_lamp', 'plant'], styles=['modern'])
+    assert list(recommendations) == ['floor_lamp']
+    assert recommendations['floor_lamp'][0]['name'] == 'Black Floor Lamp'
+
+
+def test_placeholders_are_stored_with_the_catalog(api, monkeypatch):
+    import json
+    import app
+    from thumbnail_store import ThumbnailStore
+    from gltf_samples import png
+
+    db = mongomock.MongoClient().renderhaus
+    db.model3ds.insert_many([model('Brass Pendant Lamp', fileUrl='https://ucarecdn.com/pendant.glb'),
+                             model('Black Floor Lamp', modelFile={'url': 'https://ucarecdn.com/floor.glb'})])
+    index = CatalogIndex(db.model3ds)
+    index.load()
+    monkeypatch.setattr(app, 'catalog_index', index)
+    monkeypatch.setattr(app, 'thumbnail_store', ThumbnailStore(db))
+    monkeypatch.setattr(app.thumbnail_generator, 'generate_thumbnail_with_placeholder',
+                        lambda model_url, **_: (png((120, 80, 40)), 'LEHV6nWB2yk8pyo0adR*.7kCMdnj'))
+    # A fresh host has no placeholders of its own
+    monkeypatch.setattr(app.thumbnail_generator, 'placeholder_for', lambda model_url: None)
+
+    response, _ = api('POST', '/api/python/thumbnail/generate', json={'modelUrl': 'https://ucarecdn.com/pendant.glb'})
+    assert response.status_code == 200
+    index.refresh()
+
+    response, body = api('POST', '/api/python/ai/suggestions', json={'placedModels': []})
+    recommendations = json.loads(body)['catalog_recommendations']
+    placeholders = {item['name']: item['placeholder'] for item in recommendations['pendant_light']}
+    assert placeholders == {'Brass Pendant Lamp': 'LEHV6nWB2yk8pyo0adR*.7kCMdnj', 'Black Floor Lamp': None}
+
+    # Rendering the same thumbnail again leaves the catalog documents alone
+    watermark = index.watermark
+    api('POST', '/api/python/thumbnail/generate', json={'modelUrl': 'https://ucarecdn.com/pendant.glb'})
+    index.refresh()
+    assert index.watermark == watermark
@@ -0,0 +1,85 @@
+import math
+import numpy as np
+import pytest
+from collision_proxies import (MAX_HULL_VERTICES, build_proxy, decode_proxy, encode_proxy, footprint, oriented_box,
+                               proxy_summary, simplified_hull)
+from gltf_samples import box_glb
+from room_baker import SourceModel, parse_glb
+
+
+def yaw(degrees):
+    angle = math.radians(degrees)
+    return np.array([[math.cos(angle), 0, math.sin(angle)], [0, 1, 0], [-math.sin(angle), 0, math.cos(angle)]])
+
+
+def box_corners(size):
+    return np.array([[x, y, z] for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)]) * size
+
+
+def box_rotation(box):
+    x, y, z, w = box['rotation']
+    return np.array([[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+                     [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+                     [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]])
+
+
+def contains(box, points, tolerance=1e-6):
+    local = (points - box['center']) @ box_rotation(box)
+    return bool(np.all(np.abs(local) <= np.asarray(box['half_extents']) + tolerance))
+
+
+@pytest.mark.parametrize('size', [(2.0, 0.8, 0.5), (2.0, 0.0, 0.5), (2.0, 1.5, 0.0)])
+def test_oriented_box_is_tight_for_rotated_boxes(size):
+    points = box_corners(size) @ yaw(30).T + [1, 0, -2]
+    box = oriented_box(points)
+    assert sorted(box['half_extents']) == pytest.approx(sorted(np.asarray(size) / 2), abs=1e-6)
+    assert box['center'] == pytest.approx([1, 0, -2], abs=1e-6)
+    assert contains(box, points)
+
+
+def test_simplified_hull_faces_outwards():
+    rng = np.random.default_rng(3)
+    points = rng.normal(size=(5000, 3))
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    vertices, faces = simplified_hull(points)
+    assert len(vertices) <= MAX_HULL_VERTICES
+    corners = vertices[faces]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    assert np.all(np.einsum('ij,ij->i', normals, corners.mean(axis=1)) > 0)
+    # The axis extremes are kept
+    assert vertices.max(axis=0) == pytest.approx(points.max(axis=0))
+
+
+def test_footprint_is_counter_clockwise_from_above():
+    outline = footprint(box_corners((2, 1, 1)))
+    x, z = outline[:, 0], outline[:, 1]
+    # Seen from +Y, x to the right and z towards the viewer: clockwise in (x, z)
+    assert 0.5 * np.sum(x * np.roll(z, -1) - np.roll(x, -1) * z) == pytest.approx(-2.0)
+
+
+def test_build_proxy_applies_node_transforms():
+    quaternion = [0, math.sin(math.radians(15)), 0, math.cos(math.radians(15))]
+    document, binary = parse_glb(box_glb((2, 1, 0.5), node={'translation': [0, 0.5, 0], 'rotation': quaternion}))
+    proxy = build_proxy(SourceModel('http://cdn/box.glb', document, [binary], {}))
+    assert proxy['aabb']['min'][1] == pytest.approx(0.0)
+    assert sorted(proxy['obb']['half_extents']) == pytest.approx([0.25, 0.5, 1.0], abs=1e-6)
+    assert len(proxy['footprint']) == 4
+
+    summary = proxy_summary(proxy)
+    assert (summary['hull_vertices'], summary['hull_faces']) == (8, 12)
+
+
+def test_encode_decode_round_trip():
+    document, binary = parse_glb(box_glb((1.2, 0.7, 0.8)))
+    proxy = build_proxy(SourceModel('http://cdn/table.glb', document, [binary], {}))
+    data = encode_proxy(proxy)
+    decoded = decode_proxy(data)
+    assert data[:4] == b'RHCP'
+    for key in ('center', 'half_extents', 'rotation'):
+        assert decoded['obb'][key] == pytest.approx(proxy['obb'][key], abs=1e-6)
+    assert decoded['aabb']['max'] == pytest.approx(proxy['aabb']['max'])
+    assert np.array_equal(decoded['hull_faces'], proxy['hull_faces'])
+    assert np.allclose(decoded['hull_vertices'], proxy['hull_vertices'])
+    assert np.allclose(decoded['footprint'], proxy['footprint'])
+    with pytest.raises(ValueError):
+        decode_proxy(b'XXXX' + data[4:])
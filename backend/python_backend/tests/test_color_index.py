@@ -0,0 +1,131 @@
+import json
+from datetime import datetime, timedelta
+import mongomock
+import numpy as np
+import pytest
+from catalog_index import CatalogIndex
+from color_index import ColorIndex, color_descriptor, color_descriptors
+
+START = datetime(2026, 1, 1)
+PALETTES = {
+    'walnut': ['#5C4033', '#8B5A2B'],
+    'oak': ['#C19A6B', '#A0785A'],
+    'navy': ['#000080', '#1F3A93'],
+    'white': ['#FFFFFF', '#F5F5F5'],
+    'red': ['#CC0000', '#8B0000']
+}
+
+
+def random_colors(rng, count):
+    return ['#%06X' % value for value in rng.integers(0, 0xFFFFFF, count)]
+
+
+def test_descriptors_are_normalized_and_batched():
+    rng = np.random.default_rng(5)
+    sets = [(random_colors(rng, 3), [0.5, 0.3, 0.2]), ([], None), (['#808080'], None)]
+    batch = color_descriptors(sets)
+    assert batch.shape == (3, 64)
+    assert np.linalg.norm(batch[0]) == pytest.approx(1.0, abs=1e-6)
+    assert not batch[1].any()
+    assert np.allclose(batch[2], color_descriptor(['#808080']))
+    assert color_descriptor([]) is None
+    # Similar shades score higher than different ones
+    walnut, oak, navy = (color_descriptor(PALETTES[name]) for name in ('walnut', 'oak', 'navy'))
+    assert walnut @ walnut == pytest.approx(1.0, abs=1e-6)
+    assert walnut @ oak > walnut @ navy
+
+
+def test_search_matches_brute_force():
+    rng = np.random.default_rng(11)
+    index = ColorIndex(capacity=8)
+    descriptors = color_descriptors([(random_colors(rng, 4), None) for _ in range(300)])
+    for number, descriptor in enumerate(descriptors):
+        index.add(f'm{number}', descriptor)
+    for number in range(0, 300, 7):
+        index.remove(f'm{number}')
+    kept = {f'm{number}': descriptor for number, descriptor in enumerate(descriptors) if number % 7}
+    assert len(index) == len(kept)
+
+    query = color_descriptor(random_colors(rng, 2))
+    expected = sorted(kept, key=lambda model_id: -float(kept[model_id] @ query))
+    assert [model_id for model_id, _ in index.search(query, 10)] == expected[:10]
+    assert [model_id for model_id, _ in index.search(query, 10, exclude_ids=expected[:3])] == expected[3:13]
+    subset = expected[20:40]
+    assert [model_id for model_id, _ in index.search(query, 5, candidates=subset)] == subset[:5]
+
+
+def test_search_skips_dropped_models_and_widens():
+    index = ColorIndex()
+    for number in range(50):
+        index.add(f'm{number}', color_descriptor(PALETTES['walnut'] if number < 40 else PALETTES['navy']))
+    query = color_descriptor(PALETTES['navy'])
+    results = index.search(query, 5, keep=lambda model_id: model_id not in {'m40', 'm41', 'm42'})
+    assert len(results) == 5
+    assert {'m40', 'm41', 'm42'}.isdisjoint(model_id for model_id, _ in results)
+    assert {model_id for model_id, _ in results} == {'m43', 'm44', 'm45', 'm46', 'm47'}
+
+
+def test_refresh_follows_the_profile_collection():
+    collection = mongomock.MongoClient().db.model_color_profiles
+    collection.insert_many([
+        {'_id': name, 'colors': colors, 'updatedAt': START} for name, colors in PALETTES.items()
+    ])
+    collection.insert_one({'_id': 'legacy', 'palette': [5], 'weights': [1.0], 'updatedAt': START})
+    index = ColorIndex(collection)
+    assert index.refresh() == 6
+
+    collection.update_one({'_id': 'white'}, {'$set': {'colors': [], 'palette': [],
+                                                      'updatedAt': START + timedelta(minutes=1)}})
+    collection.update_one({'_id': 'red'}, {'$set': {'colors': PALETTES['navy'],
+                                                    'updatedAt': START + timedelta(minutes=2)}})
+    index.refresh()
+    assert 'white' not in index.rows
+    assert index.descriptor('red') @ index.descriptor('navy') == pytest.approx(1.0, abs=1e-6)
+    assert index.watermark == START + timedelta(minutes=2)
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    import app
+    db = mongomock.MongoClient().renderhaus
+    ids = {}
+    for name in ('walnut', 'oak', 'navy'):
+        ids[name] = str(db.model3ds.insert_one({'name': f'{name.title()} Armchair', 'isActive': True,
+                                                'updatedAt': START}).inserted_id)
+    db.model3ds.insert_one({'name': 'Deleted Armchair', 'isActive': False, 'updatedAt': START})
+    deleted = str(db.model3ds.find_one({'isActive': False})['_id'])
+
+    catalog_index = CatalogIndex(db.model3ds)
+    catalog_index.load()
+    color_index = ColorIndex()
+    for name, model_id in ids.items():
+        color_index.add(model_id, color_descriptor(PALETTES[name]))
+    color_index.add(deleted, color_descriptor(PALETTES['walnut']))
+    monkeypatch.setattr(app, 'catalog_index', catalog_index)
+    monkeypatch.setattr(app, 'color_index', color_index)
+    return ids, deleted
+
+
+def test_color_search_endpoint(api, catalog):
+    ids, deleted = catalog
+    response, body = api('POST', '/api/python/search/color', json={'colors': PALETTES['walnut'], 'k': 3})
+    assert response.status_code == 200
+    results = json.loads(body)['results']
+    assert [item['id'] for item in results] == [ids['walnut'], ids['oak'], ids['navy']]
+    assert deleted not in [item['id'] for item in results]
+    assert results[0]['name'] == 'Walnut Armchair'
+
+    response, body = api('POST', '/api/python/search/color', json={'modelId': ids['oak'], 'k': 1})
+    assert [item['id'] for item in json.loads(body)['results']] == [ids['walnut']]
+
+
+@pytest.mark.parametrize('body', [
+    {'colors': ['#FFFFFF'], 'k': 'ten'},
+    {'colors': ['#FFFFFF'], 'k': 0},
+    {'colors': ['#FFFFFF'], 'k': 2.5},
+    {'colors': ['white']},
+    {}
+])
+def test_color_search_rejects_bad_requests(api, catalog, body):
+    response, _ = api('POST', '/api/python/search/color', json=body)
+    assert response.status_code == 400
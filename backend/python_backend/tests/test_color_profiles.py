@@ -0,0 +1,39 @@
+import mongomock
+from color_profiles import ColorProfileStore, model_id_of, profile_from_analysis, quantize_palette
+
+
+def test_quantize_merges_nearby_colors():
+    profile = quantize_palette(['#FEFEFE', '#FAFAFA', '#8A4412'], [0.3, 0.3, 0.4])
+    # white (0) and brown (5)
+    assert profile == {'palette': [0, 5], 'weights': [0.6, 0.4]}
+    assert quantize_palette([]) == {'palette': [], 'weights': []}
+
+
+def test_profile_from_analysis_skips_guesses():
+    assert profile_from_analysis({'fallback': True, 'colors': ['#FFFFFF']}) is None
+    profile = profile_from_analysis({'colors': ['#000000'], 'color_weights': [1.0]})
+    assert profile['palette'] == [9]
+    assert profile['colors'] == ['#000000']
+
+
+def test_model_id_of():
+    assert model_id_of({'modelId': {'_id': 'abc'}}) == 'abc'
+    assert model_id_of({'_id': 12}) == '12'
+    assert model_id_of({}) is None
+
+
+def test_store_batches_and_caches_lookups():
+    collection = mongomock.MongoClient().db.model_color_profiles
+    collection.insert_one({'_id': 'a', 'palette': [0], 'weights': [1.0]})
+    store = ColorProfileStore(collection)
+    assert store.get_many(['a', 'b', None]) == {'a': {'palette': [0], 'weights': [1.0]}}
+
+    # Hits and misses are both cached
+    collection.delete_many({})
+    assert store.get('a') == {'palette': [0], 'weights': [1.0]}
+    collection.insert_one({'_id': 'b', 'palette': [1], 'weights': [1.0]})
+    assert store.get('b') is None
+
+    store.save_many({'c': {'palette': [2], 'weights': [1.0], 'source': 'glb'}})
+    assert store.get('c') == {'palette': [2], 'weights': [1.0]}
+    assert collection.find_one({'_id': 'c'})['updatedAt'] is not None
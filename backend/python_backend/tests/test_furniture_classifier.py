@@ -0,0 +1,47 @@
+import pytest
+from furniture_classifier import FurnitureClassifier, default_classifier
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return default_classifier()
+
+
+@pytest.mark.parametrize('name, category', [
+    ('table lamp', 'lamp'),
+    ('desk lamp', 'lamp'),
+    ('side table', 'dining_table'),
+    ('coffee table', 'coffee_table'),
+    ('office chair', 'chair'),
+    ('desk chair', 'chair'),
+    ('sofa bed', 'sofa'),
+    ('bookshelf', 'bookshelf'),
+    ('desk', 'misc'),
+    ('office desk', 'misc'),
+    ('Modern Office Desk', 'misc'),
+    ('standing desk', 'misc'),
+    ('nightstand', 'misc'),
+])
+def test_classifies_compound_names(classifier, name, category):
+    assert classifier.classify(name)[0] == category
+
+
+def test_normalizes_separators(classifier):
+    assert classifier.classify('Floor_Lamp-01.glb')[0] == 'lamp'
+
+
+def test_low_confidence_falls_back(classifier):
+    category, confidence = classifier.classify('xyzzy')
+    assert category == 'misc'
+    assert confidence < classifier.min_confidence
+
+
+def test_batch_matches_single(classifier):
+    names = ['table lamp', 'side table', 'office desk', '']
+    assert classifier.classify_batch(names) == [classifier.classify(name) for name in names]
+    assert classifier.classify_batch([]) == []
+
+
+def test_custom_prototypes():
+    classifier = FurnitureClassifier({'plant': ['plant', 'fern'], 'misc': ['rug']}, min_confidence=0.2)
+    assert classifier.classify('potted fern')[0] == 'plant'
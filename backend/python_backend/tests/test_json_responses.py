@@ -0,0 +1,94 @@
+import asyncio
+import gzip
+import json
+import brotli
+import pytest
+from quart import Quart, jsonify
+import json_responses
+from json_responses import FastJSONProvider, compress_response, stream_json_list
+
+ITEMS = [{'id': index, 'name': f'Walnut Armchair {index}', 'colors': ['#5d4037', '#d7ccc8']} for index in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = Quart(__name__)
+    app.json = FastJSONProvider(app)
+    app.after_request(compress_response)
+
+    @app.route('/items')
+    async def items():
+        return jsonify({'status': 'success', 'items': ITEMS})
+
+    @app.route('/small')
+    async def small():
+        return jsonify({'status': 'success'})
+
+    @app.route('/stream')
+    async def stream():
+        async def generate():
+            for item in ITEMS:
+                yield item
+        return stream_json_list('items', generate(), fields={'status': 'success'},
+                                trailer=lambda: {'count': len(ITEMS)})
+
+    async def get(path, encoding=None):
+        headers = {'Accept-Encoding': encoding} if encoding is not None else {}
+        response = await app.test_client().get(path, headers=headers)
+        return response, await response.get_data()
+
+    return lambda path, encoding=None: asyncio.run(get(path, encoding))
+
+
+def decode(response, body):
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'br':
+        body = brotli.decompress(body)
+    elif encoding == 'gzip':
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+@pytest.mark.parametrize('accepted, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('gzip;q=1.0, br;q=0.5', 'br'),
+    ('gzip, br;q=0', 'gzip'),
+    ('identity', None),
+    (None, None)
+])
+def test_encoding_negotiation(client, accepted, expected):
+    response, body = client('/items', accepted)
+    assert response.headers.get('Content-Encoding') == expected
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert decode(response, body) == {'status': 'success', 'items': ITEMS}
+
+
+def test_brotli_is_skipped_when_unavailable(client, monkeypatch):
+    monkeypatch.setattr(json_responses, 'brotli', None)
+    response, body = client('/items', 'br, gzip')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert decode(response, body)['items'] == ITEMS
+
+
+def test_small_bodies_stay_identity(client):
+    response, body = client('/small', 'br, gzip')
+    assert 'Content-Encoding' not in response.headers
+    assert len(body) < json_responses.COMPRESS_MIN_SIZE
+    assert json.loads(body) == {'status': 'success'}
+
+
+@pytest.mark.parametrize('accepted', ['br', 'gzip', None])
+def test_streamed_list_is_valid_json(client, accepted):
+    response, body = client('/stream', accepted)
+    assert response.headers.get('Content-Encoding') == accepted
+    assert decode(response, body) == {'status': 'success', 'items': ITEMS, 'count': len(ITEMS)}
+
+
+def test_streamed_list_without_fields_or_items():
+    async def render():
+        app = Quart(__name__)
+        async with app.test_request_context('/'):
+            response = stream_json_list('results', [])
+            return await response.get_data()
+
+    assert json.loads(asyncio.run(render())) == {'results': []}
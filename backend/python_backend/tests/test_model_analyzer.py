@@ -0,0 +1,177 @@
+import pytest
+import model_analyzer
+from deadlines import Deadline
+from gltf_samples import png, textured_gltf
+from model_analyzer import Model3DAnalyzer
+from shared_cache import SharedCache
+
+MODEL_URL = 'https://ucarecdn.com/model/scene.gltf'
+RED, BLUE, GREEN = (200, 30, 30), (30, 30, 200), (30, 160, 60)
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    analyzer = Model3DAnalyzer()
+    analyzer.color_cache = SharedCache('model_analysis', ttl=60, path=str(tmp_path / 'cache.sqlite3'))
+    return analyzer
+
+
+@pytest.fixture
+def served(monkeypatch):
+    """Serve the files of a multi-file model from a dict of URL -> bytes instead of the network"""
+    files = {}
+
+    def download(url, deadline=None, **_):
+        if deadline is not None:
+            deadline.check('download')
+        if url not in files:
+            raise OSError(f'404 for {url}')
+        return files[url]
+
+    monkeypatch.setattr(model_analyzer, '_download', download)
+    return files
+
+
+def expire_after_first_texture(analyzer, monkeypatch, deadline):
+    extract = analyzer._extract_palette_from_image
+
+    def extract_then_expire(image):
+        palette = extract(image)
+        deadline.cancel()
+        return palette
+
+    monkeypatch.setattr(analyzer, '_extract_palette_from_image', extract_then_expire)
+
+
+def test_expired_deadline_keeps_processed_textures(analyzer, monkeypatch):
+    deadline = Deadline(30)
+    expire_after_first_texture(analyzer, monkeypatch, deadline)
+    analysis = analyzer.analyze_model_bytes(textured_gltf(['red.png', 'blue.png', 'green.png']), 'Chair',
+                                            {'red.png': png(RED), 'blue.png': png(BLUE), 'green.png': png(GREEN)},
+                                            deadline)
+    assert analysis['partial'] is True
+    assert analysis['deadline_exceeded'] is True
+    assert analysis['textures_analyzed'] == 1
+    assert analysis['textures_skipped'] == 2
+    assert analysis['texture_colors'] == [list(RED)]
+    assert analysis['colors'] == ['#c81e1e']
+
+
+def test_partial_analysis_is_not_cached(analyzer, served, monkeypatch):
+    served[MODEL_URL] = textured_gltf(['red.png', 'blue.png'])
+    served['https://ucarecdn.com/model/red.png'] = png(RED)
+    served['https://ucarecdn.com/model/blue.png'] = png(BLUE)
+
+    deadline = Deadline(30)
+    expire_after_first_texture(analyzer, monkeypatch, deadline)
+    assert analyzer.analyze_model_from_url(MODEL_URL, 'Chair', deadline)['partial'] is True
+    assert analyzer.color_cache.get(f'{MODEL_URL}|Chair') is None
+
+    # Without the deadline the complete analysis is shared with later requests
+    monkeypatch.undo()
+    monkeypatch.setattr(model_analyzer, '_download', lambda url, **_: served[url])
+    analysis = analyzer.analyze_model_from_url(MODEL_URL, 'Chair', Deadline(30))
+    assert 'partial' not in analysis
+    assert analyzer.color_cache.get(f'{MODEL_URL}|Chair') == analysis
+
+
+def test_errors_and_expired_downloads_are_not_cached(analyzer, served):
+    analysis = analyzer.analyze_model_from_url('https://ucarecdn.com/missing.glb', 'Lamp', Deadline(30))
+    assert analysis['fallback'] is True and '404' in analysis['error']
+    assert analyzer.color_cache.get('https://ucarecdn.com/missing.glb|Lamp') is None
+
+    served[MODEL_URL] = textured_gltf(['red.png'])
+    analysis = analyzer.analyze_model_from_url(MODEL_URL, 'Lamp', Deadline(0))
+    assert analysis['deadline_exceeded'] is True and 'error' in analysis
+    assert analyzer.color_cache.get(f'{MODEL_URL}|Lamp') is None
+
+
+def test_close_colors_merge_into_weighted_mean(analyzer):
+    colors, weights = analyzer._get_dominant_colors([([100, 100, 100], 0.3), ([120, 100, 100], 0.1),
+                                                     ([0, 0, 200], 0.2)], merge_distance=24.0)
+    assert colors == [[105, 100, 100], [0, 0, 200]]
+    assert weights == [0.667, 0.333]
+
+    # Beyond merge_distance the same colors stay apart
+    colors, _ = analyzer._get_dominant_colors([([100, 100, 100], 0.3), ([120, 100, 100], 0.1)], merge_distance=10.0)
+    assert colors == [[100, 100, 100], [120, 100, 100]]
+
+
+def test_dominant_colors_are_ordered_by_weight(analyzer):
+    colors, weights = analyzer._get_dominant_colors([(list(RED), 0.1), (list(BLUE), 0.2), (list(GREEN), 0.05),
+                                                     ([210, 35, 30], 0.15)], max_colors=2)
+    # Red gains weight from its near duplicate and overtakes blue; green is cut by max_colors
+    assert colors == [[206, 33, 30], list(BLUE)]
+    assert weights == [0.556, 0.444]
+
+
+@pytest.mark.parametrize('counts, expected', [([30, 10], ['#c81e1e', '#1e1ec8']),
+                                              ([10, 30], ['#1e1ec8', '#c81e1e'])])
+def test_texture_colors_are_weighted_by_triangle_counts(analyzer, counts, expected):
+    analysis = analyzer.analyze_model_bytes(textured_gltf(['red.png', 'blue.png'], counts), 'Rug',
+                                            {'red.png': png(RED), 'blue.png': png(BLUE)})
+    assert analysis['colors'] == expected
+    assert analysis['color_weights'] == [0.75, 0.25]
+
+
+def test_material_shares_follow_triangle_counts(analyzer):
+    from pygltflib import GLTF2
+
+    gltf_obj = GLTF2.from_json(textured_gltf(['a.png', 'b.png', 'c.png'], [60, 30, 30]).decode('utf-8'))
+    assert analyzer._material_shares(gltf_obj) == [0.5, 0.25, 0.25]
+    # Materials sharing an image add up
+    gltf_obj.textures[2].source = 0
+    assert analyzer._image_shares(gltf_obj, analyzer._material_shares(gltf_obj)) == [0.75, 0.25, 0.0]
+
+
+def multi_file_model(served):
+    """Serve a .gltf whose textures are external images and an external buffer; one of them is missing"""
+    blue = png(BLUE)
+    served[MODEL_URL] = textured_gltf(['textures/red.png', ('../shared/images.bin', len(blue)), 'missing.png'],
+                                      [30, 30, 10])
+    served['https://ucarecdn.com/model/textures/red.png'] = png(RED)
+    served['https://ucarecdn.com/shared/images.bin'] = blue
+
+
+def test_external_resource_uris_skip_geometry_and_data_uris():
+    document = textured_gltf(['red.png', ('images.bin', 64), 'data:image/png;base64,AAAA', 'red.png'])
+    assert model_analyzer.external_resource_uris(document) == ['red.png', 'images.bin']
+
+
+def test_external_resources_are_fetched_relative_to_the_model(analyzer, served, monkeypatch):
+    multi_file_model(served)
+    requested = []
+    download = model_analyzer._download
+    monkeypatch.setattr(model_analyzer, '_download', lambda url, **kwargs: requested.append(url) or download(url, **kwargs))
+
+    analysis = analyzer.analyze_model_from_url(MODEL_URL, 'Sofa', Deadline(30))
+    assert sorted(requested) == sorted([MODEL_URL, 'https://ucarecdn.com/model/textures/red.png',
+                                        'https://ucarecdn.com/shared/images.bin',
+                                        'https://ucarecdn.com/model/missing.png'])
+    # The missing texture is skipped without failing or truncating the analysis
+    assert 'error' not in analysis and 'partial' not in analysis
+    assert analysis['texture_colors'] == [list(RED), list(BLUE)]
+    assert analysis['colors'][:2] == ['#c81e1e', '#1e1ec8']
+    assert analyzer.color_cache.get(f'{MODEL_URL}|Sofa') == analysis
+
+
+def test_external_resources_are_fetched_concurrently_when_async(analyzer, served, monkeypatch):
+    import asyncio
+    import async_io
+
+    multi_file_model(served)
+    requested = []
+
+    async def fetch_bytes(url, **_):
+        requested.append(url)
+        await asyncio.sleep(0)
+        if url not in served:
+            raise OSError(f'404 for {url}')
+        return served[url]
+
+    monkeypatch.setattr(async_io, 'fetch_bytes', fetch_bytes)
+    analysis = asyncio.run(analyzer.analyze_model_from_url_async(MODEL_URL, 'Sofa', Deadline(30)))
+    assert len(requested) == 4
+    assert 'error' not in analysis and 'partial' not in analysis
+    assert analysis['texture_colors'] == [list(RED), list(BLUE)]
+    assert analysis['colors'][:2] == ['#c81e1e', '#1e1ec8']
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from PIL import Image
+from placeholders import BASE83, SAMPLE_SIZE, blurhash
+
+
+def random_image(width, height, seed=1):
+    pixels = (np.random.default_rng(seed).random((height, width, 3)) * 255).astype('uint8')
+    return Image.fromarray(pixels), pixels
+
+
+def test_length_follows_components():
+    image, _ = random_image(20, 10)
+    assert len(blurhash(image)) == 4 + 2 * 4 * 3
+    assert len(blurhash(image, (1, 1))) == 6
+    assert len(blurhash(image, (9, 9))) == 4 + 2 * 81
+    with pytest.raises(ValueError):
+        blurhash(image, (0, 3))
+
+
+def test_solid_color_encodes_its_average():
+    image = Image.new('RGB', (64, 48), '#3366CC')
+    encoded = blurhash(image)
+    value = 0
+    for char in encoded[2:6]:
+        value = value * 83 + BASE83.index(char)
+    assert value == 0x3366CC
+
+
+def test_matches_reference_encoder():
+    reference = pytest.importorskip('blurhash')
+    # Images no larger than SAMPLE_SIZE are encoded without downsampling
+    image, pixels = random_image(32, 24)
+    assert blurhash(image) == reference.encode(pixels, 4, 3)
+    assert blurhash(image, (5, 2)) == reference.encode(pixels, 5, 2)
+
+
+def test_large_images_are_downsampled():
+    image, _ = random_image(1024, 768)
+    sample = image.copy()
+    sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BILINEAR)
+    assert sample.size == (32, 24)
+    assert blurhash(image) == blurhash(sample)
+    # The caller's image is left alone
+    assert image.size == (1024, 768)
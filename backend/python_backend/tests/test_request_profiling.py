@@ -0,0 +1,48 @@
+import json
+import pytest
+import request_profiling
+
+TOKEN = 'test-admin-token'
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(request_profiling, 'PROFILE_ADMIN_TOKEN', TOKEN)
+    return {'X-Admin-Token': TOKEN}
+
+
+def profiled_request(api):
+    response, _ = api('POST', '/api/python/ai/suggestions', headers={'X-Profile': TOKEN},
+                      json={'placedModels': [{'name': 'Modern Sofa'}]})
+    assert response.status_code == 200
+    assert 'total;dur=' in response.headers['Server-Timing']
+    return response.headers['X-Profile-Id']
+
+
+def test_profiles_require_the_admin_token(api, admin):
+    response, _ = api('GET', '/api/python/admin/profiles')
+    assert response.status_code == 403
+    response, _ = api('GET', '/api/python/admin/profiles', headers={'X-Admin-Token': 'wrong'})
+    assert response.status_code == 403
+
+
+def test_profile_text_report(api, admin):
+    profile_id = profiled_request(api)
+    response, body = api('GET', f'/api/python/admin/profiles/{profile_id}?format=text&sort=tottime&limit=5',
+                         headers=admin)
+    assert response.status_code == 200
+    assert b'function calls' in body
+
+
+@pytest.mark.parametrize('query', ['sort=fastest', 'limit=many', 'limit=-1'])
+def test_profile_text_report_rejects_bad_arguments(api, admin, query):
+    profile_id = profiled_request(api)
+    response, body = api('GET', f'/api/python/admin/profiles/{profile_id}?format=text&{query}', headers=admin)
+    assert response.status_code == 400
+    assert json.loads(body)['status'] == 'error'
+
+
+def test_unprofiled_requests_have_no_profile(api, admin):
+    response, _ = api('GET', '/api/python/test')
+    assert 'X-Profile-Id' not in response.headers
+    assert 'Server-Timing' in response.headers
@@ -0,0 +1,92 @@
+import math
+import numpy as np
+import pytest
+from gltf_samples import box_glb
+from room_baker import BakeError, SourceModel, bake, node_matrix, parse_glb, placement, room_key
+
+
+def source(url, data):
+    document, binary = parse_glb(data)
+    return SourceModel(url, document, [binary], {})
+
+
+def resolved(objects):
+    placements = [placement(placed) for placed in objects]
+    for placed in placements:
+        placed['url'] = placed['model'][len('url:'):]
+    return placements
+
+
+ROOM = [
+    {'modelUrl': 'http://cdn/chair.glb', 'position': [0, 0, 0], 'rotation': [0, math.pi / 2, 0]},
+    {'modelUrl': 'http://cdn/chair.glb', 'position': {'x': 1, 'y': 0, 'z': 0}},
+    {'modelUrl': 'http://cdn/table.glb', 'position': [0, 0, 1], 'scale': 2}
+]
+
+
+def test_room_key_is_order_independent():
+    key, ordered = room_key(ROOM)
+    assert room_key(list(reversed(ROOM))) == (key, ordered)
+    assert room_key(ROOM, 'nodes')[0] != key
+    moved = [dict(ROOM[0], position=[0, 0, 0.5])] + ROOM[1:]
+    assert room_key(moved)[0] != key
+
+
+def test_placement_normalizes_editor_objects():
+    placed = placement({'modelId': 'abc', 'position': {'x': 1, 'z': 2}, 'rotation': {'x': 0, 'y': 0, 'z': 0, 'w': 1},
+                        'instanceId': 'chair-1'})
+    assert placed == {'model': 'Model3D:abc', 'position': [1.0, 0.0, 2.0], 'rotation': [0.0, 0.0, 0.0, 1.0],
+                      'scale': [1.0, 1.0, 1.0], 'name': 'chair-1'}
+    with pytest.raises(BakeError):
+        placement({'position': [0, 0, 0]})
+    with pytest.raises(BakeError):
+        room_key(ROOM, 'merged')
+
+
+def test_bake_deduplicates_and_instances():
+    chair = box_glb((0.5, 1.0, 0.5))
+    models = {
+        'http://cdn/chair.glb': source('http://cdn/chair.glb', chair),
+        'http://cdn/table.glb': source('http://cdn/table.glb', box_glb((1.2, 0.7, 0.8)))
+    }
+    # The same chair file under a second URL is stored once
+    objects = ROOM + [{'modelUrl': 'http://cdn/copy/chair.glb', 'position': [3, 0, 0]}]
+    models['http://cdn/copy/chair.glb'] = source('http://cdn/copy/chair.glb', chair)
+
+    glb, stats = bake(resolved(objects), models)
+    assert stats['objects'] == 4
+    assert stats['instanced_models'] == 1
+    assert stats['meshes'] == 2
+    assert stats['materials'] == 1
+
+    document, binary = parse_glb(glb)
+    assert stats['bytes'] == len(glb)
+    instanced = [node for node in document['nodes'] if 'EXT_mesh_gpu_instancing' in node.get('extensions', {})]
+    assert len(instanced) == 1
+    assert 'EXT_mesh_gpu_instancing' in document['extensionsUsed']
+
+
+def test_gpu_instances_match_nodes_mode():
+    models = {'http://cdn/chair.glb': source('http://cdn/chair.glb', box_glb(node={'translation': [0, 0.5, 0]})),
+              'http://cdn/table.glb': source('http://cdn/table.glb', box_glb())}
+    placements = resolved(ROOM[:2])
+
+    document, binary = parse_glb(bake(placements, models, 'gpu')[0])
+    node = next(node for node in document['nodes'] if 'extensions' in node)
+    attributes = node['extensions']['EXT_mesh_gpu_instancing']['attributes']
+
+    def read(accessor_index):
+        accessor = document['accessors'][accessor_index]
+        view = document['bufferViews'][accessor['bufferView']]
+        start = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+        size = {'VEC3': 3, 'VEC4': 4}[accessor['type']]
+        return np.frombuffer(binary, '<f4', accessor['count'] * size, start).reshape(-1, size)
+
+    translations = read(attributes['TRANSLATION'])
+    nodes_document, _ = parse_glb(bake(placements, models, 'nodes')[0])
+    expected = []
+    for root in nodes_document['scenes'][0]['nodes']:
+        parent = node_matrix(nodes_document['nodes'][root])
+        for child in nodes_document['nodes'][root]['children']:
+            expected.append((parent @ node_matrix(nodes_document['nodes'][child]))[:3, 3])
+    assert sorted(map(tuple, np.round(translations, 5))) == sorted(map(tuple, np.round(expected, 5)))
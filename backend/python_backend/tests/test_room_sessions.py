@@ -0,0 +1,103 @@
+import json
+import pytest
+from ai_suggestions import AISuggester
+from room_sessions import RoomSession, RoomSessionStore
+from suggestion_cache import canonical_room_key
+
+ROOM = [
+    {'name': 'Modern Sofa', 'position': [0, 0, 0], 'dimensions': {'width': 2, 'depth': 0.9}},
+    {'name': 'Coffee Table', 'position': [0, 0, 1.2], 'dimensions': {'width': 1, 'depth': 0.6}},
+    {'name': 'Floor Lamp', 'position': [1.5, 0, 0]}
+]
+
+
+@pytest.fixture
+def suggester():
+    return AISuggester()
+
+
+def seeded(suggester, max_models=5000):
+    session = RoomSession('test', suggester, max_models)
+    session.apply([{'op': 'add', 'id': index, 'model': model} for index, model in enumerate(ROOM)])
+    return session
+
+
+def test_session_key_matches_full_room(suggester):
+    session = seeded(suggester)
+    assert session.total_items == 3
+    assert session.room_key() == canonical_room_key(ROOM, suggester.room_key_fields)
+    assert session.aggregates['categories'] == {'seating': 1, 'tables': 1, 'lighting': 1}
+
+
+def test_update_and_remove_keep_aggregates_in_step(suggester):
+    session = seeded(suggester)
+    moved = dict(ROOM[2], position=[3, 0, 3])
+    session.apply([{'op': 'update', 'id': 2, 'model': moved}, {'op': 'remove', 'id': 1}])
+    assert session.room_key() == canonical_room_key([ROOM[0], moved], suggester.room_key_fields)
+    assert session.aggregates['categories'] == {'seating': 1, 'lighting': 1}
+    assert len(session.layout) == 2
+
+    session.apply([{'op': 'remove', 'id': 0}, {'op': 'remove', 'id': 2}, {'op': 'remove', 'id': 'missing'}])
+    assert session.total_items == 0
+    assert session.digest == 0
+    assert all(not counter for counter in session.aggregates.values())
+
+
+@pytest.mark.parametrize('changes', [
+    [{'op': 'add', 'model': {}}],
+    [{'op': 'move', 'id': 1, 'model': {}}],
+    [{'op': 'add', 'id': 1}],
+    [{'op': 'remove', 'id': 0}, {'op': 'add', 'id': 9}],
+    {'op': 'remove', 'id': 0},
+    'remove',
+    [{'op': 'remove', 'id': 0}, ['remove', 1]]
+])
+def test_invalid_changes_are_rejected_before_applying(suggester, changes):
+    session = seeded(suggester)
+    key = session.room_key()
+    with pytest.raises(ValueError):
+        session.apply(changes)
+    assert session.room_key() == key
+    assert session.total_items == 3
+
+
+def test_model_limit_leaves_session_unchanged(suggester):
+    session = seeded(suggester, max_models=4)
+    key = session.room_key()
+    with pytest.raises(ValueError):
+        session.apply([{'op': 'remove', 'id': 0},
+                       {'op': 'add', 'id': 'a', 'model': ROOM[0]},
+                       {'op': 'add', 'id': 'b', 'model': ROOM[1]},
+                       {'op': 'add', 'id': 'c', 'model': ROOM[2]}])
+    assert session.room_key() == key
+    assert sorted(session.models) == ['0', '1', '2']
+
+    # Removals in the same request make room for additions
+    session.apply([{'op': 'remove', 'id': 0}, {'op': 'remove', 'id': 1},
+                   {'op': 'add', 'id': 'a', 'model': ROOM[0]},
+                   {'op': 'add', 'id': 'b', 'model': ROOM[1]},
+                   {'op': 'add', 'id': 'c', 'model': ROOM[2]}])
+    assert session.total_items == 4
+
+
+def test_store_evicts_and_expires(suggester):
+    store = RoomSessionStore(suggester, max_sessions=2, ttl=60)
+    first = store.create(ROOM)
+    second = store.create()
+    store.get(first.session_id)
+    store.create()
+    assert store.get(second.session_id) is None
+    assert store.get(first.session_id) is first
+    assert store.delete(first.session_id)
+    assert not store.delete(first.session_id)
+    assert len(store) == 1
+
+
+@pytest.mark.parametrize('body', [{'changes': {'op': 'remove', 'id': 0}}, {'changes': [None]}, [1]])
+def test_malformed_changes_are_a_bad_request(api, body):
+    response, data = api('POST', '/api/python/ai/sessions', json={'placedModels': ROOM})
+    assert response.status_code == 200
+    session_id = json.loads(data)['session_id']
+
+    response, _ = api('POST', f'/api/python/ai/sessions/{session_id}/changes', json=body)
+    assert response.status_code == 400
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import time
+import pytest
+import shared_cache
+from shared_cache import SharedCache
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'cache.sqlite3')
+
+
+def test_values_round_trip(path):
+    cache = SharedCache('round-trip', path=path)
+    cache.set('bytes', b'\x00\xff')
+    cache.set('text', 'blurhash')
+    cache.set('json', {'colors': ['#ffffff'], 'triangles': 12})
+
+    # A second instance has an empty front cache, so it reads the file
+    reader = SharedCache('round-trip', path=path)
+    assert reader.get('bytes') == b'\x00\xff'
+    assert reader.get('text') == 'blurhash'
+    assert reader.get('json') == {'colors': ['#ffffff'], 'triangles': 12}
+    assert reader.get('missing') is None
+    assert reader.stats()['shared_hits'] == 3
+    assert reader.stats()['shared_misses'] == 1
+
+
+def test_entries_expire_after_ttl(path, monkeypatch):
+    SharedCache('expiring', ttl=60, path=path).set('key', 'value')
+    assert SharedCache('expiring', ttl=60, path=path).get('key') == 'value'
+
+    now = time.time()
+    monkeypatch.setattr(shared_cache.time, 'time', lambda: now + 120)
+    assert SharedCache('expiring', ttl=60, path=path).get('key') is None
+
+
+def test_eviction_drops_least_recently_used(path, monkeypatch):
+    cache = SharedCache('bounded', path=path, max_bytes=250)
+    now = time.time()
+    for offset, key in enumerate(['oldest', 'older', 'newer', 'newest']):
+        monkeypatch.setattr(shared_cache.time, 'time', lambda: now + offset)
+        cache.set(key, b'x' * 100)
+
+    cache._db.evict()
+    reader = SharedCache('bounded', path=path)
+    assert reader.get('oldest') is None
+    assert reader.get('older') is None
+    assert reader.get('newer') == b'x' * 100
+    assert reader.get('newest') == b'x' * 100
+
+
+def test_clear_only_touches_its_namespace(path):
+    cache = SharedCache('cleared', path=path)
+    other = SharedCache('kept', path=path)
+    cache.set('key', 'value')
+    other.set('key', 'other value')
+
+    cache.clear()
+    assert cache.get('key') is None
+    assert SharedCache('cleared', path=path).get('key') is None
+    assert SharedCache('kept', path=path).get('key') == 'other value'
+
+
+def test_entries_are_shared_across_processes(path):
+    reader = SharedCache('processes', path=path)
+    assert reader.get('analysis') is None
+
+    code = (f"from shared_cache import SharedCache; "
+            f"SharedCache('processes', path={path!r}).set('analysis', {{'partial': False}})")
+    subprocess.run([sys.executable, '-c', code], cwd=BACKEND, check=True)
+    assert reader.get('analysis') == {'partial': False}
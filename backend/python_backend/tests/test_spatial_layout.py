@@ -0,0 +1,84 @@
+import itertools
+import math
+import random
+import pytest
+from spatial_layout import Footprint, SpatialLayoutIndex, footprint_from_model
+
+
+def box(x, z, width=1.0, depth=1.0, role='other', label=''):
+    return Footprint(x - width / 2, z - depth / 2, x + width / 2, z + depth / 2, role, label)
+
+
+def test_conflict_kinds():
+    index = SpatialLayoutIndex()
+    index.insert('a', box(0, 0, label='a'))
+    index.insert('b', box(0.8, 0, label='b'))
+    index.insert('c', box(3, 0, label='c'))
+    index.insert('d', box(4.2, 0, label='d'))
+    index.insert('e', box(5.65, 0, label='e'))
+    report = index.report()
+    assert report['overlaps'] == [{'items': ['a', 'b'], 'gap': 0.0}]
+    assert report['tight_clearances'] == [{'items': ['c', 'd'], 'gap': 0.2}]
+    assert [entry['items'] for entry in report['narrow_walkways']] == [['d', 'e']]
+    assert report['counts']['overlaps'] == 1
+
+
+def test_seating_needs_a_table_in_reach():
+    index = SpatialLayoutIndex()
+    index.insert('sofa', box(0, 0, 2, 0.9, 'seating', 'sofa'))
+    assert index.report()['seating_without_table'] == ['sofa']
+    index.insert('table', box(0, 1.2, 1, 0.6, 'table', 'table'))
+    assert index.report()['seating_without_table'] == []
+    # Seats may touch their table
+    assert index.report()['counts']['overlaps'] == 0
+    index.remove('table')
+    assert index.report()['seating_without_table'] == ['sofa']
+
+
+def test_lighting_and_rugs_do_not_conflict():
+    index = SpatialLayoutIndex()
+    index.insert('sofa', box(0, 0, 2, 1, 'seating'))
+    index.insert('lamp', box(1.2, 0, 0.4, 0.4, 'lighting'))
+    index.insert('rug', Footprint(-2, -2, 2, 2, 'other', 'rug', solid=False))
+    assert index.conflicts['lamp'] == {}
+    assert index.conflicts['rug'] == {}
+
+
+def test_incremental_matches_rebuild():
+    rng = random.Random(7)
+    roles = ['seating', 'table', 'storage', 'lighting', 'other']
+    index = SpatialLayoutIndex()
+    footprints = {}
+    for step in range(300):
+        item_id = rng.randrange(40)
+        if item_id in footprints and rng.random() < 0.4:
+            index.remove(item_id)
+            del footprints[item_id]
+        else:
+            footprints[item_id] = box(rng.uniform(0, 8), rng.uniform(0, 8), rng.uniform(0.3, 2),
+                                      rng.uniform(0.3, 2), rng.choice(roles), str(item_id))
+            index.insert(item_id, footprints[item_id])
+
+    rebuilt = SpatialLayoutIndex()
+    for item_id, footprint in footprints.items():
+        rebuilt.insert(item_id, footprint)
+    assert index.conflicts == rebuilt.conflicts
+    assert index.unserved_seating == rebuilt.unserved_seating
+
+    # Conflicts agree with a brute-force pass over every pair
+    for (a_id, a), (b_id, b) in itertools.combinations(footprints.items(), 2):
+        kind = SpatialLayoutIndex._conflict_kind(a, b, a.gap(b))
+        assert index.conflicts[a_id].get(b_id, (None,))[0] == kind
+
+
+def test_footprint_from_model():
+    assert footprint_from_model({'name': 'sofa'}, 'seating') is None
+    rotated = footprint_from_model({'position': [1, 0, 2], 'rotation': {'x': 0, 'y': math.pi / 2, 'z': 0},
+                                    'dimensions': {'width': 2, 'depth': 1}}, 'seating')
+    assert (rotated.x0, rotated.x1) == pytest.approx((0.5, 1.5))
+    assert (rotated.z0, rotated.z1) == pytest.approx((1, 3))
+    # A collision proxy outline takes precedence over dimensions
+    proxy = {'footprint': [[-1, -0.25], [1, -0.25], [1, 0.25], [-1, 0.25]]}
+    outlined = footprint_from_model({'position': {'x': 0, 'y': 0, 'z': 0}, 'scale': [2, 1, 1],
+                                     'collisionProxy': proxy, 'dimensions': {'width': 9}}, 'other')
+    assert (outlined.x0, outlined.x1, outlined.z0, outlined.z1) == pytest.approx((-2, 2, -0.25, 0.25))
@@ -0,0 +1,14 @@
+from startup import COLD_START_BUDGET, cold_start_seconds, eagerly_loaded
+
+
+def test_importing_app_defers_heavy_modules():
+    assert eagerly_loaded('app') == []
+
+
+def test_eager_imports_are_reported():
+    assert {'numpy', 'PIL', 'requests'} <= set(eagerly_loaded('model_analyzer'))
+
+
+def test_cold_start_of_app_stays_within_budget():
+    # cold_start_seconds imports app in fresh interpreters and keeps the best run
+    assert cold_start_seconds('app') <= COLD_START_BUDGET
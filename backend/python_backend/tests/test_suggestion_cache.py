@@ -0,0 +1,37 @@
+import time
+from suggestion_cache import TTLCache, canonical_room, canonical_room_key
+
+FIELDS = ('name', 'position')
+
+
+def test_room_key_is_order_independent():
+    models = [{'name': 'sofa', 'position': [0, 0, 0]}, {'name': 'lamp', 'position': [1, 0, 2]},
+              {'name': 'rug'}]
+    key, ordered = canonical_room(models, FIELDS)
+    reversed_key, reversed_ordered = canonical_room(list(reversed(models)), FIELDS)
+    assert key == reversed_key
+    assert ordered == reversed_ordered
+
+
+def test_room_key_counts_duplicates_and_fields():
+    chair = {'name': 'chair', 'position': [0, 0, 0]}
+    assert canonical_room_key([chair], FIELDS) != canonical_room_key([chair, chair], FIELDS)
+    moved = {'name': 'chair', 'position': [1, 0, 0]}
+    assert canonical_room_key([chair], FIELDS) != canonical_room_key([moved], FIELDS)
+    # Fields outside the key do not change it
+    assert canonical_room_key([chair], FIELDS) == canonical_room_key([dict(chair, color='red')], FIELDS)
+    assert canonical_room_key([chair], FIELDS) != canonical_room_key([chair], ('name',))
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    # 'b' was least recently used
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 2
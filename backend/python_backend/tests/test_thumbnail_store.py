@@ -0,0 +1,98 @@
+import asyncio
+import mongomock
+import pytest
+from gltf_samples import png
+from thumbnail_store import CHUNK_SIZE, ThumbnailStore, thumbnail_key
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().renderhaus
+
+
+def test_identical_images_share_one_key(db):
+    store = ThumbnailStore(db)
+    red, blue = png((200, 30, 30)), png((30, 30, 200))
+    keys = store.save_many([red, blue, red], ['LRED', 'LBLUE', 'LRED'])
+    assert keys == [thumbnail_key(red), thumbnail_key(blue), thumbnail_key(red)]
+    assert db['thumbnails.files'].count_documents({}) == 2
+
+    # Saving again, even from another store, writes nothing new
+    assert ThumbnailStore(db).save_many([red]) == [keys[0]]
+    assert db['thumbnails.files'].count_documents({}) == 2
+    assert db['thumbnails.chunks'].count_documents({}) == 2
+
+    document = db['thumbnails.files'].find_one({'_id': keys[0]})
+    assert document['filename'] == f'{keys[0]}.png'
+    assert document['length'] == len(red)
+    assert document['metadata'] == {'contentType': 'image/png', 'placeholder': 'LRED'}
+
+
+def test_large_images_are_chunked(db):
+    store = ThumbnailStore(db, bucket='room_bakes', content_type='model/gltf-binary', extension='glb')
+    data = bytes(range(256)) * (CHUNK_SIZE // 128 + 1)
+    key = store.save_many([data])[0]
+    assert db['room_bakes.chunks'].count_documents({'files_id': key}) == 3
+
+    # A fresh store has nothing cached and reads the chunks in order
+    assert ThumbnailStore(db, bucket='room_bakes').read(key) == data
+    assert store.read('0' * 64) is None
+    assert store.read('not-a-key') is None
+
+
+def test_concurrent_saves_are_batched(db):
+    store = ThumbnailStore(db, batch_size=4, batch_delay=0.01)
+    batches = []
+    save_many = store.save_many
+
+    def recording_save_many(images, placeholders):
+        batches.append(len(images))
+        return save_many(images, placeholders)
+
+    store.save_many = recording_save_many
+    images = [png((index * 20, 100, 100)) for index in range(10)]
+
+    async def save_all():
+        return await asyncio.gather(*(store.save(image, f'L{index}') for index, image in enumerate(images)))
+
+    keys = asyncio.run(save_all())
+    assert keys == [thumbnail_key(image) for image in images]
+    assert batches == [4, 4, 2]
+    assert db['thumbnails.files'].count_documents({}) == 10
+    assert all(ThumbnailStore(db).read(key) == image for key, image in zip(keys, images))
+
+
+def test_thumbnail_route_serves_stored_images(api, db, monkeypatch):
+    import app
+    store = ThumbnailStore(db)
+    monkeypatch.setattr(app, 'thumbnail_store', store)
+    image = png((120, 80, 40))
+    key = store.save_many([image])[0]
+
+    response, body = api('GET', f'/api/python/thumbnails/{key}')
+    assert response.status_code == 200
+    assert body == image
+    assert response.headers['Content-Type'] == 'image/png'
+    assert response.headers['ETag'] == f'"{key}"'
+
+    response, _ = api('GET', f'/api/python/thumbnails/{key}', headers={'If-None-Match': f'"{key}"'})
+    assert response.status_code == 304
+
+    response, _ = api('GET', f'/api/python/thumbnails/{"0" * 64}')
+    assert response.status_code == 404
+    response, _ = api('GET', '/api/python/thumbnails/not-a-key')
+    assert response.status_code == 400
+
+
+def test_concurrent_writers_of_the_same_image(db):
+    image = png((60, 60, 60))
+    key = thumbnail_key(image)
+    store = ThumbnailStore(db)
+    # Another worker has written the chunks but not yet the file document
+    store._ensure_indexes()
+    db['thumbnails.chunks'].insert_one({'files_id': key, 'n': 0, 'data': image})
+
+    assert store.save_many([image]) == [key]
+    assert db['thumbnails.chunks'].count_documents({'files_id': key}) == 1
+    assert db['thumbnails.files'].count_documents({'_id': key}) == 1
+    assert ThumbnailStore(db).read(key) == image
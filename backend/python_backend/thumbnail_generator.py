@@ -1,17 +1,21 @@
 import base64
 import io
 import hashlib
-import requests
-from PIL import Image, ImageDraw, ImageFont
-from typing import Tuple, Optional
+from typing import Any, Tuple, Optional
 import logging
+from request_profiling import stage
+from shared_cache import SharedCache
+from placeholders import blurhash
 
 logger = logging.getLogger(__name__)
 
 class ThumbnailGenerator:
     def __init__(self):
         self.default_size = (400, 400)
-        self.cache = {}  # Simple in-memory cache
+        # PNG bytes shared by all workers on the host; base64 is derived on demand
+        self.cache = SharedCache('thumbnails')
+        # BlurHash of each model's thumbnail, independent of size
+        self.placeholders = SharedCache('thumbnail_placeholders', front_size=1024)
     
     def generate_thumbnail_from_url(self, model_url: str, output_format: str = 'base64', size: Tuple[int, int] = None) -> Optional[str]:
         """
@@ -22,51 +26,79 @@ class ThumbnailGenerator:
         
         Args:
             model_url (str): URL of the 3D model
-            output_format (str): Output format ('base64', 'bytes', 'file')
+            output_format (str): Output format ('base64' or 'bytes')
             size (Tuple[int, int]): Size of the thumbnail (width, height)
         
         Returns:
             str: Base64 encoded thumbnail or None if failed
         """
+        result = self.generate_thumbnail_with_placeholder(model_url, output_format, size)
+        return result[0] if result else None
+    
+    def generate_thumbnail_with_placeholder(self, model_url: str, output_format: str = 'base64',
+                                            size: Tuple[int, int] = None) -> Optional[Tuple[Any, str]]:
+        """
+        Generate a thumbnail and its BlurHash placeholder.
+        
+        The placeholder is computed from the freshly drawn image and cached per model
+        next to the thumbnail, so catalog responses can include it without rendering.
+        
+        Returns:
+            tuple: (thumbnail in output_format, BlurHash string) or None if failed
+        """
         if not model_url:
             return None
         
         size = size or self.default_size
         
+        if output_format not in ('base64', 'bytes'):
+            logger.warning(f"Unsupported output format: {output_format}")
+            return None
+        
         # Create cache key
         cache_key = f"{model_url}_{size[0]}x{size[1]}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        png_bytes = self.cache.get(cache_key)
+        placeholder = self.placeholders.get(model_url)
         
         try:
-            # Generate placeholder thumbnail
-            thumbnail_image = self._create_placeholder_thumbnail(model_url, size)
-            
-            if output_format == 'base64':
-                # Convert to base64
+            if png_bytes is None:
+                # Generate placeholder thumbnail
+                with stage('draw'):
+                    thumbnail_image = self._create_placeholder_thumbnail(model_url, size)
+                
                 buffer = io.BytesIO()
-                thumbnail_image.save(buffer, format='PNG')
-                thumbnail_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+                with stage('png_encode'):
+                    thumbnail_image.save(buffer, format='PNG')
+                png_bytes = buffer.getvalue()
                 
                 # Cache the result
-                self.cache[cache_key] = thumbnail_base64
-                return thumbnail_base64
+                self.cache.set(cache_key, png_bytes)
+            else:
+                thumbnail_image = None
             
-            elif output_format == 'bytes':
-                buffer = io.BytesIO()
-                thumbnail_image.save(buffer, format='PNG')
-                return buffer.getvalue()
+            if placeholder is None:
+                with stage('blurhash'):
+                    if thumbnail_image is None:
+                        from PIL import Image
+                        thumbnail_image = Image.open(io.BytesIO(png_bytes))
+                    placeholder = blurhash(thumbnail_image)
+                self.placeholders.set(model_url, placeholder)
             
-            else:
-                logger.warning(f"Unsupported output format: {output_format}")
-                return None
+            if output_format == 'base64':
+                return base64.b64encode(png_bytes).decode('utf-8'), placeholder
+            return png_bytes, placeholder
         
         except Exception as e:
             logger.error(f"Error generating thumbnail for {model_url}: {str(e)}")
             return None
     
-    def _create_placeholder_thumbnail(self, model_url: str, size: Tuple[int, int]) -> Image.Image:
+    def placeholder_for(self, model_url: str) -> Optional[str]:
+        """BlurHash of a model's thumbnail, if one has been generated on this host"""
+        return self.placeholders.get(model_url) if model_url else None
+    
+    def _create_placeholder_thumbnail(self, model_url: str, size: Tuple[int, int]):
         """Create a placeholder thumbnail image."""
+        from PIL import Image, ImageDraw, ImageFont
         width, height = size
         
         # Create a unique hash for the model URL
@@ -123,7 +155,7 @@ class ThumbnailGenerator:
         
         return image
     
-    def _draw_3d_cube(self, draw: ImageDraw.Draw, width: int, height: int):
+    def _draw_3d_cube(self, draw, width: int, height: int):
         """Draw a simple 3D cube icon in isometric projection."""
         # Calculate cube dimensions and position
         cube_size = min(width, height) // 6
@@ -197,6 +229,7 @@ class ThumbnailGenerator:
     def clear_cache(self):
         """Clear the thumbnail cache."""
         self.cache.clear()
+        self.placeholders.clear()
         logger.info("Thumbnail cache cleared")
 
 # Create global instance
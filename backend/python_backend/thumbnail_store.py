@@ -0,0 +1,140 @@
+"""Content-addressed thumbnail storage in GridFS.
+
+Thumbnails are stored in the ``thumbnails`` GridFS bucket of the app
+database under the sha256 of their bytes, so identical images are stored
+once and a key never changes meaning. Files are written in the standard
+GridFS layout (``thumbnails.files`` / ``thumbnails.chunks``) so any GridFS
+client can read them, but with batched ``insert_many`` calls instead of one
+round trip per file. Concurrent ``save`` calls are coalesced into such
+batches. Baked room GLBs are kept the same way in their own bucket.
+"""
+import asyncio
+import hashlib
+import re
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional
+from suggestion_cache import TTLCache
+from async_io import run_cpu
+
+CHUNK_SIZE = 255 * 1024
+KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def thumbnail_key(data: bytes) -> str:
+    """Content address of an image"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ThumbnailStore:
+    """Batched writes and cached reads of thumbnails in a GridFS bucket"""
+
+    def __init__(self, db, bucket: str = 'thumbnails', content_type: str = 'image/png', extension: str = 'png',
+                 batch_size: int = 64, batch_delay: float = 0.02, cache_size: int = 256):
+        self.files = db[f'{bucket}.files']
+        self.chunks = db[f'{bucket}.chunks']
+        self.content_type = content_type
+        self.extension = extension
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.cache = TTLCache(maxsize=cache_size, ttl=3600.0)
+        self._pending: List = []
+        self._flush_handle = None
+        self._indexes_ready = False
+        self._index_lock = threading.Lock()
+
+    def _ensure_indexes(self):
+        """Create the indexes GridFS drivers expect; done once per process"""
+        if self._indexes_ready:
+            return
+        with self._index_lock:
+            if not self._indexes_ready:
+                self.chunks.create_index([('files_id', 1), ('n', 1)], unique=True)
+                self.files.create_index([('filename', 1), ('uploadDate', 1)])
+                self._indexes_ready = True
+
+    def save_many(self, images: List[bytes], placeholders: List[Optional[str]] = None) -> List[str]:
+        """Store images that are not stored yet; returns their keys in order.
+
+        An image's BlurHash placeholder, when given, is kept in its file metadata.
+        """
+        from pymongo.errors import BulkWriteError
+
+        keys = [thumbnail_key(data) for data in images]
+        unique = dict(zip(keys, images))
+        placeholder_by_key = dict(zip(keys, placeholders or []))
+        existing = {document['_id'] for document in self.files.find({'_id': {'$in': list(unique)}}, {'_id': 1})}
+        missing = {key: data for key, data in unique.items() if key not in existing}
+        if not missing:
+            return keys
+
+        self._ensure_indexes()
+        now = datetime.now(timezone.utc)
+        chunks = []
+        files = []
+        for key, data in missing.items():
+            for n, start in enumerate(range(0, max(len(data), 1), CHUNK_SIZE)):
+                chunks.append({'files_id': key, 'n': n, 'data': data[start:start + CHUNK_SIZE]})
+            metadata = {'contentType': self.content_type}
+            if placeholder_by_key.get(key):
+                metadata['placeholder'] = placeholder_by_key[key]
+            files.append({'_id': key, 'length': len(data), 'chunkSize': CHUNK_SIZE, 'uploadDate': now,
+                          'filename': f'{key}.{self.extension}', 'metadata': metadata})
+
+        # Chunks first, so a file document is never visible without its data.
+        # Duplicate keys mean another worker stored the same image concurrently.
+        for collection, documents in ((self.chunks, chunks), (self.files, files)):
+            try:
+                collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                if any(error['code'] != 11000 for error in e.details.get('writeErrors', [])):
+                    raise
+        for key, data in missing.items():
+            self.cache.set(key, data)
+        return keys
+
+    async def save(self, data: bytes, placeholder: str = None) -> str:
+        """Store one image, coalescing concurrent calls into batched writes"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((data, placeholder, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            asyncio.ensure_future(self._write(pending))
+
+    async def _write(self, pending):
+        try:
+            keys = await run_cpu(self.save_many, [data for data, _, _ in pending],
+                                 [placeholder for _, placeholder, _ in pending])
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, (_, _, future) in zip(keys, pending):
+            if not future.done():
+                future.set_result(key)
+
+    def read(self, key: str) -> Optional[bytes]:
+        """Return an image's bytes, or None if it is not stored"""
+        if not KEY_PATTERN.match(key or ''):
+            return None
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        parts = [chunk['data'] for chunk in self.chunks.find({'files_id': key}, {'data': 1}).sort('n', 1)]
+        if not parts:
+            return None
+        data = b''.join(parts)
+        self.cache.set(key, data)
+        return data
@@ -0,0 +1,20 @@
+const axios = require('axios');
+
+// Formats the Python backend can read vertex positions from
+const PROXY_FORMATS = ['glb', 'gltf'];
+
+// Ask the Python backend to compute the collision proxy of an uploaded model.
+// The proxy is stored on the model document when it is ready; uploads do not
+// wait for it, and a failure only means the editor falls back to full meshes.
+const requestCollisionProxy = (modelId, modelType, modelUrl, format) => {
+  if (!modelUrl || !PROXY_FORMATS.includes(format)) {
+    return;
+  }
+
+  const pythonUrl = `http://localhost:${process.env.PYTHON_PORT || 5001}/api/python/model/collision-proxy`;
+  axios.post(pythonUrl, { modelId: String(modelId), modelType, modelUrl })
+    .then(() => console.log('Collision proxy stored for model:', modelId))
+    .catch((error) => console.error('Collision proxy generation failed:', error.message));
+};
+
+module.exports = { requestCollisionProxy };
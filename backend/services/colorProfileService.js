@@ -0,0 +1,20 @@
+const axios = require('axios');
+
+// Formats the Python backend can extract colors from
+const PROFILE_FORMATS = ['glb', 'gltf'];
+
+// Ask the Python backend to profile the colors of an uploaded catalog model,
+// which also adds it to the color-similarity search. Runs in the background;
+// models without a profile are picked up by `python color_profiles.py`.
+const requestColorProfile = (modelId, modelUrl, name, format) => {
+  if (!modelUrl || !PROFILE_FORMATS.includes(format)) {
+    return;
+  }
+
+  const pythonUrl = `http://localhost:${process.env.PYTHON_PORT || 5001}/api/python/model/color-profile`;
+  axios.post(pythonUrl, { modelId: String(modelId), modelUrl, name })
+    .then(() => console.log('Color profile stored for model:', modelId))
+    .catch((error) => console.error('Color profile generation failed:', error.message));
+};
+
+module.exports = { requestColorProfile };
@@ -14,7 +14,7 @@ call npm install
 echo.
 echo [3/4] Installing Python dependencies...
 cd ../backend/python_backend
-pip install flask flask-cors pymongo numpy pillow opencv-python python-dotenv
+pip install -r requirements.txt
 
 echo.
 echo [4/4] Seeding database with sample models and templates...